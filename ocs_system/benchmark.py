@@ -0,0 +1,518 @@
+"""
+效能基準測試 - 量測核心檢測步驟的耗時
+
+用法:
+    python benchmark.py --suite scaling                      # 延遲 / 記憶體 vs 硬幣數與百萬像素
+    python benchmark.py --suite scaling --plot scaling.png   # 另存圖表 (需 matplotlib)
+    python benchmark.py --suite scaling --update-baseline    # 更新基準線
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 設定 Windows 控制台編碼 (解決 emoji 顯示問題)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from core.detectors import available_detectors, detect
+from core.image_processor import ImageProcessor, coin_records_to_dicts
+from main import OCSSystem
+from synthetic_scenes import detector_params, render_scene
+from test_config import get_all_test_images, get_test_config
+from utils.evaluation import match_recall
+from utils.metrics import PipelineMetrics
+
+TEST_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "test_images")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# 擴展性測試: 固定 4032x3024 改變硬幣數，固定 16 枚硬幣改變解析度 (到 8K)
+SCALING_MODES = ("contours", "hough", "hybrid", "pyramid")
+SCALING_COINS = (4, 16, 64, 128)
+SCALING_SIZES = ((1280, 960), (1920, 1440), (4032, 3024), (5760, 4320), (7680, 4320))
+CLASSIFY_STAGES = ("color", "texture", "classify")
+
+
+def load_benchmark_images():
+    """
+    載入基準測試影像 (test_config 中存在的測試圖片 + 紋理背景合成影像)
+    
+    Returns:
+        [(名稱, BGR 影像), ...]
+    """
+    images = []
+    for name in get_all_test_images():
+        path = os.path.join(TEST_IMAGE_DIR, name)
+        image = cv2.imread(path) if os.path.exists(path) else None
+        if image is not None:
+            images.append((name, image))
+    images.append(("synthetic_textured_4032x3024", make_textured_scene(4032, 3024)))
+    return images
+
+
+def make_textured_scene(width, height, num_coins=12, seed=0):
+    """
+    產生紋理背景上的硬幣合成影像 (大量亮點與斑塊，Otsu 後會產生數千個雜訊輪廓)
+    
+    Args:
+        width, height: 影像尺寸
+        num_coins: 硬幣數量
+        seed: 亂數種子
+        
+    Returns:
+        BGR 影像
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 50, dtype=np.uint8)
+    
+    # 細小亮點 (木紋、灰塵)
+    for x, y, r in zip(rng.integers(0, width, 8000), rng.integers(0, height, 8000),
+                       rng.integers(1, 6, 8000)):
+        cv2.circle(image, (int(x), int(y)), int(r), (200, 200, 200), -1)
+    
+    # 較大的不規則斑塊 (會通過面積門檻，需靠圓形度剔除)
+    for x, y, r in zip(rng.integers(0, width, 3000), rng.integers(0, height, 3000),
+                       rng.integers(15, 30, 3000)):
+        axes = (int(r), int(r * rng.uniform(0.6, 1.0)))
+        cv2.ellipse(image, (int(x), int(y)), axes, 0, 0, 360, (200, 200, 200), -1)
+    
+    for _ in range(num_coins):
+        r = int(rng.integers(40, 90))
+        x = int(rng.integers(r, width - r))
+        y = int(rng.integers(r, height - r))
+        cv2.circle(image, (x, y), r, (40, 170, 210), -1, cv2.LINE_AA)
+    return image
+
+
+def load_labelled_scenes():
+    """
+    載入有標註的影像: test_config 中存在的測試圖片 (只有數量) + 合成影像 (含位置)
+    
+    Returns:
+        [(名稱, BGR 影像, 預期數量, 真實位置或 None, 檢測器參數覆寫或 None), ...]
+    """
+    scenes = []
+    for name in get_all_test_images():
+        path = os.path.join(TEST_IMAGE_DIR, name)
+        image = cv2.imread(path) if os.path.exists(path) else None
+        if image is not None:
+            scenes.append((name, image, get_test_config(name)['total_count'], None, None))
+    for width, height, count in ((1920, 1440, 8), (4032, 3024, 30)):
+        image, truth = render_scene(width, height, count, seed=count)
+        circles = [(coin['x'], coin['y'], coin['radius']) for coin in truth]
+        scenes.append((f"synthetic_{width}x{height}", image, len(circles), circles,
+                       detector_params(width)))
+    return scenes
+
+
+def legacy_filter_contours(contours, image_area):
+    """舊版逐一輪廓過濾 (對照組)"""
+    coins = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < 800 or area > image_area * 0.3:
+            continue
+        (x, y), radius = cv2.minEnclosingCircle(contour)
+        if radius < 20 or radius > 150:
+            continue
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter == 0:
+            continue
+        circularity = 4 * np.pi * area / (perimeter ** 2)
+        if circularity < 0.80:
+            continue
+        bx, by, bw, bh = cv2.boundingRect(contour)
+        aspect_ratio = float(bw) / bh if bh > 0 else 0
+        if aspect_ratio < 0.8 or aspect_ratio > 1.2:
+            continue
+        coins.append({'x': int(x), 'y': int(y), 'radius': int(radius)})
+    return coins
+
+
+def _time_call(func, repeat):
+    """重複執行並返回最佳耗時 (ms) 與最後一次結果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def bench_contour_filter(images, repeat=5):
+    """
+    量測每張影像的輪廓過濾耗時 (不含二值化與 findContours)
+    
+    Args:
+        images: [(名稱, BGR 影像), ...]
+        repeat: 重複次數
+    """
+    processor = ImageProcessor()
+    
+    print("=" * 78)
+    print("輪廓過濾 (contour filter) 基準測試")
+    print("=" * 78)
+    print(f"{'影像':<32} {'輪廓數':>8} {'逐一(ms)':>10} {'批次(ms)':>10} {'加速':>7} {'硬幣':>6}")
+    print("-" * 78)
+    
+    for name, image in images:
+        prepared = processor.prepare(image)
+        closed = cv2.morphologyEx(prepared.binary, cv2.MORPH_CLOSE,
+                                  processor.close_kernel, iterations=2)
+        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        image_area = image.shape[0] * image.shape[1]
+        
+        legacy_ms, legacy = _time_call(lambda: legacy_filter_contours(contours, image_area), repeat)
+        batch_ms, batch = _time_call(lambda: processor.filter_contours(contours, image_area), repeat)
+        if len(legacy) != len(batch):
+            print(f"⚠️ {name}: 結果不一致 ({len(legacy)} vs {len(batch)})")
+        
+        print(f"{name[:32]:<32} {len(contours):>8} {legacy_ms:>10.2f} {batch_ms:>10.2f} "
+              f"{legacy_ms / max(batch_ms, 1e-9):>6.1f}x {len(batch):>6}")
+
+
+def bench_tiled(width=8000, height=6000, workers=(1, 2, 4, 8)):
+    """
+    量測超大影像分塊平行檢測的吞吐量與執行緒數的關係
+    
+    Args:
+        width, height: 合成影像尺寸
+        workers: 要測試的執行緒數
+    """
+    processor = ImageProcessor()
+    image = make_textured_scene(width, height, num_coins=120, seed=1)
+    tiles = processor.tile_grid(image.shape)
+    
+    print("=" * 60)
+    print(f"分塊平行檢測 ({width}x{height}, {len(tiles)} 個分塊, CPU: {os.cpu_count()})")
+    print("=" * 60)
+    print(f"{'模式':<16} {'耗時(ms)':>10} {'MP/s':>8} {'硬幣':>6}")
+    print("-" * 60)
+    
+    megapixels = width * height / 1e6
+    full_ms, coins = _time_call(lambda: processor.detect_coins_hybrid(image), 1)
+    print(f"{'整張 hybrid':<16} {full_ms:>10.1f} {megapixels / full_ms * 1000:>8.1f} {len(coins):>6}")
+    for n in workers:
+        ms, coins = _time_call(lambda: processor.detect_coins_tiled(image, max_workers=n), 1)
+        print(f"{f'tiled x{n}':<16} {ms:>10.1f} {megapixels / ms * 1000:>8.1f} {len(coins):>6}")
+
+
+def bench_workspace(width=4032, height=3024, frames=20):
+    """
+    比較一般模式與預配置緩衝區模式: 每張影格的記憶體配置量與延遲 (p50 / p99)
+    
+    Args:
+        width, height: 影格尺寸
+        frames: 連續影格數
+    """
+    image = make_textured_scene(width, height, num_coins=15, seed=2)
+    
+    print("=" * 70)
+    print(f"預配置緩衝區 (workspace) - {frames} 張 {width}x{height} 影格")
+    print("=" * 70)
+    print(f"{'模式':<12} {'首張配置(MB)':>14} {'穩態配置(MB)':>14} {'p50(ms)':>9} {'p99(ms)':>9}")
+    print("-" * 70)
+    
+    for use_workspace in (False, True):
+        processor = ImageProcessor()
+        processor.enable_workspace(use_workspace)
+        allocations, latencies = [], []
+        prepared = None
+        
+        tracemalloc.start()
+        for _ in range(frames):
+            prepared = None  # 釋放上一張影格 (工作區模式下緩衝區仍保留)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            prepared = processor.prepare(image)
+            processor.detect_coins_hybrid(prepared)
+            prepared.hsv
+            latencies.append((time.perf_counter() - start) * 1000)
+            allocations.append((tracemalloc.get_traced_memory()[1] - baseline) / 1e6)
+        tracemalloc.stop()
+        
+        name = "workspace" if use_workspace else "一般"
+        print(f"{name:<12} {allocations[0]:>14.1f} {np.median(allocations[1:]):>14.2f} "
+              f"{np.percentile(latencies[1:], 50):>9.1f} {np.percentile(latencies[1:], 99):>9.1f}")
+
+
+def bench_detectors(scenes, names=None, repeat=5):
+    """
+    比較所有已註冊檢測器: 延遲 p50 / p95、記憶體峰值、數量誤差與召回率
+    
+    每次執行都從原始影像重新預處理，延遲包含檢測器實際需要的預處理。
+    
+    Args:
+        scenes: [(名稱, BGR 影像, 預期數量, 真實位置或 None, 檢測器參數覆寫或 None), ...]
+        names: 要測試的檢測器 (None 為全部)
+        repeat: 每張影像的重複次數
+    """
+    processors = [ImageProcessor() for _ in scenes]
+    for processor, scene in zip(processors, scenes):
+        if scene[4]:
+            processor.update_params(scene[4])
+    names = names or available_detectors()
+    
+    print("=" * 86)
+    print(f"檢測器比較 ({len(scenes)} 張影像 × {repeat} 次)")
+    print("=" * 86)
+    print(f"{'檢測器':<12} {'p50(ms)':>9} {'p95(ms)':>9} {'峰值(MB)':>10} "
+          f"{'數量誤差':>9} {'召回率':>8}   各影像數量")
+    print("-" * 86)
+    
+    for name in names:
+        latencies, peaks, counts = [], [], []
+        error, recalls = 0, []
+        for processor, (_, image, expected, truth, _) in zip(processors, scenes):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                coins = detect(processor, processor.prepare(image), name)
+                latencies.append((time.perf_counter() - start) * 1000)
+            
+            # 記憶體另外量測一次 (tracemalloc 會拖慢延遲)
+            tracemalloc.start()
+            detect(processor, processor.prepare(image), name)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+            tracemalloc.stop()
+            
+            counts.append(len(coins))
+            error += abs(len(coins) - expected)
+            if truth is not None:
+                recalls.append(match_recall(coins, truth))
+        
+        recall = f"{np.mean(recalls):>8.1%}" if recalls else f"{'-':>8}"
+        print(f"{name:<12} {np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 95):>9.1f} "
+              f"{max(peaks):>10.1f} {error:>9d} {recall}   {counts}")
+    
+    print("-" * 86)
+    print("預期數量: " + str([scene[2] for scene in scenes]))
+
+
+def _scaling_scenes(coin_counts=SCALING_COINS, sizes=SCALING_SIZES):
+    """
+    擴展性測試的場景 (惰性產生，同一時間只保留一張 8K 影像)
+    
+    Yields:
+        (軸名稱, x 值, BGR 影像, 真實位置)
+    """
+    for count in coin_counts:
+        image, truth = render_scene(4032, 3024, count, gradient=0.2, seed=count)
+        yield "coins", len(truth), image, truth
+    for width, height in sizes:
+        image, truth = render_scene(width, height, 16, gradient=0.2, seed=width)
+        yield "megapixels", round(width * height / 1e6, 1), image, truth
+
+
+def bench_scaling(modes=None, repeat=3, coin_counts=SCALING_COINS, sizes=SCALING_SIZES):
+    """
+    完整辨識流程 (預處理 + 檢測 + 分類) 的延遲與記憶體，對硬幣數與百萬像素的變化
+    
+    Args:
+        modes: 檢測器名稱 (None 為 SCALING_MODES)
+        repeat: 每張影像的重複次數 (取中位數)
+        coin_counts: 4032x3024 場景的硬幣數
+        sizes: 16 枚硬幣場景的解析度
+        
+    Returns:
+        {軸名稱: {檢測器: [{x, ms, detect_ms, classify_ms, mb, error, recall}, ...]}}
+    """
+    modes = modes or SCALING_MODES
+    systems = {mode: OCSSystem(mode, verbose=False, metrics=PipelineMetrics()) for mode in modes}
+    results = {"coins": {mode: [] for mode in modes}, "megapixels": {mode: [] for mode in modes}}
+    
+    for axis, x, image, truth in _scaling_scenes(coin_counts, sizes):
+        circles = [(c['x'], c['y'], c['radius']) for c in truth]
+        for mode, system in systems.items():
+            system.processor.update_params(detector_params(image.shape[1]))
+            latencies, stages = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = next(system.iter_process([image], prefetch=0))
+                latencies.append((time.perf_counter() - start) * 1000)
+                stages.append(system.metrics.pop_current())
+            
+            # 記憶體另外量測一次 (tracemalloc 會拖慢延遲)
+            tracemalloc.start()
+            next(system.iter_process([image], prefetch=0))
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            system.metrics.pop_current()
+            
+            coins = coin_records_to_dicts(result['results'])
+            results[axis][mode].append({
+                "x": x,
+                "ms": float(np.median(latencies)),
+                "detect_ms": float(np.median([t['preprocess'] + t['detect'] for t in stages])) * 1000,
+                "classify_ms": float(np.median([sum(t.get(k, 0.0) for k in CLASSIFY_STAGES)
+                                                for t in stages])) * 1000,
+                "mb": peak,
+                "error": abs(len(coins) - len(truth)),
+                "recall": match_recall(coins, circles),
+            })
+    
+    titles = {"coins": "硬幣數 (4032x3024)", "megapixels": "百萬像素 (16 枚硬幣)"}
+    for axis, by_mode in results.items():
+        print("=" * 84)
+        print(f"擴展性: 完整流程 vs {titles[axis]}")
+        print("=" * 84)
+        print(f"{'檢測器':<12} {'x':>8} {'總計(ms)':>10} {'檢測(ms)':>10} {'分類(ms)':>10} "
+              f"{'峰值(MB)':>10} {'數量誤差':>9} {'召回率':>8}")
+        print("-" * 84)
+        for mode, rows in by_mode.items():
+            for row in rows:
+                print(f"{mode:<12} {row['x']:>8} {row['ms']:>10.1f} {row['detect_ms']:>10.1f} "
+                      f"{row['classify_ms']:>10.2f} {row['mb']:>10.1f} {row['error']:>9d} "
+                      f"{row['recall']:>8.1%}")
+    return results
+
+
+def plot_scaling(results, path):
+    """
+    繪製延遲 / 記憶體 vs 硬幣數 / 百萬像素 (matplotlib 為選用套件，未安裝時略過)
+    
+    Args:
+        results: bench_scaling 的結果
+        path: 圖片輸出路徑
+        
+    Returns:
+        是否成功輸出
+    """
+    try:
+        import matplotlib
+        matplotlib.use("Agg")  # 無顯示環境
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("⚠️ 未安裝 matplotlib，略過繪圖 (pip install matplotlib)")
+        return False
+    
+    fig, axes = plt.subplots(2, 2, figsize=(12, 8))
+    labels = {"coins": "coins per image (4032x3024)", "megapixels": "megapixels (16 coins)"}
+    for col, (axis, by_mode) in enumerate(results.items()):
+        for mode, rows in by_mode.items():
+            xs = [row["x"] for row in rows]
+            axes[0][col].plot(xs, [row["ms"] for row in rows], marker="o", label=mode)
+            axes[1][col].plot(xs, [row["mb"] for row in rows], marker="o", label=mode)
+        axes[0][col].set_ylabel("latency p50 (ms)")
+        axes[1][col].set_ylabel("peak traced memory (MB)")
+        for row in (0, 1):
+            axes[row][col].set_xlabel(labels[axis])
+            axes[row][col].grid(True, alpha=0.3)
+            axes[row][col].legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    print(f"📈 圖表已儲存至: {path}")
+    return True
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """儲存擴展性測試結果作為基準線 (附上執行環境)"""
+    data = {
+        "environment": {"python": platform.python_version(), "opencv": cv2.__version__,
+                        "numpy": np.__version__, "machine": platform.machine(),
+                        "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"💾 基準線已儲存至: {path}")
+
+
+def compare_baseline(results, baseline, tolerance=0.25, min_ms=2.0, min_mb=1.0):
+    """
+    與基準線比較，找出退化的項目
+    
+    延遲與記憶體超過基準 (1 + tolerance) 倍且差距大於絕對門檻，
+    或數量誤差增加、召回率下降超過 2% 時視為退化。
+    
+    Args:
+        results: bench_scaling 的結果
+        baseline: save_baseline 寫出的資料
+        tolerance: 相對容許值
+        min_ms, min_mb: 絕對差距門檻 (避免極小數值的雜訊)
+        
+    Returns:
+        退化說明的列表 (空列表表示沒有退化)
+    """
+    regressions = []
+    for axis, by_mode in results.items():
+        for mode, rows in by_mode.items():
+            reference = {row["x"]: row for row in baseline["results"].get(axis, {}).get(mode, [])}
+            for row in rows:
+                base = reference.get(row["x"])
+                if base is None:
+                    continue
+                where = f"{mode} {axis}={row['x']}"
+                for key, unit, floor in (("ms", "ms", min_ms), ("mb", "MB", min_mb)):
+                    if row[key] > base[key] * (1 + tolerance) and row[key] - base[key] > floor:
+                        regressions.append(f"{where}: {key} {base[key]:.1f} → {row[key]:.1f} {unit}")
+                if row["error"] > base["error"]:
+                    regressions.append(f"{where}: 數量誤差 {base['error']} → {row['error']}")
+                if row["recall"] < base["recall"] - 0.02:
+                    regressions.append(f"{where}: 召回率 {base['recall']:.1%} → {row['recall']:.1%}")
+    return regressions
+
+
+def main():
+    """主程式"""
+    suites = ("filter", "tiled", "workspace", "detectors", "scaling")
+    parser = argparse.ArgumentParser(description="OCS 效能基準測試")
+    parser.add_argument("--repeat", type=int, default=5, help="每項測試重複次數")
+    parser.add_argument("--suite", choices=("all",) + suites, default="all", help="要執行的測試")
+    parser.add_argument("--detectors", default=None,
+                        help=f"以逗號分隔的檢測器名稱 (預設全部: {','.join(available_detectors())}；"
+                             f"scaling 預設: {','.join(SCALING_MODES)})")
+    parser.add_argument("--plot", default=None, help="scaling: 圖表輸出路徑 (需 matplotlib)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="scaling: 基準線檔案")
+    parser.add_argument("--update-baseline", action="store_true", help="scaling: 以本次結果更新基準線")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="scaling: 延遲 / 記憶體的相對容許值")
+    args = parser.parse_args()
+    
+    run = suites if args.suite == "all" else (args.suite,)
+    if "filter" in run:
+        bench_contour_filter(load_benchmark_images(), repeat=args.repeat)
+    if "tiled" in run:
+        bench_tiled()
+    if "workspace" in run:
+        bench_workspace()
+    if "detectors" in run:
+        names = args.detectors.split(",") if args.detectors else None
+        bench_detectors(load_labelled_scenes(), names, repeat=args.repeat)
+    if "scaling" in run:
+        modes = args.detectors.split(",") if args.detectors else None
+        results = bench_scaling(modes, repeat=args.repeat)
+        if args.plot:
+            plot_scaling(results, args.plot)
+        if args.update_baseline:
+            save_baseline(results, args.baseline)
+        elif os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                regressions = compare_baseline(results, json.load(f), args.tolerance)
+            if regressions:
+                print(f"\n❌ 與基準線相比有 {len(regressions)} 項退化:")
+                for line in regressions:
+                    print(f"   {line}")
+                sys.exit(1)
+            print("\n✅ 與基準線相比沒有退化")
+        else:
+            print(f"\nℹ️ 尚無基準線 ({args.baseline})，以 --update-baseline 建立")
+
+
+if __name__ == "__main__":
+    main()
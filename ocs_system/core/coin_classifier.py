@@ -5,7 +5,9 @@ Improved Coin Classifier Module
 
 import cv2
 import numpy as np
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
+
+from .region_stats import texture_maps
 
 
 class CoinClassifierV2:
@@ -19,6 +21,14 @@ class CoinClassifierV2:
         50: {'diameter': 28.0, 'color': 'silver', 'material': 'cupronickel'}
     }
     
+    # 金色硬幣的面額分界: 相對尺寸 (0~1) 與絕對半徑 (像素) → 1元 / 5元 / 10元
+    GOLDEN_DENOMINATIONS = np.array([1, 5, 10])
+    RELATIVE_SIZE_BOUNDS = (0.30, 0.65)
+    ABSOLUTE_RADIUS_BOUNDS = (30, 38)
+    
+    # 紋理複雜度高於此值判斷為正面 (降低閾值，更容易判斷為正面)
+    TEXTURE_THRESHOLD = 0.45
+    
     def __init__(self):
         """初始化分類器"""
         self.reference_diameter = None
@@ -63,17 +73,19 @@ class CoinClassifierV2:
         if is_golden or not is_silver:
             if relative_size is not None:
                 # 使用相對尺寸分類
-                if relative_size < 0.30:  # 最小的
+                small, large = self.RELATIVE_SIZE_BOUNDS
+                if relative_size < small:  # 最小的
                     return 1  # 1元 (20mm)
-                elif relative_size < 0.65:  # 中等
+                elif relative_size < large:  # 中等
                     return 5  # 5元 (22mm)
                 else:  # 較大的金色
                     return 10  # 10元 (26mm)
             else:
                 # 使用絕對半徑分類（備用方案）
-                if radius < 30:
+                small, large = self.ABSOLUTE_RADIUS_BOUNDS
+                if radius < small:
                     return 1
-                elif radius < 38:
+                elif radius < large:
                     return 5
                 else:
                     return 10
@@ -81,31 +93,36 @@ class CoinClassifierV2:
         # 預設返回（不應該到這裡）
         return 10
     
-    def classify_side(self, roi: np.ndarray, denomination: int) -> str:
+    def classify_side(self, roi: np.ndarray, denomination: int,
+                      gray_roi: Optional[np.ndarray] = None,
+                      texture_score: Optional[float] = None) -> str:
         """
         辨識硬幣正反面 (使用紋理特徵分析)
         
         Args:
             roi: 硬幣 ROI 影像
             denomination: 硬幣面額
+            gray_roi: 同一區域的灰階影像 (可由 PreparedImage.gray 裁切，省去重複轉換)
+            texture_score: 預先計算的紋理複雜度 (例如 calculate_texture_complexity_batch)
             
         Returns:
             'heads' (正面) 或 'tails' (反面)
         """
-        # 轉換為灰階
-        if len(roi.shape) == 3:
-            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = roi
-        
-        # 計算紋理複雜度
-        texture_score = self._calculate_texture_complexity(gray)
+        if texture_score is None:
+            # 轉換為灰階
+            if gray_roi is not None:
+                gray = gray_roi
+            elif len(roi.shape) == 3:
+                gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = roi
+            
+            # 計算紋理複雜度
+            texture_score = self._calculate_texture_complexity(gray)
         
         # 根據紋理複雜度判斷
         # 正面（人像）通常紋理較複雜
-        threshold = 0.45  # 降低閾值，更容易判斷為正面
-        
-        if texture_score > threshold:
+        if texture_score > self.TEXTURE_THRESHOLD:
             return 'heads'  # 正面
         else:
             return 'tails'  # 反面
@@ -125,26 +142,129 @@ class CoinClassifierV2:
         Returns:
             紋理複雜度分數 (0-1)
         """
+        # 單次梯度計算 (int16 梯度 + float32 強度)，Canny 共用同一組梯度
+        gradient_magnitude, edges = texture_maps(gray)
+        
         # 1. 邊緣密度
-        edges = cv2.Canny(gray, 50, 150)
-        edge_density = np.sum(edges > 0) / edges.size
+        edge_density = cv2.countNonZero(edges) / edges.size
         
         # 2. 標準差 (對比度)
-        std_dev = np.std(gray) / 255.0
+        std_dev = cv2.meanStdDev(gray)[1][0, 0] / 255.0
         
         # 3. 梯度強度
-        sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_magnitude = np.sqrt(sobelx**2 + sobely**2)
-        gradient_score = np.mean(gradient_magnitude) / 255.0
+        gradient_score = cv2.mean(gradient_magnitude)[0] / 255.0
+        
+        return self._combine_texture_scores(edge_density, std_dev, gradient_score)
+    
+    @staticmethod
+    def _combine_texture_scores(edge_density, std_dev, gradient_score):
+        """綜合分數 (加權平均)，純量或 NumPy 陣列皆可"""
+        return edge_density * 0.4 + std_dev * 0.3 + gradient_score * 0.3
+    
+    def calculate_texture_complexity_batch(self, stats, rects: np.ndarray) -> np.ndarray:
+        """
+        批次計算所有硬幣區域的紋理複雜度
+        
+        使用整張影像的積分表 (RegionStats)，每個硬幣只需 O(1) 查表。
+        
+        Args:
+            stats: RegionStats (例如 PreparedImage.stats)
+            rects: (N, 4) 硬幣 ROI 範圍 [x1, y1, x2, y2]
+            
+        Returns:
+            (N,) 紋理複雜度分數
+        """
+        edge_density = stats.edge_density(rects)
+        std_dev = stats.std(rects) / 255.0
+        gradient_score = stats.gradient_mean(rects) / 255.0
+        return self._combine_texture_scores(edge_density, std_dev, gradient_score)
+    
+    def calculate_texture_complexity_rois(self, gray: np.ndarray, rects: np.ndarray) -> np.ndarray:
+        """
+        逐一裁切 ROI 計算紋理複雜度 (硬幣少、積分表不划算時使用)
+        
+        Args:
+            gray: 整張灰階影像
+            rects: (N, 4) 硬幣 ROI 範圍 [x1, y1, x2, y2]
+            
+        Returns:
+            (N,) 紋理複雜度分數
+        """
+        return np.array([self._calculate_texture_complexity(gray[y1:y2, x1:x2])
+                         for x1, y1, x2, y2 in rects], dtype=np.float64)
+    
+    def classify_denomination_batch(self, radii, is_silver,
+                                    all_radii=None) -> np.ndarray:
+        """
+        批次面額分類 (與 classify_denomination_improved 相同的規則，一次向量化處理)
+        
+        Args:
+            radii: (N,) 硬幣半徑
+            is_silver: (N,) 是否為銀色
+            all_radii: 相對尺寸的參考半徑 (通常為同一張影像的所有半徑)，
+                       None 或少於 2 個時使用絕對半徑
+            
+        Returns:
+            (N,) 面額陣列
+        """
+        radii = np.asarray(radii, dtype=np.float64)
         
-        # 綜合分數 (加權平均)
-        complexity = (edge_density * 0.4 + std_dev * 0.3 + gradient_score * 0.3)
+        if all_radii is not None and len(all_radii) > 1:
+            # 相對尺寸: min / max 只計算一次
+            min_radius, max_radius = np.min(all_radii), np.max(all_radii)
+            if max_radius > min_radius:
+                relative_size = (radii - min_radius) / (max_radius - min_radius)
+            else:
+                relative_size = np.full(radii.shape, 0.5)
+            golden = self.GOLDEN_DENOMINATIONS[
+                np.searchsorted(self.RELATIVE_SIZE_BOUNDS, relative_size, side='right')]
+        else:
+            golden = self.GOLDEN_DENOMINATIONS[
+                np.searchsorted(self.ABSOLUTE_RADIUS_BOUNDS, radii, side='right')]
         
-        return complexity
+        # 銀色 → 一定是 50元
+        return np.where(np.asarray(is_silver, dtype=bool), 50, golden)
+    
+    def classify_side_batch(self, texture_scores) -> np.ndarray:
+        """
+        批次正反面判斷
+        
+        Args:
+            texture_scores: (N,) 紋理複雜度分數
+            
+        Returns:
+            (N,) 'heads' / 'tails' 字串陣列
+        """
+        heads = np.asarray(texture_scores, dtype=np.float64) > self.TEXTURE_THRESHOLD
+        return np.where(heads, 'heads', 'tails')
+    
+    def classify_coins_batch(self, radii, color_features: np.ndarray,
+                             texture_scores, all_radii=None) -> Dict[str, np.ndarray]:
+        """
+        批次完整分類 (面額 + 正反面)，取代逐一呼叫 classify_coin
+        
+        Args:
+            radii: (N,) 硬幣半徑
+            color_features: extract_color_features_batch 的結構化陣列 (需有 'is_silver' 欄位)
+            texture_scores: (N,) 紋理複雜度分數
+            all_radii: 相對尺寸的參考半徑 (選用，見 classify_denomination_batch)
+            
+        Returns:
+            {'denomination': (N,), 'side': (N,), 'confidence': (N,)}
+        """
+        denominations = self.classify_denomination_batch(
+            radii, color_features['is_silver'], all_radii
+        )
+        return {
+            'denomination': denominations,
+            'side': self.classify_side_batch(texture_scores),
+            'confidence': np.full(len(denominations), 0.85)  # 簡化版信心度
+        }
     
     def classify_coin(self, roi: np.ndarray, radius: int, 
-                     color_features: Dict, all_radii: List[int] = None) -> Dict:
+                     color_features: Dict, all_radii: List[int] = None,
+                     gray_roi: Optional[np.ndarray] = None,
+                     texture_score: Optional[float] = None) -> Dict:
         """
         完整硬幣分類 (面額 + 正反面)
         
@@ -153,6 +273,8 @@ class CoinClassifierV2:
             radius: 硬幣半徑
             color_features: 顏色特徵
             all_radii: 所有硬幣半徑列表
+            gray_roi: 同一區域的灰階影像 (選用)
+            texture_score: 預先計算的紋理複雜度 (選用)
             
         Returns:
             分類結果 {denomination, side, confidence}
@@ -161,7 +283,7 @@ class CoinClassifierV2:
         denomination = self.classify_denomination_improved(radius, color_features, all_radii)
         
         # 辨識正反面
-        side = self.classify_side(roi, denomination)
+        side = self.classify_side(roi, denomination, gray_roi, texture_score)
         
         # 計算信心度（簡化版）
         confidence = 0.85
@@ -174,11 +296,28 @@ class CoinClassifierV2:
 
 
 class CoinCounter:
-    """硬幣計數與統計"""
+    """
+    硬幣計數與統計
+    
+    以固定大小的計數陣列 counts[面額, 正反面] 累加，記憶體不隨硬幣數量成長，
+    統計為 O(1)；多個計數器 (例如不同 worker 行程) 可用 merge() 合併。
+    """
+    
+    DENOMINATIONS = np.array([1, 5, 10, 50])
+    SIDES = ('heads', 'tails')
     
     def __init__(self):
         """初始化計數器"""
-        self.coins_data = []
+        self.counts = np.zeros((len(self.DENOMINATIONS), len(self.SIDES)), dtype=np.int64)
+    
+    def _denomination_index(self, denominations) -> np.ndarray:
+        """面額 → counts 的列索引 (未知面額報錯)"""
+        denominations = np.asarray(denominations)
+        index = np.searchsorted(self.DENOMINATIONS, denominations)
+        index = np.minimum(index, len(self.DENOMINATIONS) - 1)
+        if not np.all(self.DENOMINATIONS[index] == denominations):
+            raise ValueError(f"未知的面額: {np.setdiff1d(denominations, self.DENOMINATIONS)}")
+        return index
     
     def add_coin(self, denomination: int, side: str):
         """
@@ -186,12 +325,47 @@ class CoinCounter:
         
         Args:
             denomination: 面額
-            side: 正反面
+            side: 正反面 ('heads' 以外皆視為反面)
         """
-        self.coins_data.append({
-            'denomination': denomination,
-            'side': side
-        })
+        self.counts[self._denomination_index(denomination), 0 if side == 'heads' else 1] += 1
+    
+    def add_batch(self, denominations, sides):
+        """
+        一次新增多枚硬幣 (例如 classify_coins_batch 的輸出)
+        
+        Args:
+            denominations: (N,) 面額
+            sides: (N,) 正反面字串
+        """
+        if len(denominations) == 0:
+            return
+        rows = self._denomination_index(denominations)
+        cols = (np.asarray(sides) != 'heads').astype(np.int64)
+        self.counts += np.bincount(rows * len(self.SIDES) + cols,
+                                   minlength=self.counts.size).reshape(self.counts.shape)
+    
+    def merge(self, other: 'CoinCounter') -> 'CoinCounter':
+        """
+        合併另一個計數器的結果 (就地累加)
+        
+        Args:
+            other: 另一個 CoinCounter
+            
+        Returns:
+            self (可串接)
+        """
+        self.counts += other.counts
+        return self
+    
+    @property
+    def total_count(self) -> int:
+        """硬幣總數"""
+        return int(self.counts.sum())
+    
+    @property
+    def total_value(self) -> int:
+        """總金額"""
+        return int(self.counts.sum(axis=1) @ self.DENOMINATIONS)
     
     def get_statistics(self) -> Dict:
         """
@@ -201,41 +375,19 @@ class CoinCounter:
             統計結果 {total_value, total_count, breakdown}
         """
         # 統計各面額數量
-        breakdown = {
-            1: {'total': 0, 'heads': 0, 'tails': 0},
-            5: {'total': 0, 'heads': 0, 'tails': 0},
-            10: {'total': 0, 'heads': 0, 'tails': 0},
-            50: {'total': 0, 'heads': 0, 'tails': 0}
-        }
-        
-        for coin in self.coins_data:
-            denom = coin['denomination']
-            side = coin['side']
-            
-            breakdown[denom]['total'] += 1
-            if side == 'heads':
-                breakdown[denom]['heads'] += 1
-            else:
-                breakdown[denom]['tails'] += 1
-        
-        # 計算總金額
-        total_value = sum(
-            denom * data['total'] 
-            for denom, data in breakdown.items()
-        )
-        
-        # 計算總數量
-        total_count = len(self.coins_data)
+        breakdown = {}
+        for denom, (heads, tails) in zip(self.DENOMINATIONS.tolist(), self.counts.tolist()):
+            breakdown[denom] = {'total': heads + tails, 'heads': heads, 'tails': tails}
         
         return {
-            'total_value': total_value,
-            'total_count': total_count,
+            'total_value': self.total_value,
+            'total_count': self.total_count,
             'breakdown': breakdown
         }
     
     def reset(self):
         """重置計數器"""
-        self.coins_data = []
+        self.counts[:] = 0
     
     def format_summary(self) -> str:
         """
@@ -273,4 +425,9 @@ if __name__ == "__main__":
     counter.add_coin(5, 'heads')
     counter.add_coin(1, 'heads')
     
+    # 批次新增並合併另一個計數器
+    other = CoinCounter()
+    other.add_batch(np.array([50, 10, 1]), np.array(['tails', 'heads', 'tails']))
+    counter.merge(other)
+    
     print(counter.format_summary())
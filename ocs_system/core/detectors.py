@@ -0,0 +1,172 @@
+"""
+Detector Registry Module
+硬幣檢測器註冊表 - 以名稱選擇檢測策略
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .image_processor import ImageInput, ImageProcessor, PreparedImage
+from utils.spatial_index import merge_circles
+
+# 檢測函式: (processor, image, params) -> 硬幣列表 [{x, y, radius, ...}, ...]
+DetectorFunc = Callable[[ImageProcessor, ImageInput, Optional[Dict]], List[Dict]]
+
+
+class Detector:
+    """已註冊的檢測器"""
+
+    def __init__(self, name: str, func: DetectorFunc, description: str = '',
+                 inputs: Sequence[str] = ()):
+        """
+        Args:
+            name: 檢測器名稱
+            func: 檢測函式
+            description: 說明文字
+            inputs: 檢測時讀取的 PreparedImage 預處理結果 (例如 'contours')
+        """
+        self.name = name
+        self.func = func
+        self.description = description
+        self.inputs = tuple(inputs)
+
+    def preprocess(self, processor: ImageProcessor, image: ImageInput,
+                   scale: float = 1.0) -> PreparedImage:
+        """
+        預先計算檢測器需要的預處理結果 (供分段計時，之後的檢測直接使用快取)
+
+        Args:
+            processor: ImageProcessor
+            image: 原始 BGR 影像或 PreparedImage
+            scale: 像素參數縮放比例
+
+        Returns:
+            PreparedImage
+        """
+        prepared = processor.prepare(image, scale=scale)
+        for name in self.inputs:
+            getattr(prepared, name)
+        return prepared
+
+    def __call__(self, processor: ImageProcessor, image: ImageInput,
+                 params: Optional[Dict] = None) -> List[Dict]:
+        return self.func(processor, image, params)
+
+    def __repr__(self) -> str:
+        return f"Detector({self.name!r})"
+
+
+_DETECTORS: Dict[str, Detector] = {}
+
+
+def register_detector(name: str, description: str = '', inputs: Sequence[str] = ()):
+    """
+    註冊檢測器的裝飾器
+
+    Args:
+        name: 檢測器名稱 (重複註冊會覆蓋舊的)
+        description: 說明文字
+        inputs: 檢測時讀取的 PreparedImage 預處理結果
+
+    用法:
+        @register_detector('my_detector', '自訂檢測器')
+        def detect(processor, image, params=None):
+            ...
+    """
+    def decorator(func: DetectorFunc) -> DetectorFunc:
+        _DETECTORS[name] = Detector(name, func, description, inputs)
+        return func
+    return decorator
+
+
+def get_detector(name: str) -> Detector:
+    """
+    依名稱取得檢測器
+
+    Raises:
+        ValueError: 名稱未註冊
+    """
+    if name not in _DETECTORS:
+        raise ValueError(f"未知的檢測器: {name} (可用: {', '.join(available_detectors())})")
+    return _DETECTORS[name]
+
+
+def available_detectors() -> List[str]:
+    """已註冊的檢測器名稱 (依註冊順序)"""
+    return list(_DETECTORS)
+
+
+def detect(processor: ImageProcessor, image: ImageInput, name: str = 'hybrid',
+           params: Optional[Dict] = None) -> List[Dict]:
+    """
+    以指定的檢測器檢測硬幣
+
+    Args:
+        processor: ImageProcessor
+        image: 原始 BGR 影像或 PreparedImage
+        name: 檢測器名稱
+        params: 傳給檢測器的參數覆寫 (選用)
+
+    Returns:
+        硬幣資訊列表
+    """
+    return get_detector(name)(processor, image, params)
+
+
+# ---------------------------------------------------------------- 內建檢測器
+
+@register_detector('contours', 'Otsu 二值化 + 輪廓圓形度過濾',
+                   ('contours',))
+def _detect_contours(processor, image, params=None):
+    return processor.detect_coins_contours(image, params)
+
+
+@register_detector('hough', 'HoughCircles (HOUGH_GRADIENT)',
+                   ('hough_blurred',))
+def _detect_hough(processor, image, params=None):
+    return processor.detect_coins_hough(image, params)
+
+
+@register_detector('hough_alt', 'HoughCircles (HOUGH_GRADIENT_ALT)',
+                   ('hough_blurred',))
+def _detect_hough_alt(processor, image, params=None):
+    return processor.detect_coins_hough_alt(image, params)
+
+
+@register_detector('accumulator', '快取的 NumPy Hough 累加器',
+                   ('hough_blurred',))
+def _detect_accumulator(processor, image, params=None):
+    return processor.detect_coins_accumulator(image, params)
+
+
+@register_detector('hybrid', 'Contour + HOUGH_GRADIENT 空間索引融合',
+                   ('contours', 'hough_blurred'))
+def _detect_hybrid(processor, image, params=None):
+    params = params or {}
+    return processor.detect_coins_hybrid(image, params.get('hough'), params.get('contour'))
+
+
+@register_detector('hybrid_alt', 'Contour + HOUGH_GRADIENT_ALT 空間索引融合',
+                   ('contours', 'hough_blurred'))
+def _detect_hybrid_alt(processor, image, params=None):
+    params = params or {}
+    prepared = processor.prepare(image)
+    return merge_circles(
+        {'contour': processor.detect_coins_contours(prepared, params.get('contour')),
+         'hough_alt': processor.detect_coins_hough_alt(prepared, params.get('hough'))},
+        center_tolerance=processor.merge_center_tolerance,
+        radius_ratio=processor.merge_radius_ratio
+    )
+
+
+@register_detector('pyramid', '縮小影像 HoughCircles + 全解析度精修')
+def _detect_pyramid(processor, image, params=None):
+    # 金字塔模式自行縮放原始影像
+    return processor.detect_coins_pyramid(processor.prepare(image).image, **(params or {}))
+
+
+@register_detector('tiled', '重疊分塊平行 hybrid 檢測')
+def _detect_tiled(processor, image, params=None):
+    # 分塊模式在原始影像上切塊，各分塊自行預處理
+    prepared = processor.prepare(image)
+    kwargs = dict({'scale': prepared.scale}, **(params or {}))
+    return processor.detect_coins_tiled(prepared.image, **kwargs)
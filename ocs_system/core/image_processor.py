@@ -6,7 +6,408 @@ Image Processor Module
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import List, Tuple, Dict, Optional, Union
+
+from .region_stats import RegionStats, rect_areas
+from utils.spatial_index import CircleGridIndex, merge_circles
+
+# Contour 檢測閉運算使用的結構元素
+CLOSE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+
+class FrameWorkspace:
+    """
+    同尺寸連續影格的預配置緩衝區
+    
+    緩衝區依 (名稱, 尺寸, 型別) 保存並重複使用，相機或批次處理時
+    每張影格不再配置新的灰階、模糊、二值化等陣列。
+    
+    注意: 由工作區建立的 PreparedImage 結果會在下一張同尺寸影格時被覆寫，
+    只適用於逐張依序處理；需要保留結果時請自行 copy()。
+    """
+    
+    def __init__(self):
+        self._buffers = {}
+    
+    def buffer(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        取得 (必要時配置) 指定的緩衝區
+        
+        Args:
+            name: 緩衝區名稱
+            shape: 陣列尺寸
+            dtype: 資料型別
+        """
+        key = (name, tuple(shape), np.dtype(dtype))
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+    
+    @property
+    def nbytes(self) -> int:
+        """目前保留的緩衝區總大小 (bytes)"""
+        return sum(buf.nbytes for buf in self._buffers.values())
+    
+    def clear(self):
+        """釋放所有緩衝區"""
+        self._buffers.clear()
+
+
+class PreparedImage:
+    """
+    單張影像的預處理快取
+
+    灰階、模糊、CLAHE、Otsu 二值化、Hough 模糊與 HSV 皆在第一次存取時
+    計算，之後重複使用；所有檢測器與特徵提取共用同一份結果，避免
+    混合模式對同一張大圖重複做兩次預處理。
+    """
+
+    def __init__(self, image: np.ndarray, clahe=None, scale: float = 1.0,
+                 workspace: Optional[FrameWorkspace] = None):
+        """
+        Args:
+            image: 原始 BGR 影像
+            clahe: 共用的 CLAHE 物件 (None 則使用預設參數建立)
+            scale: 像素參數縮放比例 (檢測器的半徑/面積門檻會乘上此值，
+                   用於縮小後的金字塔層或不同解析度的輸入)
+            workspace: 預配置緩衝區 (None 則每次配置新陣列)
+        """
+        self.image = image
+        self._clahe = clahe
+        self.scale = scale
+        self.workspace = workspace
+        # Hough 累加器快取 {(dp, param1, minRadius, maxRadius): HoughAccumulator}
+        self.hough_accumulators: Dict[tuple, 'HoughAccumulator'] = {}
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.image.shape
+
+    def with_clahe(self, clahe) -> 'PreparedImage':
+        """
+        以另一個 CLAHE 物件建立新的快取 (例如調整對比度時)
+
+        與 CLAHE 無關且已計算的階段 (灰階、模糊、HSV、區域統計) 直接沿用，
+        只有 CLAHE 之後的階段 (enhanced、binary、hough_blurred ...) 會重新計算。
+        新快取不使用工作區，避免覆寫原本的結果。
+
+        Args:
+            clahe: 新的 CLAHE 物件
+
+        Returns:
+            新的 PreparedImage
+        """
+        derived = PreparedImage(self.image, clahe=clahe, scale=self.scale)
+        for name in ('gray', 'blurred', 'hsv', 'stats'):
+            if name in self.__dict__:
+                derived.__dict__[name] = self.__dict__[name]
+        return derived
+
+    def buffer(self, name: str, channels: int = 1) -> Optional[np.ndarray]:
+        """
+        取得與影像同尺寸的工作區緩衝區 (作為 OpenCV 的 dst=)，沒有工作區時返回 None
+        
+        Args:
+            name: 緩衝區名稱
+            channels: 通道數
+        """
+        if self.workspace is None:
+            return None
+        h, w = self.image.shape[:2]
+        return self.workspace.buffer(name, (h, w) if channels == 1 else (h, w, channels))
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        """灰階影像"""
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY, dst=self.buffer('gray'))
+
+    @cached_property
+    def blurred(self) -> np.ndarray:
+        """高斯模糊 (5x5) 去噪"""
+        return cv2.GaussianBlur(self.gray, (5, 5), 0, dst=self.buffer('blurred'))
+
+    @cached_property
+    def enhanced(self) -> np.ndarray:
+        """CLAHE 對比度增強"""
+        if self._clahe is None:
+            self._clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        return self._clahe.apply(self.blurred, dst=self.buffer('enhanced'))
+
+    @cached_property
+    def binary(self) -> np.ndarray:
+        """Otsu 二值化 (Contour 檢測用)"""
+        _, binary = cv2.threshold(self.enhanced, 0, 255,
+                                  cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                  dst=self.buffer('binary'))
+        return binary
+
+    @cached_property
+    def closed(self) -> np.ndarray:
+        """二值化後的閉運算 (填補硬幣內的空洞)"""
+        return cv2.morphologyEx(self.binary, cv2.MORPH_CLOSE, CLOSE_KERNEL,
+                                dst=self.buffer('closed'), iterations=2)
+
+    @cached_property
+    def contours(self) -> list:
+        """閉運算結果的外部輪廓"""
+        contours, _ = cv2.findContours(self.closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    @cached_property
+    def hough_blurred(self) -> np.ndarray:
+        """HoughCircles 用的額外高斯模糊 (9x9)"""
+        return cv2.GaussianBlur(self.enhanced, (9, 9), 2, dst=self.buffer('hough_blurred'))
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        """HSV 色彩空間影像 (顏色特徵用)"""
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV, dst=self.buffer('hsv', 3))
+
+    @cached_property
+    def stats(self) -> RegionStats:
+        """區域統計服務 (積分影像，任意硬幣區域 O(1) 查詢)"""
+        return RegionStats(self)
+
+
+ImageInput = Union[np.ndarray, PreparedImage]
+
+# 批次顏色特徵 (extract_color_features_batch) 的欄位
+COLOR_FEATURE_DTYPE = np.dtype([
+    ('mean_hue', np.float64),
+    ('mean_saturation', np.float64),
+    ('mean_value', np.float64),
+    ('mean_b', np.float64),
+    ('mean_g', np.float64),
+    ('mean_r', np.float64),
+    ('is_golden', np.bool_),
+    ('is_silver', np.bool_)
+])
+
+
+# 精簡的硬幣辨識紀錄 (每枚硬幣 46 bytes，取代每枚硬幣一個 dict)
+COIN_RECORD_DTYPE = np.dtype([
+    ('x', np.int32),
+    ('y', np.int32),
+    ('radius', np.int32),
+    ('area', np.float32),           # Contour 面積 (Hough 檢測為 NaN)
+    ('circularity', np.float32),    # Contour 圓形度 (Hough 檢測為 NaN)
+    ('denomination', np.int16),
+    ('side', 'U5'),
+    ('confidence', np.float32)
+])
+
+
+def coin_records(coins) -> np.ndarray:
+    """
+    將檢測結果轉為 COIN_RECORD_DTYPE 結構化陣列 (分類欄位待填入)
+    
+    Args:
+        coins: 硬幣列表 [{x, y, radius, [area, circularity]}, ...]
+        
+    Returns:
+        (N,) 結構化陣列
+    """
+    records = np.zeros(len(coins), dtype=COIN_RECORD_DTYPE)
+    if len(coins):
+        circles = circles_to_array(coins)
+        records['x'], records['y'], records['radius'] = circles.T
+        records['area'] = [coin.get('area', np.nan) for coin in coins]
+        records['circularity'] = [coin.get('circularity', np.nan) for coin in coins]
+    return records
+
+
+def coin_records_to_dicts(records: np.ndarray) -> List[Dict]:
+    """
+    將 COIN_RECORD_DTYPE 結構化陣列轉為 JSON 可序列化的字典列表
+    (float32 欄位取到小數 4 位，NaN 轉為 None)
+    
+    Args:
+        records: (N,) 結構化陣列
+    """
+    def convert(value):
+        if isinstance(value, float):
+            return None if np.isnan(value) else round(value, 4)
+        return value
+    
+    return [{name: convert(value) for name, value in zip(records.dtype.names, record)}
+            for record in records.tolist()]
+
+
+def circles_to_array(coins) -> np.ndarray:
+    """
+    將硬幣列表轉為 (N, 3) int64 陣列 [x, y, radius]
+    
+    Args:
+        coins: 硬幣列表 [{x, y, radius}, ...] 或 (N, 3) 陣列
+    """
+    if isinstance(coins, np.ndarray):
+        return coins.reshape(-1, 3).astype(np.int64)
+    return np.array([(c['x'], c['y'], c['radius']) for c in coins], dtype=np.int64).reshape(-1, 3)
+
+
+def color_features_to_dict(record) -> Dict:
+    """
+    將批次顏色特徵的單筆資料轉為 extract_color_features 的字典格式
+    
+    Args:
+        record: COLOR_FEATURE_DTYPE 結構化陣列中的一筆
+    """
+    return {
+        'mean_hue': float(record['mean_hue']),
+        'mean_saturation': float(record['mean_saturation']),
+        'mean_value': float(record['mean_value']),
+        'mean_bgr': (float(record['mean_b']), float(record['mean_g']), float(record['mean_r'])),
+        'is_golden': bool(record['is_golden']),
+        'is_silver': bool(record['is_silver'])
+    }
+
+
+class HoughAccumulator:
+    """
+    純 NumPy 的 Hough 梯度法圓心累加器
+
+    沿每個 Canny 邊緣點的梯度方向 (正反兩側) 對 [min_radius, max_radius]
+    範圍內的圓心投票，投票以 np.bincount 向量化累加並保留下來。
+    之後不同 param2 / minDist 的查詢只需在快取的區域極大值上篩選，
+    不必重新執行整個轉換；半徑估計結果也依圓心快取。
+    """
+
+    # 區域極大值至少要有的票數 (低於此值的峰值不保留)
+    MIN_PEAK_VOTES = 10
+    # 每批投票的邊緣點數 × 半徑數上限 (限制暫存陣列大小)
+    VOTE_BATCH = 1 << 23
+
+    def __init__(self, blurred: np.ndarray, dp: float = 1, param1: float = 60,
+                 min_radius: int = 30, max_radius: int = 95):
+        """
+        Args:
+            blurred: 已模糊的灰階影像 (與 cv2.HoughCircles 的輸入相同)
+            dp: 累加器解析度的反比 (1 為與影像同解析度)
+            param1: Canny 高閾值 (低閾值為其一半)
+            min_radius, max_radius: 投票的半徑範圍 (像素)
+        """
+        self.dp = max(1.0, float(dp))
+        self.min_radius = max(1, int(min_radius))
+        self.max_radius = max(self.min_radius, int(max_radius))
+        h, w = blurred.shape[:2]
+        self.acc_shape = (int(h / self.dp) + 1, int(w / self.dp) + 1)
+
+        # 邊緣點與梯度方向 (np.nonzero 依列掃描，edge_y 已排序)
+        edges = cv2.Canny(blurred, max(1, param1 // 2), param1)
+        dx = cv2.Sobel(blurred, cv2.CV_16S, 1, 0)
+        dy = cv2.Sobel(blurred, cv2.CV_16S, 0, 1)
+        ys, xs = np.nonzero(edges)
+        gx = dx[ys, xs].astype(np.float32)
+        gy = dy[ys, xs].astype(np.float32)
+        mag = np.hypot(gx, gy)
+        valid = mag > 0
+        self.edge_x = xs[valid].astype(np.int32)
+        self.edge_y = ys[valid].astype(np.int32)
+        self.votes = self._vote(gx[valid] / mag[valid], gy[valid] / mag[valid])
+
+        # 區域極大值 (3x3)，依票數遞減排列
+        votes = self.votes.astype(np.float32)  # cv2.dilate 不支援 int32
+        peak_mask = (votes >= cv2.dilate(votes, np.ones((3, 3), np.uint8))) & \
+                    (self.votes >= self.MIN_PEAK_VOTES)
+        py, px = np.nonzero(peak_mask)
+        peak_votes = self.votes[py, px]
+        order = np.argsort(-peak_votes, kind='stable')
+        self.peak_votes = peak_votes[order]
+        self.peak_x = px[order] * self.dp
+        self.peak_y = py[order] * self.dp
+        self._radius_cache: Dict[int, Optional[Tuple[int, float]]] = {}
+
+    def _vote(self, ux: np.ndarray, uy: np.ndarray) -> np.ndarray:
+        """沿梯度方向對所有圓心投票，返回 int32 累加器"""
+        acc_h, acc_w = self.acc_shape
+        # 外圍多留一圈格子收集落在影像外的票 (免去逐票的邊界遮罩)，最後裁掉
+        pad_w = acc_w + 2
+        votes = np.zeros((acc_h + 2) * pad_w, dtype=np.int32)
+        radii = np.arange(self.min_radius, self.max_radius + 1, self.dp, dtype=np.float32)
+        batch = max(1, self.VOTE_BATCH // len(radii))
+        inv_dp = np.float32(1.0 / self.dp)
+
+        for start in range(0, len(self.edge_x), batch):
+            end = start + batch
+            # 四捨五入到最近的累加器格子 (格子 i 的中心為 i * dp)，再平移一格
+            x = self.edge_x[start:end, None] * inv_dp + np.float32(1.5)
+            y = self.edge_y[start:end, None] * inv_dp + np.float32(1.5)
+            ox = ux[start:end, None] * (radii * inv_dp)
+            oy = uy[start:end, None] * (radii * inv_dp)
+            for sign in (1, -1):
+                cx = np.clip(x + sign * ox, 0, acc_w + 1).astype(np.int32)
+                cy = np.clip(y + sign * oy, 0, acc_h + 1).astype(np.int32)
+                cy *= pad_w
+                cy += cx
+                np.add(votes, np.bincount(cy.ravel(), minlength=votes.size),
+                       out=votes, casting='unsafe')
+
+        return votes.reshape(acc_h + 2, pad_w)[1:-1, 1:-1].copy()
+
+    def estimate_radius(self, index: int) -> Optional[Tuple[int, float]]:
+        """
+        估計第 index 個峰值的半徑 (結果快取)
+
+        以圓心到附近邊緣點的距離直方圖 (±1 像素平滑) 選出覆蓋率
+        (邊緣點數 / 圓周長) 最高的半徑。
+
+        Returns:
+            (半徑, 覆蓋率)，範圍內沒有邊緣點時返回 None
+        """
+        if index in self._radius_cache:
+            return self._radius_cache[index]
+
+        cx, cy = self.peak_x[index], self.peak_y[index]
+        r_max = self.max_radius
+        lo, hi = np.searchsorted(self.edge_y, [cy - r_max, cy + r_max + 1])
+        ex = self.edge_x[lo:hi]
+        near = np.abs(ex - cx) <= r_max
+        dist = np.hypot(ex[near] - cx, self.edge_y[lo:hi][near] - cy)
+        dist = np.rint(dist).astype(np.int64)
+        dist = dist[(dist >= self.min_radius) & (dist <= r_max)]
+
+        result = None
+        if len(dist):
+            hist = np.bincount(dist, minlength=r_max + 2).astype(np.float64)
+            support = hist[:-2] + hist[1:-1] + hist[2:]  # support[r-1] = hist[r-1..r+1]
+            radii = np.arange(1, r_max + 1)
+            coverage = support / (2 * np.pi * radii)
+            coverage[:self.min_radius - 1] = 0
+            best = int(np.argmax(coverage))
+            result = (int(radii[best]), float(coverage[best]))
+        self._radius_cache[index] = result
+        return result
+
+    def circles(self, param2: float, min_dist: float,
+                min_coverage: float = 0.25) -> List[Tuple[int, int, int]]:
+        """
+        以快取的累加器擷取圓
+
+        Args:
+            param2: 圓心票數門檻
+            min_dist: 圓心之間的最小距離
+            min_coverage: 半徑上的最低邊緣覆蓋率 (0~1)
+
+        Returns:
+            [(x, y, radius), ...]，依票數遞減排列
+        """
+        count = int(np.searchsorted(-self.peak_votes, -param2, side='right'))
+        index = CircleGridIndex(min_dist)
+        found = []
+        for i in range(count):
+            x, y = self.peak_x[i], self.peak_y[i]
+            if index.query(x, y, min_dist - 1e-6):
+                continue
+            estimate = self.estimate_radius(i)
+            if estimate is None or estimate[1] < min_coverage:
+                continue
+            index.insert(x, y, estimate[0])
+            found.append((int(round(x)), int(round(y)), estimate[0]))
+        return found
 
 
 class ImageProcessor:
@@ -16,6 +417,118 @@ class ImageProcessor:
         """初始化影像處理器"""
         self.debug_mode = False
         self.target_width = 1920  # 標準解析度寬度
+        
+        # HoughCircles 參數 (優化後生產環境參數，以 reference_width 寬度的照片為準)
+        self.hough_params = {
+            'dp': 1,
+            'minDist': 80,      # 硬幣之間的最小距離
+            'param1': 60,       # Canny 邊緣檢測高閾值
+            'param2': 35,       # 圓心檢測閾值 (生產環境推薦值)
+            'minRadius': 30,    # 最小半徑
+            'maxRadius': 95     # 最大半徑
+        }
+        # HOUGH_GRADIENT_ALT 參數 (param2 為圓的完美度 0~1，越接近 1 越嚴格)
+        self.hough_alt_params = {
+            'dp': 1.5,
+            'minDist': 80,
+            'param1': 300,      # Scharr 梯度的 Canny 高閾值
+            'param2': 0.9,
+            'minRadius': 30,
+            'maxRadius': 95
+        }
+        self.reference_width = 4032  # 參數調校時的照片寬度 (12MP 手機照片)
+        
+        # Contour 檢測的過濾門檻 (同樣以 reference_width 寬度的照片為準)
+        self.contour_params = {
+            'min_area': 800,            # 稍微放寬 (1000 → 800)
+            'max_area_ratio': 0.3,      # 相對於影像面積
+            'min_radius': 20,
+            'max_radius': 150,
+            'min_circularity': 0.80,    # 0.85 → 0.80
+            'min_aspect': 0.8,
+            'max_aspect': 1.2
+        }
+        # 是否在 Contour 檢測結果中保留完整輪廓點 (每個硬幣數 KB，預設不保留)
+        self.keep_contours = False
+        
+        # 金字塔模式: 工作層上最小硬幣半徑 (像素)，決定縮小比例
+        self.pyramid_min_radius = 15
+        # 金字塔模式: 全解析度精修時的半徑容許誤差 (比例)
+        self.pyramid_refine_tolerance = 0.15
+        
+        # 批次顏色特徵: ROI 總面積超過影像面積的此比例時改用整張影像的積分影像
+        self.integral_area_ratio = 1.0
+        
+        # 混合模式融合: 圓心距離容許值 (相對半徑) 與半徑相似度門檻
+        self.merge_center_tolerance = 0.5
+        self.merge_radius_ratio = 0.75
+        
+        # 分塊模式: 預設分塊邊長 (像素) 與執行緒數 (None 為 CPU 核心數)
+        self.tile_size = 2048
+        self.tile_workers = None
+        
+        # 累加器模式: 半徑上的最低邊緣覆蓋率，以及每張影像保留的累加器數量
+        self.accumulator_min_coverage = 0.25
+        self.accumulator_cache_size = 4
+        
+        # 預配置緩衝區 (enable_workspace 啟用，適用於同尺寸連續影格)
+        self.workspace: Optional[FrameWorkspace] = None
+        
+        # 共用的 OpenCV 物件 (避免每張影像重新建立)
+        self.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        self.close_kernel = CLOSE_KERNEL
+    
+    def prepare(self, image: ImageInput, scale: float = 1.0) -> PreparedImage:
+        """
+        建立 (或沿用) 影像預處理快取
+        
+        Args:
+            image: 原始 BGR 影像或已建立的 PreparedImage
+            scale: 像素參數縮放比例 (僅在建立新的 PreparedImage 時使用)
+            
+        Returns:
+            PreparedImage 物件
+        """
+        if isinstance(image, PreparedImage):
+            return image
+        return PreparedImage(image, clahe=self.clahe, scale=scale, workspace=self.workspace)
+    
+    def enable_workspace(self, enabled: bool = True):
+        """
+        啟用 / 停用預配置緩衝區模式
+        
+        啟用後 prepare() 建立的影像與閉運算結果都寫入重複使用的緩衝區，
+        相機或批次處理同尺寸影格時幾乎不再配置記憶體。
+        前一張影格的預處理結果會被下一張覆寫。
+        
+        Args:
+            enabled: 是否啟用
+        """
+        self.workspace = FrameWorkspace() if enabled else None
+    
+    def update_params(self, overrides: Dict[str, Dict]):
+        """
+        覆寫檢測器參數 (例如合成場景的 Hough 半徑範圍)
+        
+        Args:
+            overrides: {'hough_params' / 'hough_alt_params' / 'contour_params': {參數: 值}}
+        """
+        for group, params in overrides.items():
+            if group not in ('hough_params', 'hough_alt_params', 'contour_params'):
+                raise ValueError(f"未知的參數組: {group}")
+            getattr(self, group).update(params)
+    
+    def resolution_scale(self, image_width: int) -> float:
+        """
+        依影像寬度換算參數縮放比例 (相對於 reference_width)
+        
+        Args:
+            image_width: 影像寬度 (像素)
+            
+        Returns:
+            半徑等像素參數的縮放比例
+        """
+        return image_width / self.reference_width
     
     def resize_to_standard(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
         """
@@ -37,123 +550,149 @@ class ImageProcessor:
             return resized, scale
         return image, 1.0
     
-    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    def preprocess_image(self, image: ImageInput) -> np.ndarray:
         """
-        影像預處理
+        影像預處理 (灰階 → 模糊(5,5) → CLAHE)
         
         Args:
-            image: 原始 BGR 影像
+            image: 原始 BGR 影像或 PreparedImage
             
         Returns:
             處理後的灰階影像
         """
-        # 轉換為灰階
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # 高斯模糊去噪
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        return self.prepare(image).enhanced
+    
+    def detect_coins_contours(self, image: ImageInput, params: Optional[Dict] = None) -> List[Dict]:
+        """
+        使用 Contour Detection 檢測硬幣
         
-        # 對比度增強 (CLAHE) - 提高 clipLimit 以增強對比度
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(blurred)
+        Args:
+            image: 原始 BGR 影像或 PreparedImage
+            params: 覆寫 self.contour_params 的參數 (選用)
+            
+        Returns:
+            硬幣資訊列表 [{x, y, radius, area, circularity}, ...]
+        """
+        # 預處理 (共用快取的 Otsu 二值化 → 閉運算 → 外部輪廓)
+        prepared = self.prepare(image)
         
-        return enhanced
+        image_area = prepared.shape[0] * prepared.shape[1]
+        return self.filter_contours(prepared.contours, image_area, prepared.scale, params)
     
-    def detect_coins_contours(self, image: np.ndarray) -> List[Dict]:
+    def filter_contours(self, contours, image_area: float, scale: float = 1.0,
+                        params: Optional[Dict] = None) -> List[Dict]:
         """
-        使用 Contour Detection 檢測硬幣
+        批次過濾輪廓，只保留接近圓形的物體 (硬幣)
+        
+        分兩階段：先以 NumPy 對所有輪廓一次計算點數、外接矩形、面積與周長
+        (鞋帶公式，與 cv2.contourArea / cv2.arcLength 相同)，剔除大部分雜訊；
+        只有通過的輪廓才逐一計算最小外接圓。
         
         Args:
-            image: 原始 BGR 影像
+            contours: cv2.findContours 的輪廓列表
+            image_area: 影像面積 (過濾過大輪廓用)
+            scale: 像素參數縮放比例
+            params: 覆寫 self.contour_params 的參數 (選用)
             
         Returns:
-            硬幣資訊列表 [{x, y, radius, contour}, ...]
+            硬幣資訊列表 [{x, y, radius, area, circularity}, ...]
+            (self.keep_contours 為 True 時另含 contour)
         """
-        # 預處理
-        gray = self.preprocess_image(image)
+        cp = dict(self.contour_params, **(params or {}))
+        s = scale
+        min_area = cp['min_area'] * s * s
+        max_area = image_area * cp['max_area_ratio']
+        min_radius, max_radius = cp['min_radius'] * s, cp['max_radius'] * s
+        if len(contours) == 0:
+            return []
         
-        # 二值化
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # 所有輪廓的點串接成一個陣列，以 starts 標記每個輪廓的起點
+        counts = np.fromiter(map(len, contours), dtype=np.int64, count=len(contours))
+        points = np.concatenate(contours).reshape(-1, 2)
+        starts = np.zeros(len(contours), dtype=np.int64)
+        np.cumsum(counts[:-1], out=starts[1:])
         
-        # 形態學操作 - 閉運算填補空洞
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        closed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=2)
+        # 第一階段：外接矩形 (與 cv2.boundingRect 相同) 的快速剔除
+        px, py = points[:, 0], points[:, 1]
+        bw = np.maximum.reduceat(px, starts) - np.minimum.reduceat(px, starts) + 1
+        bh = np.maximum.reduceat(py, starts) - np.minimum.reduceat(py, starts) + 1
+        aspect_ratio = bw / bh
+        keep = (aspect_ratio >= cp['min_aspect']) & (aspect_ratio <= cp['max_aspect'])  # 長寬比 (圓形應接近 1:1)
+        keep &= bw * bh >= min_area                                      # 矩形面積不足
+        keep &= np.hypot(bw, bh) / 2 >= min_radius                       # 外接圓不可能達到最小半徑
+        keep &= (np.maximum(bw, bh) - 1) / 2 <= max_radius               # 外接圓必定超過最大半徑
+        keep &= counts >= 3
+        candidates = np.flatnonzero(keep)
+        if candidates.size == 0:
+            return []
         
-        # 尋找輪廓
-        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # 只取候選輪廓的點，計算面積與周長 (鞋帶公式，與 cv2.contourArea / cv2.arcLength 相同)
+        points = points[np.repeat(keep, counts)]
+        counts = counts[candidates]
+        px, py = points[:, 0].astype(np.int64), points[:, 1].astype(np.int64)
+        starts = np.zeros(len(candidates), dtype=np.int64)
+        np.cumsum(counts[:-1], out=starts[1:])
+        nxt = np.arange(1, len(points) + 1)
+        nxt[starts + counts - 1] = starts  # 最後一點接回起點
+        area = np.abs(np.add.reduceat(px * py[nxt] - px[nxt] * py, starts)) / 2.0
+        perimeter = np.add.reduceat(np.hypot(px[nxt] - px, py[nxt] - py), starts)
         
-        coins = []
-        image_area = image.shape[0] * image.shape[1]
+        keep = (area >= min_area) & (area <= max_area)                   # 雜訊或異常
+        keep &= perimeter > 0
+        circularity = np.zeros_like(area)
+        np.divide(4 * np.pi * area, perimeter ** 2, out=circularity, where=perimeter > 0)
+        keep &= circularity >= cp['min_circularity']                     # 圓形度門檻
         
-        for contour in contours:
-            # 計算面積
-            area = cv2.contourArea(contour)
-            
-            # 過濾太小或太大的輪廓 (雜訊或異常)
-            if area < 800 or area > image_area * 0.3:  # 稍微放寬 (1000 → 800)
-                continue
-            
-            # 計算最小外接圓
+        # 第二階段：僅對倖存者計算最小外接圓
+        coins = []
+        for k in np.flatnonzero(keep):
+            contour = contours[candidates[k]]
             (x, y), radius = cv2.minEnclosingCircle(contour)
             
             # 半徑範圍過濾
-            if radius < 20 or radius > 150:
-                continue
-            
-            # 計算圓形度 (circularity)
-            perimeter = cv2.arcLength(contour, True)
-            if perimeter == 0:
-                continue
-            circularity = 4 * np.pi * area / (perimeter ** 2)
-            
-            # 圓形度門檻 (稍微放寬)
-            if circularity < 0.80:  # 0.85 → 0.80
-                continue
-            
-            # 長寬比檢查 (圓形應接近 1:1)
-            bx, by, bw, bh = cv2.boundingRect(contour)
-            aspect_ratio = float(bw) / bh if bh > 0 else 0
-            if aspect_ratio < 0.8 or aspect_ratio > 1.2:
+            if radius < min_radius or radius > max_radius:
                 continue
             
-            # 只保留接近圓形的物體 (硬幣)
-            coins.append({
+            coin = {
                 'x': int(x),
                 'y': int(y),
                 'radius': int(radius),
-                'area': area,
-                'contour': contour,
-                'circularity': circularity
-            })
+                'area': float(area[k]),
+                'circularity': float(circularity[k])
+            }
+            if self.keep_contours:
+                coin['contour'] = contour
+            coins.append(coin)
         
         return coins
     
-    def detect_coins_hough(self, image: np.ndarray) -> List[Dict]:
+    def detect_coins_hough(self, image: ImageInput, params: Optional[Dict] = None) -> List[Dict]:
         """
         使用 HoughCircles 檢測硬幣
         
         Args:
-            image: 原始 BGR 影像
+            image: 原始 BGR 影像或 PreparedImage
+            params: 覆寫 self.hough_params 的參數 (選用)
             
         Returns:
             硬幣資訊列表 [{x, y, radius}, ...]
         """
-        # 預處理
-        gray = self.preprocess_image(image)
-        
-        # 額外的高斯模糊（重要！）
-        blurred = cv2.GaussianBlur(gray, (9, 9), 2)
+        # 預處理 + 額外的高斯模糊（重要！）
+        prepared = self.prepare(image)
+        blurred = prepared.hough_blurred
         
-        # Hough Circle Transform (優化後生產環境參數)
+        # Hough Circle Transform (優化後生產環境參數，像素參數依 scale 換算)
+        hp = dict(self.hough_params, **(params or {}))
+        s = prepared.scale
         circles = cv2.HoughCircles(
             blurred,
             cv2.HOUGH_GRADIENT,
-            dp=1,
-            minDist=80,      # 硬幣之間的最小距離
-            param1=60,       # Canny 邊緣檢測高閾值
-            param2=35,       # 圓心檢測閾值 (生產環境推薦值)
-            minRadius=30,    # 最小半徑
-            maxRadius=95     # 最大半徑
+            dp=hp['dp'],
+            minDist=max(1.0, hp['minDist'] * s),
+            param1=hp['param1'],
+            param2=hp['param2'],
+            minRadius=int(round(hp['minRadius'] * s)),
+            maxRadius=int(round(hp['maxRadius'] * s))
         )
         
         coins = []
@@ -169,25 +708,347 @@ class ImageProcessor:
         
         return coins
     
-    def detect_coins_hybrid(self, image: np.ndarray) -> List[Dict]:
+    def detect_coins_hough_alt(self, image: ImageInput, params: Optional[Dict] = None) -> List[Dict]:
+        """
+        使用 HoughCircles (HOUGH_GRADIENT_ALT) 檢測硬幣
+        
+        ALT 版本以 Scharr 梯度與輪廓完美度判斷圓，紋理背景上的誤判較少。
+        
+        Args:
+            image: 原始 BGR 影像或 PreparedImage
+            params: 覆寫 self.hough_alt_params 的參數 (選用)
+            
+        Returns:
+            硬幣資訊列表 [{x, y, radius}, ...]
+        """
+        prepared = self.prepare(image)
+        hp = dict(self.hough_alt_params, **(params or {}))
+        s = prepared.scale
+        circles = cv2.HoughCircles(
+            prepared.hough_blurred,
+            cv2.HOUGH_GRADIENT_ALT,
+            dp=hp['dp'],
+            minDist=max(1.0, hp['minDist'] * s),
+            param1=hp['param1'],
+            param2=hp['param2'],
+            minRadius=int(round(hp['minRadius'] * s)),
+            maxRadius=int(round(hp['maxRadius'] * s))
+        )
+        
+        coins = []
+        if circles is not None:
+            for x, y, radius in np.around(circles[0]).astype(np.int64):
+                coins.append({'x': int(x), 'y': int(y), 'radius': int(radius)})
+        return coins
+    
+    def hough_accumulator(self, image: ImageInput, params: Optional[Dict] = None) -> HoughAccumulator:
+        """
+        取得 (或建立) 影像的 Hough 累加器
+        
+        累加器只依 dp / param1 / 半徑範圍而定，快取在 PreparedImage 上；
+        只改變 param2 / minDist 的查詢會沿用同一個累加器。
+        
+        Args:
+            image: 原始 BGR 影像或 PreparedImage
+            params: 覆寫 self.hough_params 的參數 (選用)
+            
+        Returns:
+            HoughAccumulator
+        """
+        prepared = self.prepare(image)
+        hp = dict(self.hough_params, **(params or {}))
+        s = prepared.scale
+        key = (hp['dp'], hp['param1'],
+               int(round(hp['minRadius'] * s)), int(round(hp['maxRadius'] * s)))
+        
+        cache = prepared.hough_accumulators
+        if key not in cache:
+            while len(cache) >= max(1, self.accumulator_cache_size):
+                cache.pop(next(iter(cache)))  # 移除最早建立的累加器
+            cache[key] = HoughAccumulator(prepared.hough_blurred, *key)
+        return cache[key]
+    
+    def detect_coins_accumulator(self, image: ImageInput, params: Optional[Dict] = None) -> List[Dict]:
+        """
+        使用快取的 Hough 累加器檢測硬幣 (detect_coins_hough 的替代引擎)
+        
+        第一次呼叫建立累加器，之後調整 param2 / minDist 只需擷取峰值，
+        適合互動調參與參數掃描。
+        
+        Args:
+            image: 原始 BGR 影像或 PreparedImage
+            params: 覆寫 self.hough_params 的參數 (選用)
+            
+        Returns:
+            硬幣資訊列表 [{x, y, radius}, ...]
+        """
+        prepared = self.prepare(image)
+        hp = dict(self.hough_params, **(params or {}))
+        accumulator = self.hough_accumulator(prepared, hp)
+        
+        circles = accumulator.circles(hp['param2'], max(1.0, hp['minDist'] * prepared.scale),
+                                      self.accumulator_min_coverage)
+        return [{'x': x, 'y': y, 'radius': r} for x, y, r in circles]
+    
+    def detect_coins_hybrid(self, image: ImageInput, hough_params: Optional[Dict] = None,
+                            contour_params: Optional[Dict] = None) -> List[Dict]:
         """
         混合方法：結合 Contour 和 HoughCircles
         
+        兩個檢測器的圓放入空間索引，依圓心距離與半徑比合併重疊的圓，
+        只被其中一個檢測器找到的硬幣也會保留。
+        
         Args:
-            image: 原始 BGR 影像
+            image: 原始 BGR 影像或 PreparedImage
+            hough_params: 覆寫 self.hough_params 的參數 (選用)
+            contour_params: 覆寫 self.contour_params 的參數 (選用)
             
         Returns:
-            硬幣資訊列表
+            硬幣資訊列表 (每個硬幣的 'sources' 記錄支持的檢測器)
         """
+        # 兩種方法共用同一份預處理結果
+        prepared = self.prepare(image)
+        
         # 先用 Contour 檢測
-        coins_contour = self.detect_coins_contours(image)
+        coins_contour = self.detect_coins_contours(prepared, contour_params)
         
         # 再用 HoughCircles 驗證/補充
-        coins_hough = self.detect_coins_hough(image)
+        coins_hough = self.detect_coins_hough(prepared, hough_params)
+        
+        # 合併結果 (去重)，重疊時優先使用 Contour 的幾何資訊
+        return merge_circles(
+            {'contour': coins_contour, 'hough': coins_hough},
+            center_tolerance=self.merge_center_tolerance,
+            radius_ratio=self.merge_radius_ratio
+        )
+    
+    def choose_pyramid_scale(self, image_shape: Tuple[int, ...],
+                             min_radius: Optional[float] = None) -> float:
+        """
+        依影像尺寸與預期硬幣半徑選擇金字塔工作層的縮小比例
         
-        # 合併結果 (去重)
-        # 這裡簡化處理，優先使用 Contour 結果
-        return coins_contour if len(coins_contour) > 0 else coins_hough
+        Args:
+            image_shape: 原始影像尺寸
+            min_radius: 全解析度下的最小硬幣半徑 (None 則由 hough_params
+                        依 reference_width 換算)
+            
+        Returns:
+            縮小比例 (<= 1.0)，使最小硬幣在工作層上約為 pyramid_min_radius 像素
+        """
+        if min_radius is None:
+            min_radius = self.hough_params['minRadius'] * self.resolution_scale(image_shape[1])
+        if min_radius <= 0:
+            return 1.0
+        return min(1.0, self.pyramid_min_radius / min_radius)
+    
+    def detect_coins_pyramid(self, image: np.ndarray, refine: bool = True) -> List[Dict]:
+        """
+        金字塔模式 (由粗到細)：在縮小的影像上執行 HoughCircles，
+        將結果換算回原始座標後，再於全解析度的小視窗內精修圓心與半徑
+        
+        Hough 的成本約隨縮小比例的平方下降，且半徑參數依 reference_width
+        換算，因此 8MP / 12MP / 48MP 的輸入可使用同一組參數。
+        
+        Args:
+            image: 原始 BGR 影像
+            refine: 是否在全解析度下精修
+            
+        Returns:
+            硬幣資訊列表 [{x, y, radius}, ...] (原始影像座標)
+        """
+        h, w = image.shape[:2]
+        resolution_scale = self.resolution_scale(w)
+        scale = self.choose_pyramid_scale(image.shape)
+        
+        # 粗略層：縮小影像並以換算後的參數檢測
+        if scale < 1.0:
+            level = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            level = image
+        prepared = self.prepare(level, scale=resolution_scale * scale)
+        coarse = self.detect_coins_hough(prepared)
+        
+        coins = []
+        for coin in coarse:
+            # 換算回原始座標
+            x = coin['x'] / scale
+            y = coin['y'] / scale
+            radius = coin['radius'] / scale
+            
+            if refine and scale < 1.0:
+                # 粗略層一個像素的誤差 → 原始影像約 1/scale 像素
+                slack = max(2.0 / scale, radius * self.pyramid_refine_tolerance)
+                refined = self.find_circle_near(image, x, y, radius, slack, slack)
+                if refined is not None:
+                    x, y, radius = refined
+            
+            coins.append({
+                'x': int(round(x)),
+                'y': int(round(y)),
+                'radius': int(round(radius))
+            })
+        
+        return coins
+    
+    def find_circle_near(self, image: np.ndarray, x: float, y: float, radius: float,
+                         position_slack: float, radius_slack: float
+                         ) -> Optional[Tuple[float, float, float]]:
+        """
+        在已知圓附近的小視窗內以 HoughCircles 尋找單一圓
+        (金字塔模式的全解析度精修、影片模式的追蹤皆使用)
+        
+        Args:
+            image: BGR 影像
+            x, y, radius: 預期的圓 (影像座標)
+            position_slack: 圓心允許偏移 (像素)
+            radius_slack: 半徑允許誤差 (像素)
+            
+        Returns:
+            找到的 (x, y, radius)；視窗內找不到或偏離過遠時返回 None
+        """
+        min_r = max(1, int(radius - radius_slack))
+        max_r = int(radius + radius_slack) + 1
+        
+        h, w = image.shape[:2]
+        half = max_r + int(position_slack) + 10
+        x1, y1 = max(0, int(x) - half), max(0, int(y) - half)
+        x2, y2 = min(w, int(x) + half + 1), min(h, int(y) + half + 1)
+        window = image[y1:y2, x1:x2]
+        if window.size == 0:
+            return None
+        
+        # 視窗很小，直接做灰階與模糊 (不做 CLAHE，避免局部分塊影響)
+        gray = cv2.cvtColor(window, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        blurred = cv2.GaussianBlur(gray, (9, 9), 2)
+        
+        circles = cv2.HoughCircles(
+            blurred,
+            cv2.HOUGH_GRADIENT,
+            dp=1,
+            minDist=max(window.shape[:2]),  # 每個視窗只取一個圓
+            param1=self.hough_params['param1'],
+            param2=max(10, self.hough_params['param2'] // 2),  # 已知有圓，降低門檻
+            minRadius=min_r,
+            maxRadius=max_r
+        )
+        if circles is None:
+            return None
+        
+        cx, cy, cr = circles[0, 0]
+        cx, cy = cx + x1, cy + y1
+        # 偏離過遠時視為誤檢
+        if (cx - x) ** 2 + (cy - y) ** 2 > position_slack ** 2:
+            return None
+        return float(cx), float(cy), float(cr)
+    
+    def max_coin_radius(self, scale: float = 1.0) -> float:
+        """所有檢測器可能回報的最大硬幣半徑 (像素)"""
+        return max(self.contour_params['max_radius'], self.hough_params['maxRadius']) * scale
+    
+    def tile_grid(self, shape: Tuple[int, ...], tile_size: Optional[int] = None,
+                  scale: float = 1.0) -> List[Tuple[int, int, int, int]]:
+        """
+        計算重疊分塊的範圍
+        
+        相鄰分塊至少重疊一個最大硬幣直徑，因此每枚硬幣都會完整出現在某個分塊內。
+        
+        Args:
+            shape: 影像尺寸
+            tile_size: 分塊邊長 (None 使用 self.tile_size)
+            scale: 像素參數縮放比例
+            
+        Returns:
+            [(x1, y1, x2, y2), ...]
+        """
+        h, w = shape[:2]
+        overlap = int(np.ceil(2 * self.max_coin_radius(scale))) + 2
+        tile = max(tile_size or self.tile_size, 2 * overlap)
+        step = tile - overlap
+        
+        def starts(length):
+            if length <= tile:
+                return [0]
+            points = list(range(0, length - tile, step))
+            return points + [length - tile]
+        
+        return [(x, y, min(w, x + tile), min(h, y + tile))
+                for y in starts(h) for x in starts(w)]
+    
+    def detect_coins_in_region(self, image: np.ndarray, bounds: Tuple[int, int, int, int],
+                               scale: float = 1.0) -> List[Dict]:
+        """
+        只在影像的矩形區域內執行混合檢測 (分塊模式、影片模式的局部重新檢測)
+        
+        區域使用自己的預處理與 CLAHE 物件，可安全地在多個執行緒同時呼叫。
+        被區域邊界切到的圓 (且邊界不是影像邊界) 會被捨棄，交給相鄰區域處理。
+        
+        Args:
+            image: 原始 BGR 影像
+            bounds: 區域範圍 (x1, y1, x2, y2)
+            scale: 像素參數縮放比例
+            
+        Returns:
+            硬幣資訊列表 (原始影像座標)
+        """
+        h, w = image.shape[:2]
+        x1, y1, x2, y2 = bounds
+        # OpenCV 演算法物件不保證執行緒安全，每個區域建立自己的 CLAHE
+        clahe = cv2.createCLAHE(clipLimit=self.clahe.getClipLimit(),
+                                tileGridSize=self.clahe.getTilesGridSize())
+        prepared = PreparedImage(image[y1:y2, x1:x2], clahe=clahe, scale=scale)
+        
+        coins = []
+        for coin in self.detect_coins_hybrid(prepared):
+            cx, cy, r = coin['x'], coin['y'], coin['radius']
+            if ((cx - r < 0 and x1 > 0) or (cy - r < 0 and y1 > 0) or
+                    (cx + r > x2 - x1 and x2 < w) or (cy + r > y2 - y1 and y2 < h)):
+                continue
+            coin = dict(coin, x=cx + x1, y=cy + y1)
+            if 'contour' in coin:
+                coin['contour'] = coin['contour'] + np.array([x1, y1], dtype=coin['contour'].dtype)
+            coins.append(coin)
+        return coins
+    
+    def detect_coins_tiled(self, image: np.ndarray, tile_size: Optional[int] = None,
+                           max_workers: Optional[int] = None,
+                           scale: float = 1.0) -> List[Dict]:
+        """
+        分塊平行檢測 (適用於平台掃描、拼接托盤等超大影像)
+        
+        影像切成重疊分塊，每個分塊在執行緒池中各自做預處理與混合檢測
+        (OpenCV 運算時會釋放 GIL)，每個工作執行緒的記憶體只與分塊大小有關。
+        只保留完整落在分塊內 (或貼齊影像邊界) 的圓，最後以空間索引去除
+        同時出現在兩個分塊的硬幣。
+        
+        Args:
+            image: 原始 BGR 影像
+            tile_size: 分塊邊長 (None 使用 self.tile_size)
+            max_workers: 執行緒數 (None 使用 self.tile_workers)
+            scale: 像素參數縮放比例
+            
+        Returns:
+            硬幣資訊列表 (原始影像座標)
+        """
+        tiles = self.tile_grid(image.shape, tile_size, scale)
+        
+        def detect_tile(bounds):
+            return self.detect_coins_in_region(image, bounds, scale)
+        
+        if len(tiles) == 1:
+            results = [detect_tile(tiles[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers or self.tile_workers) as pool:
+                results = list(pool.map(detect_tile, tiles))
+        
+        # 去除重疊區域內的重複硬幣
+        return merge_circles(
+            {'tiles': [coin for coins in results for coin in coins]},
+            center_tolerance=self.merge_center_tolerance,
+            radius_ratio=self.merge_radius_ratio,
+            record_sources=False
+        )
     
     def extract_coin_roi(self, image: np.ndarray, x: int, y: int, radius: int, 
                          padding: float = 1.2) -> np.ndarray:
@@ -215,18 +1076,20 @@ class ImageProcessor:
         
         return roi
     
-    def extract_color_features(self, roi: np.ndarray) -> Dict:
+    def extract_color_features(self, roi: np.ndarray,
+                               hsv_roi: Optional[np.ndarray] = None) -> Dict:
         """
         提取硬幣顏色特徵 (改進版 - 使用中心區域)
         
         Args:
             roi: 硬幣 ROI 影像
+            hsv_roi: 同一區域的 HSV 影像 (可由 PreparedImage.hsv 裁切，省去重複轉換)
             
         Returns:
             顏色特徵字典 {mean_hue, mean_saturation, mean_value, is_golden, is_silver}
         """
         # 轉換到 HSV 色彩空間
-        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        hsv = hsv_roi if hsv_roi is not None else cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
         
         # 只分析中心區域 (避免邊緣干擾)
         h, w = roi.shape[:2]
@@ -245,25 +1108,131 @@ class ImageProcessor:
         mean_g = np.mean(roi[:, :, 1])
         mean_r = np.mean(roi[:, :, 2])
         
+        is_golden, is_silver = self.classify_color(mean_h, mean_s, mean_v)
+        
+        return {
+            'mean_hue': mean_h,
+            'mean_saturation': mean_s,
+            'mean_value': mean_v,
+            'mean_bgr': (mean_b, mean_g, mean_r),
+            'is_golden': bool(is_golden),
+            'is_silver': bool(is_silver)
+        }
+    
+    @staticmethod
+    def classify_color(mean_h, mean_s, mean_v):
+        """
+        由 HSV 平均值判斷金色 / 銀色 (純量或 NumPy 陣列皆可)
+        
+        Args:
+            mean_h, mean_s, mean_v: 中心區域的 HSV 平均值
+            
+        Returns:
+            (is_golden, is_silver)
+        """
         # 判斷金色（10元、5元）- 調整範圍
-        is_golden_hue = 15 < mean_h < 35  # 黃色範圍
+        is_golden_hue = (mean_h > 15) & (mean_h < 35)  # 黃色範圍
         is_golden_saturation = mean_s > 40  # 飽和度要求
         is_golden_value = mean_v > 80  # 亮度要求
         
         # 判斷銀色（50元、1元）- 高亮度、低飽和度
-        is_silver = (mean_s < 40) and (mean_v > 100)
+        is_silver = (mean_s < 40) & (mean_v > 100)
         
         # 綜合判斷金色（排除銀色）
-        is_golden = is_golden_hue and is_golden_saturation and is_golden_value and not is_silver
+        is_golden = (is_golden_hue & is_golden_saturation & is_golden_value
+                     & np.logical_not(is_silver))
         
-        return {
-            'mean_hue': mean_h,
-            'mean_saturation': mean_s,
-            'mean_value': mean_v,
-            'mean_bgr': (mean_b, mean_g, mean_r),
-            'is_golden': is_golden,
-            'is_silver': is_silver
-        }
+        return is_golden, is_silver
+    
+    def coin_roi_bounds(self, shape: Tuple[int, ...], coins, padding: float = 1.2) -> np.ndarray:
+        """
+        批次計算硬幣 ROI 範圍 (與 extract_coin_roi 相同的裁切規則)
+        
+        Args:
+            shape: 影像尺寸
+            coins: 硬幣列表 [{x, y, radius}, ...] 或 (N, 3) 陣列
+            padding: 擴展係數
+            
+        Returns:
+            (N, 4) int64 陣列 [x1, y1, x2, y2]
+        """
+        circles = circles_to_array(coins)
+        x, y = circles[:, 0], circles[:, 1]
+        r = (circles[:, 2] * padding).astype(np.int64)
+        return np.stack([
+            np.maximum(0, x - r),
+            np.maximum(0, y - r),
+            np.minimum(shape[1], x + r),
+            np.minimum(shape[0], y + r)
+        ], axis=1)
+    
+    def prefers_region_stats(self, shape: Tuple[int, ...], bounds: np.ndarray) -> bool:
+        """
+        判斷是否值得建立整張影像的積分表 (RegionStats)
+        
+        積分表的建立成本與影像大小成正比，之後每個硬幣 O(1)；
+        ROI 總面積達到影像面積的 integral_area_ratio 倍時才划算。
+        
+        Args:
+            shape: 影像尺寸
+            bounds: (N, 4) 硬幣 ROI 範圍
+        """
+        return rect_areas(bounds).sum() >= shape[0] * shape[1] * self.integral_area_ratio
+    
+    def extract_color_features_batch(self, image: ImageInput, coins,
+                                     padding: float = 1.2) -> np.ndarray:
+        """
+        批次提取所有硬幣的顏色特徵
+        
+        ROI 總面積大 (硬幣多、ROI 重疊) 時，整張影像只轉換一次 HSV，並以積分影像
+        (summed-area table) 在 O(1) 內求得每個 ROI (BGR) 與其中心區域 (HSV) 的平均值；
+        硬幣稀疏時則只轉換各 ROI 的中心區域。結果與逐一呼叫 extract_color_features 相同。
+        
+        Args:
+            image: 原始 BGR 影像或 PreparedImage
+            coins: 硬幣列表 [{x, y, radius}, ...] 或 (N, 3) 陣列
+            padding: ROI 擴展係數
+            
+        Returns:
+            COLOR_FEATURE_DTYPE 結構化陣列 (每個硬幣一筆)
+        """
+        prepared = self.prepare(image)
+        bounds = self.coin_roi_bounds(prepared.shape, coins, padding)
+        features = np.zeros(len(bounds), dtype=COLOR_FEATURE_DTYPE)
+        if len(bounds) == 0:
+            return features
+        
+        # 只分析中心區域 (避免邊緣干擾)，ROI 太小時使用整個 ROI
+        x1, y1, x2, y2 = bounds.T
+        h, w = y2 - y1, x2 - x1
+        large = (h > 10) & (w > 10)
+        center = np.stack([
+            np.where(large, x1 + w // 4, x1),
+            np.where(large, y1 + h // 4, y1),
+            np.where(large, x1 + 3 * w // 4, x2),
+            np.where(large, y1 + 3 * h // 4, y2)
+        ], axis=1)
+        
+        if self.prefers_region_stats(prepared.shape, bounds):
+            # ROI 大量重疊 / 覆蓋整張影像：整張轉一次 HSV，以積分影像 O(1) 求平均
+            mean_hsv = prepared.stats.mean(center, 'hsv')
+            mean_bgr = prepared.stats.mean(bounds, 'bgr')
+        else:
+            # 硬幣稀疏：只轉換每個 ROI 的中心區域，避免整張影像的轉換成本
+            mean_hsv = np.full((len(bounds), 3), np.nan)
+            mean_bgr = np.full((len(bounds), 3), np.nan)
+            source = prepared.image
+            for i, ((bx1, by1, bx2, by2), (cx1, cy1, cx2, cy2)) in enumerate(zip(bounds, center)):
+                if bx2 <= bx1 or by2 <= by1:
+                    continue
+                hsv_center = cv2.cvtColor(source[cy1:cy2, cx1:cx2], cv2.COLOR_BGR2HSV)
+                mean_hsv[i] = cv2.mean(hsv_center)[:3]
+                mean_bgr[i] = cv2.mean(source[by1:by2, bx1:bx2])[:3]
+        
+        features['mean_hue'], features['mean_saturation'], features['mean_value'] = mean_hsv.T
+        features['mean_b'], features['mean_g'], features['mean_r'] = mean_bgr.T
+        features['is_golden'], features['is_silver'] = self.classify_color(*mean_hsv.T)
+        return features
     
     def draw_coins(self, image: np.ndarray, coins: List[Dict], 
                    color: Tuple[int, int, int] = (0, 255, 0)) -> np.ndarray:
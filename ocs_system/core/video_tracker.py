@@ -0,0 +1,170 @@
+"""
+Video Tracker Module
+影片串流的時間連貫硬幣檢測 - 以前一張影格的結果為先驗，只在變動區域重新檢測
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+
+from utils.spatial_index import merge_circles
+
+
+class TemporalCoinDetector:
+    """
+    影片模式硬幣檢測器
+    
+    - 每 full_detect_interval 張影格做一次完整檢測，以捕捉新出現的硬幣
+    - 其餘影格以縮小灰階影像的影格差分找出變動區域
+    - 變動區域內的既有硬幣，在先驗位置附近的小視窗內以縮小的半徑範圍重新確認
+    - 無法由既有硬幣解釋的變動區域才做局部重新檢測
+    
+    托盤靜止時，每張影格只需一次縮小影像差分，不執行任何 Hough。
+    """
+    
+    def __init__(self, processor, full_detect_interval: int = 30, diff_scale: float = 0.25,
+                 diff_threshold: int = 20, changed_fraction: float = 0.02,
+                 search_margin: float = 0.3, radius_tolerance: float = 0.1,
+                 max_changed_ratio: float = 0.25):
+        """
+        Args:
+            processor: ImageProcessor
+            full_detect_interval: 每隔幾張影格做一次完整檢測
+            diff_scale: 影格差分使用的縮小比例
+            diff_threshold: 灰階差異門檻 (0-255)
+            changed_fraction: 硬幣視窗內變動像素比例超過此值才重新確認
+            search_margin: 重新確認時圓心允許移動的距離 (相對於半徑)
+            radius_tolerance: 重新確認時半徑允許誤差 (相對於半徑)
+            max_changed_ratio: 變動面積超過影格的此比例時直接做完整檢測
+        """
+        self.processor = processor
+        self.full_detect_interval = max(1, full_detect_interval)
+        self.diff_scale = diff_scale
+        self.diff_threshold = diff_threshold
+        self.changed_fraction = changed_fraction
+        self.search_margin = search_margin
+        self.radius_tolerance = radius_tolerance
+        self.max_changed_ratio = max_changed_ratio
+        self.dilate_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self.reset()
+    
+    def reset(self):
+        """清除先驗 (下一張影格會做完整檢測)"""
+        self.coins: List[Dict] = []
+        self.frame_index = 0
+        self.last_update: Dict = {}
+        self.last_prepared = None  # 本張影格做完整檢測時的 PreparedImage，否則為 None
+        self._reference: Optional[np.ndarray] = None
+    
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        """影格差分用的縮小灰階影像"""
+        small = cv2.resize(frame, None, fx=self.diff_scale, fy=self.diff_scale,
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+    
+    def update(self, frame: np.ndarray) -> List[Dict]:
+        """
+        處理一張影格
+        
+        Args:
+            frame: BGR 影格
+            
+        Returns:
+            目前影格的硬幣列表 (未變動的硬幣沿用前一張影格的同一個 dict)
+        """
+        self.last_prepared = None
+        small = self._small_gray(frame)
+        periodic = self.frame_index % self.full_detect_interval == 0
+        
+        if self._reference is None or self._reference.shape != small.shape or periodic:
+            self._full_detect(frame)
+        else:
+            diff = cv2.absdiff(small, self._reference)
+            _, changed = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+            changed_pixels = cv2.countNonZero(changed)
+            
+            if changed_pixels == 0:
+                self.last_update = {'mode': 'static', 'rechecked': 0, 'regions': 0}
+            elif changed_pixels > changed.size * self.max_changed_ratio:
+                self._full_detect(frame)
+            else:
+                changed = cv2.dilate(changed, self.dilate_kernel)
+                self._incremental_update(frame, changed)
+        
+        self._reference = small
+        self.frame_index += 1
+        return self.coins
+    
+    def _full_detect(self, frame: np.ndarray):
+        """完整檢測整張影格 (保留 PreparedImage 供呼叫端分類同一張影格)"""
+        self.last_prepared = self.processor.prepare(frame)
+        self.coins = self.processor.detect_coins_hybrid(self.last_prepared)
+        self.last_update = {'mode': 'full', 'rechecked': 0, 'regions': 0}
+    
+    def _incremental_update(self, frame: np.ndarray, changed: np.ndarray):
+        """
+        只處理變動區域
+        
+        Args:
+            frame: BGR 影格
+            changed: 縮小尺寸的變動遮罩 (255 = 變動)
+        """
+        s = self.diff_scale
+        sh, sw = changed.shape
+        explained = np.zeros_like(changed)
+        kept, rechecked = [], 0
+        
+        for coin in self.coins:
+            x, y, r = coin['x'], coin['y'], coin['radius']
+            reach = r * (1 + self.search_margin)
+            x1, y1 = max(0, int((x - reach) * s)), max(0, int((y - reach) * s))
+            x2, y2 = min(sw, int((x + reach) * s) + 1), min(sh, int((y + reach) * s) + 1)
+            window = changed[y1:y2, x1:x2]
+            
+            if window.size == 0 or cv2.countNonZero(window) <= window.size * self.changed_fraction:
+                kept.append(coin)  # 未變動，沿用先驗
+            else:
+                # 變動：在先驗附近以縮小的半徑範圍重新確認
+                rechecked += 1
+                found = self.processor.find_circle_near(
+                    frame, x, y, r,
+                    position_slack=r * self.search_margin,
+                    radius_slack=max(2.0, r * self.radius_tolerance)
+                )
+                if found is None:
+                    continue  # 硬幣被移走或移動過遠，交給局部重新檢測
+                fx, fy, fr = found
+                coin = {'x': int(round(fx)), 'y': int(round(fy)), 'radius': int(round(fr)),
+                        'sources': ['tracked']}
+                kept.append(coin)
+                x, y, r = coin['x'], coin['y'], coin['radius']
+            
+            cv2.circle(explained, (int(x * s), int(y * s)), int(r * (1 + self.search_margin) * s) + 1,
+                       255, -1)
+        
+        # 無法由既有硬幣解釋的變動區域 → 局部重新檢測
+        unexplained = cv2.bitwise_and(changed, cv2.bitwise_not(explained))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(unexplained)
+        pad = int(2 * self.processor.max_coin_radius())
+        h, w = frame.shape[:2]
+        min_area = max(4, int((self.processor.hough_params['minRadius'] * s) ** 2))
+        
+        found = []
+        regions = 0
+        for left, top, width, height, area in stats[1:count]:
+            if area < min_area:
+                continue
+            regions += 1
+            bounds = (max(0, int(left / s) - pad), max(0, int(top / s) - pad),
+                      min(w, int((left + width) / s) + pad), min(h, int((top + height) / s) + pad))
+            found.extend(self.processor.detect_coins_in_region(frame, bounds))
+        
+        # 既有硬幣優先，新找到的硬幣去重後加入
+        self.coins = merge_circles(
+            {'kept': kept, 'new': found},
+            center_tolerance=self.processor.merge_center_tolerance,
+            radius_ratio=self.processor.merge_radius_ratio,
+            record_sources=False
+        ) if found else kept
+        self.last_update = {'mode': 'incremental', 'rechecked': rechecked, 'regions': regions}
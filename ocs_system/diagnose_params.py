@@ -3,7 +3,6 @@
 """
 
 import cv2
-import numpy as np
 import sys
 import os
 from pathlib import Path
@@ -17,8 +16,20 @@ if sys.platform == 'win32':
 # 加入專案路徑
 sys.path.append(str(Path(__file__).parent))
 
+from param_sweep import format_config, sweep
+from test_config import get_test_config
 
-def diagnose_image(image_path):
+# 診斷用的參數組合 (param1 固定 50，其餘沿用生產環境預設值)
+DIAGNOSE_CONFIGS = [
+    {"name": "預設參數", "param2": 30, "minRadius": 15, "maxRadius": 100, "minDist": 30},
+    {"name": "降低閾值", "param2": 20, "minRadius": 20, "maxRadius": 80, "minDist": 40},
+    {"name": "更嚴格", "param2": 40, "minRadius": 25, "maxRadius": 70, "minDist": 50},
+    {"name": "寬鬆範圍", "param2": 25, "minRadius": 15, "maxRadius": 90, "minDist": 35},
+    {"name": "優化版", "param2": 22, "minRadius": 30, "maxRadius": 75, "minDist": 45},
+]
+
+
+def diagnose_image(image_path, expected_count=10):
     """診斷圖片並測試不同參數"""
     print("=" * 60)
     print("🔬 圖片診斷與參數調整")
@@ -34,94 +45,58 @@ def diagnose_image(image_path):
     print(f"\n圖片資訊:")
     print(f"  路徑: {image_path}")
     print(f"  尺寸: {w}x{h}")
-    print(f"  預期硬幣數量: 10 個")
+    print(f"  預期硬幣數量: {expected_count} 個")
     
-    # 轉換為灰階
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # 測試不同的參數組合
+    # 測試不同的參數組合 (共用同一份預處理，並保留結果供繪圖)
     print("\n" + "=" * 60)
     print("測試不同的 HoughCircles 參數")
     print("=" * 60)
     
-    test_configs = [
-        {"name": "預設參數", "param2": 30, "minR": 15, "maxR": 100, "minDist": 30},
-        {"name": "降低閾值", "param2": 20, "minR": 20, "maxR": 80, "minDist": 40},
-        {"name": "更嚴格", "param2": 40, "minR": 25, "maxR": 70, "minDist": 50},
-        {"name": "寬鬆範圍", "param2": 25, "minR": 15, "maxR": 90, "minDist": 35},
-        {"name": "優化版", "param2": 22, "minR": 30, "maxR": 75, "minDist": 45},
-    ]
-    
-    best_config = None
-    best_count = 0
-    best_diff = float('inf')
+    configs = [dict({k: v for k, v in c.items() if k != 'name'}, param1=50, detector='hough')
+               for c in DIAGNOSE_CONFIGS]
+    results = sweep({image_path: expected_count}, configs, max_workers=1, keep_circles=True)
+    name = os.path.basename(image_path)
     
-    for config in test_configs:
-        # 預處理
-        blurred = cv2.GaussianBlur(gray, (9, 9), 2)
+    best = None
+    for info, result in zip(DIAGNOSE_CONFIGS, results):
+        count = result['counts'][name]
+        diff = result['error']
         
-        # HoughCircles
-        circles = cv2.HoughCircles(
-            blurred,
-            cv2.HOUGH_GRADIENT,
-            dp=1,
-            minDist=config['minDist'],
-            param1=50,
-            param2=config['param2'],
-            minRadius=config['minR'],
-            maxRadius=config['maxR']
-        )
+        status = "✅" if diff == 0 else "❌"
+        print(f"\n{status} [{info['name']}]")
+        print(f"   {format_config(result['config'])}")
+        print(f"   檢測到: {count} 個硬幣 (差距: {diff}, {result['runtime'] * 1000:.1f} ms)")
         
-        count = 0 if circles is None else len(circles[0])
-        diff = abs(count - 10)
-        
-        status = "✅" if count == 10 else "❌"
-        print(f"\n{status} [{config['name']}]")
-        print(f"   param2={config['param2']}, minR={config['minR']}, "
-              f"maxR={config['maxR']}, minDist={config['minDist']}")
-        print(f"   檢測到: {count} 個硬幣 (差距: {diff})")
-        
-        if circles is not None and len(circles[0]) > 0:
-            radii = [int(c[2]) for c in circles[0]]
+        radii = [c[2] for c in result['circles'][name]]
+        if radii:
             print(f"   半徑範圍: {min(radii)} ~ {max(radii)} px")
         
         # 記錄最佳結果
-        if diff < best_diff:
-            best_diff = diff
-            best_count = count
-            best_config = config
+        if best is None or diff < best[1]['error']:
+            best = (info, result)
+    
+    best_info, best_result = best
+    best_config = best_result['config']
+    best_count = best_result['counts'][name]
     
     # 顯示最佳配置
     print("\n" + "=" * 60)
     print("📊 最佳配置")
     print("=" * 60)
-    print(f"\n配置名稱: {best_config['name']}")
-    print(f"檢測數量: {best_count} 個 (目標: 10 個)")
+    print(f"\n配置名稱: {best_info['name']}")
+    print(f"檢測數量: {best_count} 個 (目標: {expected_count} 個)")
     print(f"\n建議參數:")
     print(f"  param2 = {best_config['param2']}")
-    print(f"  minRadius = {best_config['minR']}")
-    print(f"  maxRadius = {best_config['maxR']}")
+    print(f"  minRadius = {best_config['minRadius']}")
+    print(f"  maxRadius = {best_config['maxRadius']}")
     print(f"  minDist = {best_config['minDist']}")
     
-    # 使用最佳配置繪製結果
-    blurred = cv2.GaussianBlur(gray, (9, 9), 2)
-    circles = cv2.HoughCircles(
-        blurred,
-        cv2.HOUGH_GRADIENT,
-        dp=1,
-        minDist=best_config['minDist'],
-        param1=50,
-        param2=best_config['param2'],
-        minRadius=best_config['minR'],
-        maxRadius=best_config['maxR']
-    )
-    
-    if circles is not None:
+    # 使用最佳配置繪製結果 (直接使用掃描時保留的圓)
+    circles = best_result['circles'][name]
+    if circles:
         result_image = image.copy()
-        circles = np.uint16(np.around(circles))
         
-        for i, circle in enumerate(circles[0, :], 1):
-            x, y, r = circle
+        for i, (x, y, r) in enumerate(circles, 1):
             cv2.circle(result_image, (x, y), r, (0, 255, 0), 3)
             cv2.circle(result_image, (x, y), 2, (0, 0, 255), 3)
             cv2.putText(result_image, f"#{i}", (x - 10, y - r - 10),
@@ -137,12 +112,12 @@ def diagnose_image(image_path):
     print("💡 下一步建議")
     print("=" * 60)
     
-    if best_count == 10:
+    if best_count == expected_count:
         print("\n✅ 找到最佳參數！")
         print("請更新以下檔案的預設值:")
         print("  1. ui/main_window.py (GUI 預設參數)")
         print("  2. core/image_processor.py (檢測方法)")
-    elif best_count < 10:
+    elif best_count < expected_count:
         print("\n⚠️ 檢測數量不足")
         print("建議:")
         print("  - 降低 param2 (更靈敏)")
@@ -165,7 +140,9 @@ if __name__ == "__main__":
         print(f"❌ 找不到測試圖片: {test_image}")
         exit(1)
     
-    diagnose_image(test_image)
+    print("💡 完整的參數網格掃描請執行: python param_sweep.py\n")
+    config = get_test_config(os.path.basename(test_image))
+    diagnose_image(test_image, config['total_count'] if config else 10)
     
     print("\n" + "=" * 60)
     print("診斷完成！")
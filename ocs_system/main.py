@@ -3,118 +3,335 @@ OCS System - Main Application
 硬幣辨識系統主程式 (靜態圖片版本)
 """
 
+import argparse
+import csv
+import glob
+import json
 import cv2
+import numpy as np
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
 # 加入專案路徑
 sys.path.append(str(Path(__file__).parent))
 
-from core.image_processor import ImageProcessor
+from core.image_processor import ImageProcessor, coin_records, coin_records_to_dicts
 from core.coin_classifier import CoinClassifier, CoinCounter
+from core.detectors import get_detector
+from core.video_tracker import TemporalCoinDetector
+from utils.image_loader import ImageLoader
+from utils.metrics import PipelineMetrics, profile_call, serve_metrics
 
 
 class OCSSystem:
     """OCS 硬幣辨識系統"""
     
-    def __init__(self):
-        """初始化系統"""
+    def __init__(self, detection_mode: str = 'hybrid', verbose: bool = True,
+                 reduced_decode: bool = False, metrics: Optional[PipelineMetrics] = None,
+                 detector_params: Optional[Dict[str, Dict]] = None):
+        """
+        初始化系統
+        
+        Args:
+            detection_mode: 檢測器名稱 (core.detectors 中已註冊的檢測器，例如
+                            'hybrid'、'pyramid' 由粗到細金字塔模式、
+                            'tiled' 超大影像分塊平行檢測)
+            verbose: 是否印出處理進度 (批次模式關閉)
+            reduced_decode: 大型 JPEG 是否在解碼時縮小到不低於 target_width
+                            (結果座標仍換算回原始解析度；顏色與紋理特徵取自縮小後的影像，
+                            分類結果可能與原解析度不同，預設關閉)
+            metrics: 分段計時 (None 為停用；階段為 read / preprocess / detect /
+                     color / texture / classify / draw，另有整張圖片的 image；
+                     image 不含 read，process_image 與 iter_process 的定義相同)
+            detector_params: 覆寫檢測器參數 (見 ImageProcessor.update_params，
+                             例如合成場景的 Hough 半徑範圍；None 為生產環境參數)
+        """
+        get_detector(detection_mode)  # 名稱錯誤時立即報錯
+        self.detection_mode = detection_mode
+        self.verbose = verbose
         self.processor = ImageProcessor()
+        if detector_params:
+            self.processor.update_params(detector_params)
         self.classifier = CoinClassifier()
         self.counter = CoinCounter()
+        self.loader = ImageLoader(self.processor.target_width if reduced_decode else None)
+        self.metrics = metrics if metrics is not None else PipelineMetrics(enabled=False)
         
-        print("🪙 OCS 硬幣辨識系統已啟動")
-        print("=" * 50)
+        self._log("🪙 OCS 硬幣辨識系統已啟動")
+        self._log("=" * 50)
+    
+    def _log(self, message: str):
+        """verbose 模式下印出訊息"""
+        if self.verbose:
+            print(message)
     
-    def process_image(self, image_path: str) -> dict:
+    def process_image(self, image_path: str, keep_images: bool = True) -> dict:
         """
         處理單張圖片
         
         Args:
             image_path: 圖片路徑
+            keep_images: 是否在結果中附上原圖與標註結果圖
+                         (大量批次保留結果時設為 False，每張圖片只剩數百 bytes)
             
         Returns:
-            辨識結果
+            辨識結果 {results (COIN_RECORD_DTYPE 結構化陣列), statistics, reduction,
+                      [result_image, decoded_image, original_image]}
+            results 為原始解析度座標；result_image / decoded_image 為解碼後的解析度
+            (原始座標 = 影像座標 * reduction)。original_image 只在未縮小解碼
+            (reduction == 1) 時提供。
         """
-        # 讀取圖片
-        image = cv2.imread(image_path)
+        # 讀取圖片 (reduced_decode 時大型 JPEG 縮小解碼)
+        with self.metrics.stage('read'):
+            loaded = self.loader.load(image_path)
+        image = loaded.image
         if image is None:
-            print(f"❌ 無法讀取圖片: {image_path}")
+            self.metrics.increment('errors')
+            self._log(f"❌ 無法讀取圖片: {image_path} ({loaded.error})")
             return None
         
-        print(f"📷 處理圖片: {image_path}")
-        print(f"   尺寸: {image.shape[1]}x{image.shape[0]}")
+        # image 階段為讀取之後的整體處理 (與 iter_process 相同，不含 read)
+        with self.metrics.stage('image'):
+            self._log(f"📷 處理圖片: {image_path}")
+            self._log(f"   尺寸: {image.shape[1]}x{image.shape[0]}"
+                      + (f" (解碼縮小 1/{loaded.reduction})" if loaded.reduction > 1 else ""))
+            
+            result = self._process_loaded(image, draw=keep_images, reduction=loaded.reduction)
+            result['reduction'] = loaded.reduction
+            if keep_images:
+                result['decoded_image'] = image
+                if loaded.reduction == 1:
+                    result['original_image'] = image
+            return result
+    
+    def iter_process(self, sources: Iterable[Union[str, np.ndarray]], draw: bool = False,
+                     keep_image: bool = False, prefetch: int = 2) -> Iterator[dict]:
+        """
+        逐張處理圖片路徑或影格的串流產生器
+        
+        一次只保留 prefetch 張預先讀取的影像，處理完的影像隨即釋放，
+        無論輸入多少張，記憶體用量維持固定。預設不複製也不繪製影像。
+        
+        Args:
+            sources: 圖片路徑或 BGR 影格 (可為惰性的產生器)
+            draw: 是否附上標註結果圖 (result_image)
+            keep_image: 是否附上原始影像 (image)
+            prefetch: 背景執行緒預先解碼的圖片數 (0 為不預讀)
+            
+        Yields:
+            每張圖片的結果 {index, source, results (COIN_RECORD_DTYPE), statistics, error,
+                            reduction, [result_image], [image]}；讀取失敗時 results / statistics 為 None
+            (result_image / image 為解碼後的解析度，results 為原始解析度座標，
+            原始座標 = 影像座標 * reduction)
+        """
+        # 有界的預讀視窗: 解碼與辨識重疊，但同時存在的影像數量固定
+        # (read 階段為等待預讀結果的時間，與辨識重疊的解碼不計入)
+        loader = ImageLoader(self.loader.target_width, prefetch=prefetch)
+        for index, loaded in enumerate(self._timed(loader.iter_load(sources), 'read')):
+            if loaded.image is None:
+                self.metrics.increment('errors')
+                yield {'index': index, 'source': loaded.path, 'results': None,
+                       'statistics': None, 'error': loaded.error}
+                continue
+            
+            start = time.perf_counter()
+            result = self._process_loaded(loaded.image, draw=draw, reduction=loaded.reduction)
+            if self.metrics.enabled:
+                self.metrics.observe('image', time.perf_counter() - start)
+            result.update(index=index, source=loaded.path, error=None, reduction=loaded.reduction)
+            if keep_image:
+                result['image'] = loaded.image
+            del loaded
+            yield result
+    
+    def _timed(self, iterable: Iterable, stage: str) -> Iterator:
+        """逐項產生 iterable 的內容，並將取得每一項的等待時間記入 stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            if self.metrics.enabled:
+                self.metrics.observe(stage, time.perf_counter() - start)
+            yield item
+    
+    def _process_loaded(self, image: np.ndarray, draw: bool = False, reduction: int = 1) -> dict:
+        """
+        檢測並分類已讀取的影像
         
+        Args:
+            image: BGR 影像
+            draw: 是否繪製標註結果圖 (在 image 的解析度上)
+            reduction: 解碼時的縮小倍率 (像素門檻依 1/reduction 換算，
+                       結果座標乘回 reduction)
+            
+        Returns:
+            {results, statistics, [result_image]}
+        """
         # 重置計數器
         self.counter.reset()
         
         # 檢測硬幣
-        print("🔍 檢測硬幣中...")
-        coins = self.processor.detect_coins_hybrid(image)
-        print(f"   找到 {len(coins)} 個候選硬幣")
+        self._log("🔍 檢測硬幣中...")
+        # 所有檢測器與特徵提取共用同一份預處理結果 (先算出檢測器需要的部分，分開計時)
+        detector = get_detector(self.detection_mode)
+        with self.metrics.stage('preprocess'):
+            prepared = detector.preprocess(self.processor, image, scale=1.0 / reduction)
+        with self.metrics.stage('detect'):
+            coins = detector(self.processor, prepared)
+        self._log(f"   找到 {len(coins)} 個候選硬幣")
         
         # 分類每個硬幣
-        print("🎯 分類硬幣中...")
-        results = []
-        
-        for i, coin in enumerate(coins):
-            # 提取 ROI
-            roi = self.processor.extract_coin_roi(
-                image, coin['x'], coin['y'], coin['radius']
-            )
-            
-            # 提取顏色特徵
-            color_features = self.processor.extract_color_features(roi)
-            
-            # 分類硬幣
-            classification = self.classifier.classify_coin(
-                roi, coin['radius'], color_features
-            )
-            
-            # 記錄結果
-            self.counter.add_coin(
-                classification['denomination'],
-                classification['side']
-            )
+        self._log("🎯 分類硬幣中...")
+        results = self._classify_coins(image, prepared, coins, radius_scale=reduction)
+        
+        result = {
+            'results': results,
+            'statistics': self.counter.get_statistics()
+        }
+        if draw:
+            # 繪製結果
+            with self.metrics.stage('draw'):
+                result['result_image'] = self._draw_results(image, results)
+        self.metrics.increment('images')
+        self.metrics.increment('coins', len(results))
+        if reduction > 1:
+            # 換算回原始解析度座標
+            for field in ('x', 'y', 'radius'):
+                results[field] *= reduction
+            results['area'] *= reduction * reduction
+        return result
+    
+    def _classify_coins(self, image, prepared, coins, verbose: Optional[bool] = None,
+                        radius_scale: float = 1.0) -> np.ndarray:
+        """
+        分類硬幣並記錄到計數器
+        
+        Args:
+            image: 原始 BGR 影像
+            prepared: 同一張影像的 PreparedImage
+            coins: 檢測到的硬幣列表
+            verbose: 是否逐一印出分類結果 (None 沿用 self.verbose)
+            radius_scale: 影像半徑換算為原始解析度半徑的倍率 (縮小解碼時使用)
             
-            # 儲存完整資訊
-            result = {
-                'id': i + 1,
-                'x': coin['x'],
-                'y': coin['y'],
-                'radius': coin['radius'],
-                'denomination': classification['denomination'],
-                'side': classification['side'],
-                'confidence': classification['confidence']
-            }
-            results.append(result)
+        Returns:
+            辨識結果 (COIN_RECORD_DTYPE 結構化陣列，第 i 筆為硬幣 #i+1)
+        """
+        # 一次提取所有硬幣的顏色特徵
+        with self.metrics.stage('color'):
+            all_color_features = self.processor.extract_color_features_batch(prepared, coins)
+        
+        # 紋理分數: 硬幣多時以積分表一次算出 (每個硬幣 O(1))，否則逐一裁切 ROI
+        with self.metrics.stage('texture'):
+            bounds = self.processor.coin_roi_bounds(image.shape, coins)
+            if self.processor.prefers_region_stats(image.shape, bounds):
+                texture_scores = self.classifier.calculate_texture_complexity_batch(
+                    prepared.stats, bounds
+                )
+            else:
+                texture_scores = self.classifier.calculate_texture_complexity_rois(
+                    prepared.gray, bounds
+                )
+        
+        # 一次分類所有硬幣 (面額 + 正反面)
+        with self.metrics.stage('classify'):
+            results = coin_records(coins)
+            batch = self.classifier.classify_coins_batch(results['radius'] * radius_scale,
+                                                         all_color_features, texture_scores)
+            results['denomination'] = batch['denomination']
+            results['side'] = batch['side']
+            results['confidence'] = batch['confidence']
             
-            print(f"   硬幣 #{i+1}: {classification['denomination']}元 "
-                  f"({classification['side']}) - "
-                  f"信心度: {classification['confidence']:.2f}")
+            # 記錄到計數器 (一次累加)
+            self.counter.add_batch(results['denomination'], results['side'])
         
-        # 獲取統計資料
-        stats = self.counter.get_statistics()
+        if self.verbose if verbose is None else verbose:
+            for i, result in enumerate(results):
+                print(f"   硬幣 #{i+1}: {result['denomination']}元 "
+                      f"({result['side']}) - "
+                      f"信心度: {result['confidence']:.2f}")
         
-        # 繪製結果
-        result_image = self._draw_results(image, results)
+        return results
+    
+    def process_video(self, source=0, max_frames: int = None, full_detect_interval: int = 30):
+        """
+        處理影片或相機串流 (時間連貫模式)
         
-        return {
-            'results': results,
-            'statistics': stats,
-            'result_image': result_image,
-            'original_image': image
-        }
+        以 TemporalCoinDetector 沿用前一張影格的硬幣，只在變動區域重新檢測；
+        未移動的硬幣也沿用先前的分類結果。
+        
+        Args:
+            source: 相機編號或影片路徑
+            max_frames: 最多處理幾張影格 (None 為直到串流結束)
+            full_detect_interval: 每隔幾張影格做一次完整檢測
+            
+        Yields:
+            每張影格的結果 {frame_index, frame, results (COIN_RECORD_DTYPE), statistics, update}
+        """
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            print(f"❌ 無法開啟影片來源: {source}")
+            return
+        
+        # 同尺寸連續影格：使用預配置緩衝區 (結束時恢復呼叫端原本的設定)
+        previous_workspace = self.processor.workspace
+        if previous_workspace is None:
+            self.processor.enable_workspace()
+        tracker = TemporalCoinDetector(self.processor, full_detect_interval=full_detect_interval)
+        
+        try:
+            while max_frames is None or tracker.frame_index < max_frames:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                
+                coins = tracker.update(frame)
+                
+                # 只分類新出現或移動過的硬幣，其餘沿用快取的分類
+                pending = [coin for coin in coins if 'denomination' not in coin]
+                if pending:
+                    # 完整檢測的影格沿用追蹤器已準備的 PreparedImage
+                    prepared = tracker.last_prepared
+                    if prepared is None:
+                        prepared = self.processor.prepare(frame)
+                    for coin, result in zip(pending, self._classify_coins(
+                            frame, prepared, pending, verbose=False)):
+                        coin.update(denomination=int(result['denomination']),
+                                    side=str(result['side']),
+                                    confidence=float(result['confidence']))
+                
+                results = coin_records(coins)
+                for field in ('denomination', 'side', 'confidence'):
+                    results[field] = [coin[field] for coin in coins]
+                self.counter.reset()
+                self.counter.add_batch(results['denomination'], results['side'])
+                
+                yield {
+                    'frame_index': tracker.frame_index - 1,
+                    'frame': frame,
+                    'results': results,
+                    'statistics': self.counter.get_statistics(),
+                    'update': tracker.last_update
+                }
+        finally:
+            capture.release()
+            self.processor.workspace = previous_workspace
     
     def _draw_results(self, image, results):
         """繪製辨識結果"""
         result_img = image.copy()
         
         for coin in results:
-            x, y, radius = coin['x'], coin['y'], coin['radius']
-            denom = coin['denomination']
-            side = coin['side']
+            # 結構化陣列的欄位為 NumPy 純量，轉回 Python 型別
+            x, y, radius = int(coin['x']), int(coin['y']), int(coin['radius'])
+            denom = int(coin['denomination'])
+            side = str(coin['side'])
             
             # 根據面額選擇顏色
             colors = {1: (255, 0, 0), 5: (0, 255, 255), 
@@ -169,8 +386,262 @@ class OCSSystem:
         print(f"💾 結果已儲存至: {output_path}")
 
 
+# ========== 批次模式 (多行程，無顯示) ==========
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+CSV_FIELDS = ['path', 'total_count', 'total_value', 'count_1', 'count_5', 'count_10',
+              'count_50', 'heads', 'tails', 'seconds', 'error']
+
+# 每個 worker 行程各自擁有的系統 (ImageProcessor / CoinClassifier)
+_batch_system: Optional[OCSSystem] = None
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """
+    將資料夾 / glob 樣式 / 檔案路徑展開成圖片路徑列表
+    
+    Args:
+        inputs: 路徑列表 (資料夾只取第一層的圖片；glob 支援 **)
+        
+    Returns:
+        排序後且不重複的圖片路徑
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in os.listdir(item))
+        elif glob.has_magic(item):
+            paths.extend(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+    images = [p for p in paths if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS]
+    return sorted(set(images))
+
+
+def _init_batch_worker(detection_mode: str, collect_metrics: bool = False,
+                       reduced_decode: bool = False,
+                       detector_params: Optional[Dict[str, Dict]] = None):
+    """worker 行程初始化: 建立該行程專用的系統"""
+    global _batch_system
+    _batch_system = OCSSystem(detection_mode, verbose=False, reduced_decode=reduced_decode,
+                              metrics=PipelineMetrics(enabled=collect_metrics),
+                              detector_params=detector_params)
+
+
+def _process_batch_image(path: str) -> Dict:
+    """
+    worker 任務: 處理單張圖片並返回可序列化的結果列
+    
+    Returns:
+        {path, statistics, counter, coins, seconds, error, timings}
+        (timings 為各階段耗時，未啟用計時時為空 dict)
+    """
+    start = time.perf_counter()
+    try:
+        result = _batch_system.process_image(path, keep_images=False)
+    except Exception as e:  # 單張圖片失敗不中斷整個批次
+        result, error = None, f"{type(e).__name__}: {e}"
+    else:
+        error = None if result is not None else "無法讀取圖片"
+    
+    row = {'path': path, 'seconds': time.perf_counter() - start, 'error': error,
+           'statistics': None, 'counter': None, 'coins': [],
+           'timings': _batch_system.metrics.pop_current()}
+    if result is not None:
+        counter = CoinCounter()
+        counter.merge(_batch_system.counter)
+        row.update(statistics=result['statistics'], counter=counter,
+                   coins=coin_records_to_dicts(result['results']))
+    return row
+
+
+class BatchWriter:
+    """批次結果串流輸出 (JSONL 或 CSV，依副檔名判斷)"""
+    
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        """
+        Args:
+            path: 輸出檔案路徑
+            fmt: 'jsonl' / 'csv' (None 依副檔名判斷，預設 jsonl)
+        """
+        self.format = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
+            self._csv.writeheader()
+    
+    def write(self, row: Dict):
+        """寫入一張圖片的結果 (立即 flush，中斷時已完成的結果不會遺失)"""
+        stats = row['statistics']
+        if self._csv is not None:
+            breakdown = stats['breakdown'] if stats else {}
+            self._csv.writerow({
+                'path': row['path'],
+                'total_count': stats['total_count'] if stats else '',
+                'total_value': stats['total_value'] if stats else '',
+                **{f'count_{d}': breakdown[d]['total'] if stats else '' for d in (1, 5, 10, 50)},
+                'heads': sum(b['heads'] for b in breakdown.values()) if stats else '',
+                'tails': sum(b['tails'] for b in breakdown.values()) if stats else '',
+                'seconds': f"{row['seconds']:.4f}",
+                'error': row['error'] or ''
+            })
+        else:
+            record = {key: row[key] for key in ('path', 'statistics', 'coins', 'seconds', 'error')}
+            if row.get('timings'):
+                record['timings'] = row['timings']
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def process_batch(paths: List[str], workers: Optional[int] = None,
+                  detection_mode: str = 'hybrid', chunksize: int = 4,
+                  collect_metrics: bool = False,
+                  reduced_decode: bool = False,
+                  detector_params: Optional[Dict[str, Dict]] = None) -> Iterator[Dict]:
+    """
+    以行程池平行處理大量圖片，依輸入順序逐張產生結果
+    
+    Args:
+        paths: 圖片路徑列表
+        workers: 行程數 (None 為 CPU 核心數，1 表示在目前行程中執行)
+        detection_mode: 檢測器名稱
+        chunksize: 每次分派給 worker 的圖片數
+        collect_metrics: worker 是否記錄各階段耗時 (結果列的 timings)
+        reduced_decode: 大型 JPEG 是否縮小解碼 (見 OCSSystem)
+        detector_params: 覆寫檢測器參數 (見 OCSSystem)
+        
+    Yields:
+        每張圖片的結果列 {path, statistics, counter, coins, seconds, error, timings}
+    """
+    get_detector(detection_mode)  # 在啟動行程前檢查名稱
+    if workers == 1:
+        _init_batch_worker(detection_mode, collect_metrics, reduced_decode, detector_params)
+        yield from map(_process_batch_image, paths)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                             initargs=(detection_mode, collect_metrics, reduced_decode,
+                                       detector_params)) as executor:
+        yield from executor.map(_process_batch_image, paths, chunksize=chunksize)
+
+
+def run_batch(inputs: List[str], output: str, workers: Optional[int] = None,
+              detection_mode: str = 'hybrid', fmt: Optional[str] = None,
+              progress_every: int = 100, metrics: Optional[PipelineMetrics] = None,
+              metrics_path: Optional[str] = None,
+              reduced_decode: bool = False) -> CoinCounter:
+    """
+    批次模式主流程: 展開輸入 → 平行處理 → 串流寫出 → 印出吞吐量
+    
+    Args:
+        inputs: 資料夾 / glob / 檔案路徑
+        output: 輸出檔案 (.jsonl 或 .csv)
+        workers: 行程數
+        detection_mode: 檢測器名稱
+        fmt: 輸出格式 (None 依副檔名)
+        progress_every: 每處理幾張印一次進度 (0 不印)
+        metrics: 彙整各 worker 分段耗時的 PipelineMetrics (None 不計時)
+        metrics_path: 指標快照檔 (.json 或 Prometheus 文字格式，隨進度更新)
+        reduced_decode: 大型 JPEG 是否縮小解碼 (見 OCSSystem)
+        
+    Returns:
+        所有圖片合計的 CoinCounter
+    """
+    paths = expand_inputs(inputs)
+    print(f"📦 批次處理: {len(paths)} 張圖片, 行程數 {workers or os.cpu_count()}, "
+          f"檢測模式 {detection_mode}, 輸出至 {output}")
+    
+    total = CoinCounter()
+    failed = 0
+    start = time.perf_counter()
+    with BatchWriter(output, fmt) as writer:
+        rows = process_batch(paths, workers, detection_mode, collect_metrics=metrics is not None,
+                             reduced_decode=reduced_decode)
+        for done, row in enumerate(rows, 1):
+            writer.write(row)
+            if row['counter'] is not None:
+                total.merge(row['counter'])
+            else:
+                failed += 1
+            if metrics is not None:
+                metrics.observe_many(row['timings'])
+                metrics.increment('images')
+                metrics.increment('coins', len(row['coins']))
+                if row['error']:
+                    metrics.increment('errors')
+            if progress_every and done % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"   {done}/{len(paths)} 張, {done / elapsed:.2f} 張/秒")
+                if metrics is not None and metrics_path:
+                    metrics.write(metrics_path)
+    
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(f"✅ 批次完成: {len(paths)} 張圖片, 耗時 {elapsed:.1f} 秒 ({rate:.2f} 張/秒), "
+          f"失敗 {failed} 張, 共 {total.total_count} 個硬幣, 總金額 {total.total_value} 元")
+    if metrics is not None:
+        print(metrics.format_summary())
+        if metrics_path:
+            metrics.write(metrics_path)
+            print(f"💾 指標已儲存至: {metrics_path}")
+    return total
+
+
 def main():
-    """主程式"""
+    """主程式 (帶入圖片 / 資料夾 / glob 時執行批次模式，否則執行單張示範)"""
+    parser = argparse.ArgumentParser(description="OCS 硬幣辨識系統")
+    parser.add_argument("inputs", nargs="*", help="圖片、資料夾或 glob 樣式 (例如 'shots/**/*.jpg')")
+    parser.add_argument("-o", "--output", default="ocs_results.jsonl",
+                        help="批次結果輸出檔 (.jsonl 或 .csv)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="行程數 (預設為 CPU 核心數)")
+    parser.add_argument("-m", "--mode", default="hybrid", help="檢測器名稱")
+    parser.add_argument("--reduced-decode", action="store_true",
+                        help="大型 JPEG 在解碼時縮小 (較快，但分類結果可能與原解析度不同)")
+    parser.add_argument("--progress", type=int, default=100, help="每處理幾張印一次進度 (0 不印)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="啟用分段計時並寫出指標快照 (.json 或 Prometheus 文字格式 .prom)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="啟用分段計時並在 http://127.0.0.1:PORT/metrics 提供指標")
+    parser.add_argument("--profile", action="store_true",
+                        help="以 cProfile 分析第一張輸入圖片 (不執行批次)")
+    parser.add_argument("--profile-output", metavar="FILE", help="儲存原始 profile (.prof)")
+    args = parser.parse_args()
+    
+    if args.profile:
+        paths = expand_inputs(args.inputs)
+        if not paths:
+            parser.error("--profile 需要至少一張輸入圖片")
+        system = OCSSystem(args.mode, verbose=False, reduced_decode=args.reduced_decode,
+                           metrics=PipelineMetrics())
+        system.process_image(paths[0], keep_images=False)  # 暖機 (載入模組、配置)
+        system.metrics.reset()
+        profile_call(system.process_image, paths[0], keep_images=False,
+                     output=args.profile_output)
+        print(system.metrics.format_summary())
+        return
+    
+    if args.inputs:
+        metrics = None
+        if args.metrics or args.metrics_port:
+            metrics = PipelineMetrics()
+        if args.metrics_port:
+            server = serve_metrics(metrics, args.metrics_port)
+            print(f"📈 指標端點: http://127.0.0.1:{server.server_address[1]}/metrics")
+        run_batch(args.inputs, args.output, args.workers, args.mode,
+                  progress_every=args.progress, metrics=metrics, metrics_path=args.metrics,
+                  reduced_decode=args.reduced_decode)
+        return
+    
     # 建立系統
     system = OCSSystem()
     
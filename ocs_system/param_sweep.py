@@ -0,0 +1,345 @@
+"""
+參數掃描引擎 - 平行測試檢測參數組合並找出 數量誤差 / 耗時 的 Pareto 前緣
+
+用法:
+    python param_sweep.py                       # 預設 Hough 參數網格
+    python param_sweep.py --detector hybrid     # 同時掃描 Contour 門檻
+    python param_sweep.py --detector accumulator  # 快取累加器，param2/minDist 組合幾乎免費
+    python param_sweep.py --workers 4 --top 10
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+# 設定 Windows 控制台編碼 (解決 emoji 顯示問題)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from core.detectors import detect
+from core.image_processor import ImageProcessor
+from test_config import TEST_IMAGES
+
+TEST_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "test_images")
+
+HOUGH_KEYS = ('dp', 'param1', 'param2', 'minDist', 'minRadius', 'maxRadius')
+CONTOUR_KEYS = ('min_area', 'max_area_ratio', 'min_radius', 'max_radius',
+                'min_circularity', 'min_aspect', 'max_aspect')
+DETECTORS = ('hough', 'accumulator', 'contours', 'hybrid')
+# 決定 Hough 累加器內容的參數 (放在網格最外層，讓同一個累加器的查詢連續執行)
+ACCUMULATOR_KEYS = ('dp', 'param1', 'minRadius', 'maxRadius')
+
+# 預設掃描網格 (未列出的參數沿用 ImageProcessor 的生產環境預設值)
+HOUGH_GRID = {
+    'param1': [50, 60],
+    'param2': [25, 30, 35, 40],
+    'minDist': [45, 80],
+    'minRadius': [20, 30],
+    'maxRadius': [80, 95],
+}
+CONTOUR_GRID = {
+    'min_area': [500, 800, 1200],
+    'min_circularity': [0.75, 0.80, 0.85],
+}
+
+# 每個 worker 行程的預處理快取 {影像路徑: PreparedImage}
+_worker_processor = None
+_worker_cache = {}
+
+
+def build_grid(grid: Dict[str, Sequence], detector: str = 'hough') -> List[Dict]:
+    """
+    將參數網格展開成參數組合列表
+
+    Args:
+        grid: {參數名稱: 候選值列表}，可混合 Hough 與 Contour 參數
+        detector: 'hough' / 'accumulator' / 'contours' / 'hybrid'
+
+    Returns:
+        [{'detector': ..., 參數: 值, ...}, ...] (略過 minRadius >= maxRadius 等無效組合)
+    """
+    if detector not in DETECTORS:
+        raise ValueError(f"未知的檢測方法: {detector}")
+    unknown = set(grid) - set(HOUGH_KEYS) - set(CONTOUR_KEYS)
+    if unknown:
+        raise ValueError(f"未知的參數: {sorted(unknown)}")
+
+    keys = sorted(grid, key=lambda k: k not in ACCUMULATOR_KEYS)
+    configs = []
+    for values in product(*(grid[k] for k in keys)):
+        config = dict(zip(keys, values))
+        if config.get('minRadius', 0) >= config.get('maxRadius', math.inf):
+            continue
+        if config.get('min_radius', 0) >= config.get('max_radius', math.inf):
+            continue
+        config['detector'] = detector
+        configs.append(config)
+    return configs
+
+
+def default_grid(detector: str = 'hough') -> List[Dict]:
+    """
+    預設掃描網格
+
+    Args:
+        detector: 'hough' / 'accumulator' / 'contours' / 'hybrid'
+
+    Returns:
+        參數組合列表
+    """
+    grid = {}
+    if detector in ('hough', 'accumulator', 'hybrid'):
+        grid.update(HOUGH_GRID)
+    if detector in ('contours', 'hybrid'):
+        grid.update(CONTOUR_GRID)
+    return build_grid(grid, detector)
+
+
+def run_config(processor: ImageProcessor, prepared, config: Dict) -> List[Dict]:
+    """
+    以單一參數組合執行檢測
+
+    Args:
+        processor: ImageProcessor
+        prepared: PreparedImage (預處理結果在各組合間共用)
+        config: 參數組合 (含 'detector')
+
+    Returns:
+        硬幣資訊列表
+    """
+    hough = {k: config[k] for k in HOUGH_KEYS if k in config}
+    contour = {k: config[k] for k in CONTOUR_KEYS if k in config}
+    detector = config.get('detector', 'hough')
+
+    if detector == 'contours':
+        params = contour
+    elif detector == 'hybrid':
+        params = {'hough': hough, 'contour': contour}
+    else:
+        params = hough
+    return detect(processor, prepared, detector, params)
+
+
+def _prepared_for(path: str):
+    """取得 worker 行程內快取的 PreparedImage (模糊 / 輪廓只計算一次)"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = ImageProcessor()
+
+    if path not in _worker_cache:
+        # 任務依影像分組，只保留目前這張影像以限制記憶體
+        _worker_cache.clear()
+        image = cv2.imread(path)
+        if image is None:
+            raise FileNotFoundError(f"無法讀取圖片: {path}")
+
+        start = time.perf_counter()
+        prepared = _worker_processor.prepare(image)
+        prepared.hough_blurred
+        prepared.contours
+        _worker_cache[path] = (prepared, time.perf_counter() - start)
+    return _worker_cache[path]
+
+
+def accumulator_group(config: Dict) -> Tuple:
+    """累加器參數組 (dp / param1 / 半徑範圍相同的組合共用同一個累加器)"""
+    return tuple(config.get(k) for k in ACCUMULATOR_KEYS)
+
+
+def _sweep_chunk(task: Tuple[str, List[Tuple[int, Dict]], bool]) -> Tuple[str, float, List[Tuple], Dict]:
+    """
+    worker 任務：在同一張影像上執行一段參數組合
+
+    Returns:
+        (影像路徑, 預處理耗時, [(組合索引, 數量, 耗時, 圓列表或 None), ...],
+         {累加器參數組: 建立耗時})
+    """
+    path, configs, keep_circles = task
+    prepared, prep_time = _prepared_for(path)
+
+    rows = []
+    builds = {}
+    for index, config in configs:
+        if config.get('detector') == 'accumulator':
+            # 累加器在計時前先建立 (已快取時幾乎不耗時)，建立耗時另外回報，
+            # 由 sweep() 平均分攤給同一參數組的所有組合
+            group = accumulator_group(config)
+            hough = {k: config[k] for k in HOUGH_KEYS if k in config}
+            start = time.perf_counter()
+            _worker_processor.hough_accumulator(prepared, hough)
+            builds[group] = max(builds.get(group, 0.0), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        coins = run_config(_worker_processor, prepared, config)
+        elapsed = time.perf_counter() - start
+        circles = [(c['x'], c['y'], c['radius']) for c in coins] if keep_circles else None
+        rows.append((index, len(coins), elapsed, circles))
+    return path, prep_time, rows, builds
+
+
+def sweep(images: Dict[str, int], configs: List[Dict], max_workers: Optional[int] = None,
+          keep_circles: bool = False) -> List[Dict]:
+    """
+    在所有影像上平行執行參數網格
+
+    每張影像的預處理 (CLAHE / 模糊 / 輪廓) 在每個 worker 中只計算一次，
+    各參數組合只計時檢測本身。accumulator 的累加器建立耗時 (每張影像、每個
+    dp / param1 / 半徑範圍一次) 平均分攤給共用它的組合，耗時才能與
+    hough / hybrid 比較。
+
+    Args:
+        images: {影像路徑: 預期硬幣數量}
+        configs: 參數組合列表 (見 build_grid)
+        max_workers: 行程數 (None 為 CPU 核心數，1 表示在目前行程中執行)
+        keep_circles: 是否保留每個組合的檢測結果 (供繪圖使用)
+
+    Returns:
+        每個組合的結果 [{config, error, runtime, counts, circles}, ...]，順序與 configs 相同
+    """
+    workers = max_workers or os.cpu_count() or 1
+
+    # 每張影像切成數段，影像數少於行程數時仍可填滿行程池
+    pieces = max(1, math.ceil(workers / max(1, len(images))))
+    chunk = max(1, math.ceil(len(configs) / pieces))
+    indexed = list(enumerate(configs))
+    tasks = [(path, indexed[i:i + chunk], keep_circles)
+             for path in images for i in range(0, len(indexed), chunk)]
+
+    results = [{'config': config, 'error': 0, 'runtime': 0.0, 'counts': {},
+                'circles': {} if keep_circles else None} for config in configs]
+
+    if workers == 1:
+        outputs = map(_sweep_chunk, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        outputs = executor.map(_sweep_chunk, tasks)
+
+    # {(影像路徑, 累加器參數組): 建立耗時}，同一組被切到多個任務時取最大值 (真正建立的那次)
+    build_times = {}
+    try:
+        for path, _, rows, builds in outputs:
+            for group, elapsed in builds.items():
+                build_times[path, group] = max(build_times.get((path, group), 0.0), elapsed)
+            name = os.path.basename(path)
+            for index, count, elapsed, circles in rows:
+                result = results[index]
+                result['counts'][name] = count
+                result['error'] += abs(count - images[path])
+                result['runtime'] += elapsed
+                if keep_circles:
+                    result['circles'][name] = circles
+    finally:
+        if workers != 1:
+            executor.shutdown()
+
+    group_builds = Counter()
+    for (_, group), elapsed in build_times.items():
+        group_builds[group] += elapsed
+    group_sizes = Counter(accumulator_group(config) for config in configs
+                          if config.get('detector') == 'accumulator')
+    for result in results:
+        if result['config'].get('detector') == 'accumulator':
+            group = accumulator_group(result['config'])
+            result['runtime'] += group_builds[group] / group_sizes[group]
+
+    return results
+
+
+def pareto_frontier(results: List[Dict]) -> List[Dict]:
+    """
+    數量誤差 / 耗時 的 Pareto 前緣
+
+    Args:
+        results: sweep() 的結果
+
+    Returns:
+        前緣上的結果 (依耗時遞增、誤差遞減排列)
+    """
+    frontier = []
+    best_error = math.inf
+    for result in sorted(results, key=lambda r: (r['runtime'], r['error'])):
+        if result['error'] < best_error:
+            frontier.append(result)
+            best_error = result['error']
+    return frontier
+
+
+def format_config(config: Dict) -> str:
+    """參數組合的單行文字"""
+    return ", ".join(f"{k}={v}" for k, v in config.items() if k != 'detector')
+
+
+def load_test_images(image_dir: str = TEST_IMAGE_DIR) -> Dict[str, int]:
+    """
+    test_config.TEST_IMAGES 中實際存在的測試圖片
+
+    Returns:
+        {影像路徑: 預期硬幣數量}
+    """
+    images = {}
+    for name, config in TEST_IMAGES.items():
+        path = os.path.join(image_dir, name)
+        if os.path.exists(path):
+            images[path] = config['total_count']
+    return images
+
+
+def print_report(results: List[Dict], top: int = 5):
+    """輸出 Pareto 前緣與最便宜的零誤差組合"""
+    frontier = pareto_frontier(results)
+
+    print("\n" + "=" * 60)
+    print("📊 Pareto 前緣 (數量誤差 vs 耗時)")
+    print("=" * 60)
+    for result in frontier[:top] if top else frontier:
+        print(f"  誤差 {result['error']:3d} | {result['runtime'] * 1000:8.1f} ms | "
+              f"[{result['config']['detector']}] {format_config(result['config'])}")
+
+    exact = [r for r in frontier if r['error'] == 0]
+    if exact:
+        best = exact[0]
+        print(f"\n✅ 最便宜的零誤差組合 ({best['runtime'] * 1000:.1f} ms):")
+        print(f"   [{best['config']['detector']}] {format_config(best['config'])}")
+    else:
+        print(f"\n⚠️ 沒有組合完全符合預期數量 (最小誤差 {frontier[-1]['error']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCS 檢測參數掃描")
+    parser.add_argument("--detector", choices=DETECTORS, default="hough", help="檢測方法")
+    parser.add_argument("--workers", type=int, default=None, help="行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--top", type=int, default=0, help="只顯示前緣的前 N 筆 (0 為全部)")
+    parser.add_argument("--image-dir", default=TEST_IMAGE_DIR, help="測試圖片資料夾")
+    args = parser.parse_args()
+
+    images = load_test_images(args.image_dir)
+    if not images:
+        print(f"❌ 找不到 test_config 中的測試圖片: {args.image_dir}")
+        sys.exit(1)
+
+    configs = default_grid(args.detector)
+    print(f"🔬 掃描 {len(configs)} 組參數 × {len(images)} 張圖片 ({args.detector})")
+
+    start = time.perf_counter()
+    results = sweep(images, configs, max_workers=args.workers)
+    print(f"⏱️ 總耗時: {time.perf_counter() - start:.2f} 秒")
+
+    print_report(results, args.top)
+
+
+if __name__ == "__main__":
+    main()
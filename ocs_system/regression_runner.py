@@ -0,0 +1,306 @@
+"""
+回歸測試 - 平行評估所有標註圖片的辨識準確度與耗時
+
+用法:
+    python regression_runner.py                              # test_config.TEST_IMAGES
+    python regression_runner.py --labels synthetic/          # 另加含 .json 標註檔的資料夾
+    python regression_runner.py -o report.json               # 寫出報告 (可作為之後的基準線)
+    python regression_runner.py --baseline report.json       # 與先前報告比較
+
+沒有基準線時，任何與標註不符的圖片都視為失敗；有基準線時，誤差增加或
+延遲超過容許值才視為退化。失敗時以非零狀態碼結束，可作為調整參數的檢查關卡。
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# 設定 Windows 控制台編碼 (解決 emoji 顯示問題)
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from main import IMAGE_EXTENSIONS, process_batch
+from test_config import TEST_IMAGES
+from utils.evaluation import match_recall
+
+TEST_IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "test_images")
+DENOMINATIONS = (1, 5, 10, 50)
+
+
+def normalize_labels(labels: Dict) -> Dict:
+    """
+    統一標註格式 (JSON 標註檔的面額鍵為字串)
+
+    Args:
+        labels: TEST_IMAGES 格式的標註 {total_value, total_count, coins, [circles]}
+
+    Returns:
+        面額鍵為 int 的標註
+    """
+    labels = dict(labels)
+    labels['coins'] = {int(denom): dict(data) for denom, data in labels.get('coins', {}).items()}
+    return labels
+
+
+def collect_cases(image_dir: str = TEST_IMAGE_DIR,
+                  label_dirs: Sequence[str] = ()) -> List[Tuple[str, Dict]]:
+    """
+    收集要評估的圖片與標註
+
+    Args:
+        image_dir: test_config.TEST_IMAGES 的圖片資料夾
+        label_dirs: 其他資料夾 (圖片旁有同名 .json 標註檔者才納入)
+
+    Returns:
+        [(圖片路徑, 標註), ...]
+    """
+    cases = []
+    for name, config in TEST_IMAGES.items():
+        path = os.path.join(image_dir, name)
+        if os.path.exists(path):
+            cases.append((path, normalize_labels(config)))
+
+    for folder in label_dirs:
+        for name in sorted(os.listdir(folder)):
+            stem, ext = os.path.splitext(name)
+            label_path = os.path.join(folder, stem + '.json')
+            if ext.lower() not in IMAGE_EXTENSIONS or not os.path.exists(label_path):
+                continue
+            with open(label_path, encoding='utf-8') as f:
+                cases.append((os.path.join(folder, name), normalize_labels(json.load(f))))
+    return cases
+
+
+def compare_with_labels(statistics: Optional[Dict], labels: Dict) -> Dict:
+    """
+    計算單張圖片與標註的誤差 (實際 - 預期)
+
+    Args:
+        statistics: CoinCounter.get_statistics() (讀取失敗時為 None)
+        labels: normalize_labels 後的標註
+
+    Returns:
+        {count, value, denominations: {面額: {count, heads, tails}}, exact}
+    """
+    if statistics is None:
+        return {'count': -labels['total_count'], 'value': -labels['total_value'],
+                'denominations': {}, 'exact': False}
+
+    denominations = {}
+    for denom in DENOMINATIONS:
+        expected = labels['coins'].get(denom, {})
+        actual = statistics['breakdown'][denom]
+        errors = {'count': actual['total'] - expected.get('count', 0)}
+        for side in ('heads', 'tails'):
+            if side in expected:
+                errors[side] = actual[side] - expected[side]
+        denominations[denom] = errors
+
+    count = statistics['total_count'] - labels['total_count']
+    value = statistics['total_value'] - labels['total_value']
+    exact = (count == 0 and value == 0
+             and all(e == 0 for errors in denominations.values() for e in errors.values()))
+    return {'count': count, 'value': value, 'denominations': denominations, 'exact': exact}
+
+
+def run(cases: List[Tuple[str, Dict]], detection_mode: str = 'hybrid',
+        workers: Optional[int] = None, reduced_decode: bool = False) -> Dict:
+    """
+    平行評估所有圖片
+
+    標註含 detector_params (synthetic_scenes 的合成場景) 的圖片以該參數覆寫檢測器。
+
+    Args:
+        cases: collect_cases 的結果
+        detection_mode: 檢測器名稱
+        workers: 行程數 (None 為 CPU 核心數，1 表示在目前行程中執行)
+        reduced_decode: 大型 JPEG 是否縮小解碼 (見 main.OCSSystem)
+
+    Returns:
+        報告 {mode, environment, summary, images: [...]}
+    """
+    labels_by_path = dict(cases)
+    # 標註檔可指定檢測器參數覆寫 (合成場景)，相同參數的圖片一起處理
+    groups = {}
+    for path, labels in cases:
+        key = json.dumps(labels.get('detector_params'), sort_keys=True)
+        groups.setdefault(key, []).append(path)
+
+    rows = (row for key, paths in groups.items()
+            for row in process_batch(paths, workers, detection_mode, chunksize=1,
+                                     collect_metrics=True, reduced_decode=reduced_decode,
+                                     detector_params=json.loads(key)))
+    images = []
+    start = time.perf_counter()
+    for row in rows:
+        labels = labels_by_path[row['path']]
+        stats = row['statistics']
+        entry = {
+            'path': row['path'],
+            'expected': {'count': labels['total_count'], 'value': labels['total_value']},
+            'actual': ({'count': stats['total_count'], 'value': stats['total_value']}
+                       if stats else None),
+            'errors': compare_with_labels(stats, labels),
+            'seconds': row['seconds'],
+            'timings': row['timings'],
+            'error': row['error'],
+        }
+        if labels.get('circles'):
+            circles = [(c['x'], c['y'], c['radius']) for c in labels['circles']]
+            entry['recall'] = match_recall(row['coins'], circles)
+        images.append(entry)
+    elapsed = time.perf_counter() - start
+
+    seconds = [entry['seconds'] for entry in images]
+    summary = {
+        'images': len(images),
+        'exact': sum(entry['errors']['exact'] for entry in images),
+        'abs_count_error': sum(abs(entry['errors']['count']) for entry in images),
+        'abs_value_error': sum(abs(entry['errors']['value']) for entry in images),
+        'p50_ms': float(np.percentile(seconds, 50)) * 1000 if seconds else None,
+        'p95_ms': float(np.percentile(seconds, 95)) * 1000 if seconds else None,
+        'wall_seconds': elapsed,
+        'images_per_second': len(images) / elapsed if elapsed > 0 else None,
+    }
+    return {
+        'mode': detection_mode,
+        'reduced_decode': reduced_decode,
+        'environment': {'python': platform.python_version(), 'opencv': cv2.__version__,
+                        'cpu_count': os.cpu_count()},
+        'summary': summary,
+        'images': images,
+    }
+
+
+def _error_items(entry: Dict) -> List[Tuple[str, int]]:
+    """單張圖片的所有誤差項目 [(名稱, 實際 - 預期), ...]"""
+    errors = entry['errors']
+    items = [('count', errors['count']), ('value', errors['value'])]
+    for denom, values in errors['denominations'].items():
+        items.extend((f"{denom}元 {key}", v) for key, v in values.items())
+    return items
+
+
+def find_regressions(report: Dict, baseline: Optional[Dict] = None, tolerance: float = 0.25,
+                     min_ms: float = 5.0, max_p95_ms: Optional[float] = None) -> List[str]:
+    """
+    找出退化的項目
+
+    Args:
+        report: run() 的報告
+        baseline: 先前的報告 (None 時與標註完全一致才算通過)
+        tolerance: 延遲的相對容許值
+        min_ms: 延遲的絕對差距門檻 (避免極小數值的雜訊)
+        max_p95_ms: p95 延遲上限 (None 不檢查)
+
+    Returns:
+        退化說明的列表 (空列表表示通過)
+    """
+    regressions = []
+    if baseline is None:
+        for entry in report['images']:
+            if not entry['errors']['exact']:
+                wrong = ", ".join(f"{name} {value:+d}" for name, value in _error_items(entry) if value)
+                regressions.append(f"{os.path.basename(entry['path'])}: 與標註不符 ({wrong})")
+    else:
+        previous = {os.path.basename(e['path']): e for e in baseline['images']}
+        for entry in report['images']:
+            name = os.path.basename(entry['path'])
+            base = previous.get(name)
+            if base is None:
+                continue
+            before = dict(_error_items(base))
+            for key, value in _error_items(entry):
+                if abs(value) > abs(before.get(key, 0)):
+                    regressions.append(f"{name}: {key} 誤差 {before.get(key, 0):+d} → {value:+d}")
+            if entry.get('recall', 1.0) < base.get('recall', 1.0) - 0.02:
+                regressions.append(f"{name}: 召回率 {base['recall']:.1%} → {entry['recall']:.1%}")
+
+        for key in ('p50_ms', 'p95_ms'):
+            now, before = report['summary'][key], baseline['summary'].get(key)
+            if now and before and now > before * (1 + tolerance) and now - before > min_ms:
+                regressions.append(f"{key}: {before:.1f} → {now:.1f} ms")
+
+    p95 = report['summary']['p95_ms']
+    if max_p95_ms is not None and p95 is not None and p95 > max_p95_ms:
+        regressions.append(f"p95_ms: {p95:.1f} ms 超過上限 {max_p95_ms:.1f} ms")
+    return regressions
+
+
+def print_report(report: Dict):
+    """輸出每張圖片的誤差與耗時"""
+    print(f"{'圖片':<40} {'數量':>9} {'金額':>11} {'耗時(ms)':>9}  結果")
+    print("-" * 80)
+    for entry in report['images']:
+        errors = entry['errors']
+        actual = entry['actual'] or {'count': '-', 'value': '-'}
+        status = "OK" if errors['exact'] else (entry['error'] or f"count {errors['count']:+d}, "
+                                                                 f"value {errors['value']:+d}")
+        print(f"{os.path.basename(entry['path'])[:40]:<40} "
+              f"{actual['count']:>4}/{entry['expected']['count']:<4} "
+              f"{actual['value']:>5}/{entry['expected']['value']:<5} "
+              f"{entry['seconds'] * 1000:>9.1f}  {status}")
+    s = report['summary']
+    print("-" * 80)
+    print(f"{s['exact']}/{s['images']} 張完全正確, 數量誤差 {s['abs_count_error']}, "
+          f"金額誤差 {s['abs_value_error']}, p50 {s['p50_ms']:.1f} ms, p95 {s['p95_ms']:.1f} ms, "
+          f"{s['images_per_second']:.2f} 張/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCS 準確度與延遲回歸測試")
+    parser.add_argument("--labels", action="append", default=[], metavar="DIR",
+                        help="含 .json 標註檔的圖片資料夾 (可重複指定)")
+    parser.add_argument("--image-dir", default=TEST_IMAGE_DIR, help="TEST_IMAGES 的圖片資料夾")
+    parser.add_argument("-m", "--mode", default="hybrid", help="檢測器名稱")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--reduced-decode", action="store_true",
+                        help="大型 JPEG 在解碼時縮小 (檢查縮小解碼是否改變結果)")
+    parser.add_argument("-o", "--output", help="報告輸出路徑 (JSON)")
+    parser.add_argument("--baseline", help="先前的報告 (只檢查相對於它的退化)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="延遲的相對容許值")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="p95 延遲上限")
+    args = parser.parse_args()
+
+    cases = collect_cases(args.image_dir, args.labels)
+    if not cases:
+        print(f"❌ 找不到任何有標註的圖片 ({args.image_dir}, {args.labels})")
+        sys.exit(2)
+
+    print(f"🔬 回歸測試: {len(cases)} 張圖片, mode={args.mode}")
+    report = run(cases, args.mode, args.workers, args.reduced_decode)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 報告已儲存至: {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = find_regressions(report, baseline, args.tolerance, max_p95_ms=args.max_p95_ms)
+    if regressions:
+        print(f"\n❌ {len(regressions)} 項退化:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print("\n✅ 沒有退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+合成硬幣場景產生器 - 產生附真實標註的托盤影像 (可重現)
+
+用法:
+    python synthetic_scenes.py out_dir                       # 預設 8 張 4032x3024 場景
+    python synthetic_scenes.py out_dir --count 20 --coins 40 --width 7680 --height 4320
+    python synthetic_scenes.py out_dir --overlap 0.15 --noise 15 --gradient 0.4
+
+每張圖片旁會寫出同名的 .json 標註檔 (格式與 test_config.TEST_IMAGES 相同，另含 circles)。
+
+預設的硬幣顏色、半徑與正面紋理依生產分類器 (CoinClassifierV2) 的分界校準，
+標註的面額與正反面都是 main.py 的辨識流程可以還原的結果；
+指定 --radius 時改依實際直徑比例縮放，面額不一定落在分類器的半徑分界內。
+
+分類器的 1元 半徑上界 (30) 等於生產環境的 Hough minRadius，Hough 類檢測器
+在生產參數下找不到校準後的 1元；標註檔另含 detector_params (見 detector_params())，
+regression_runner 與 benchmark 以它覆寫 Hough 的半徑範圍與 minDist。
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from core.coin_classifier import CoinClassifierV2
+from core.image_processor import ImageProcessor
+from utils.spatial_index import CircleGridIndex
+
+# 預設面額比例
+DEFAULT_MIX = {1: 0.3, 5: 0.2, 10: 0.3, 50: 0.2}
+
+# 面額顏色 (BGR): 50元銀色 (低飽和度)；1 / 5 / 10元為金銅色系，飽和度遠高於
+# ImageProcessor.classify_color 的銀色門檻 (S < 40)，由半徑區分面額
+COIN_COLORS = {
+    1: (95, 140, 200),
+    5: (60, 170, 215),
+    10: (40, 135, 190),
+    50: (200, 200, 200),
+}
+# 不重疊時硬幣之間的最小間隙 (像素)，大於 Contour 閉運算 (CLOSE_KERNEL 5x5 × 2 次)
+# 能填補的寬度，相鄰硬幣不會連成一塊
+COIN_GAP = 12
+
+# 背景比所有硬幣 (含正面浮雕的暗部) 都暗，Otsu 二值化才能分開硬幣與背景
+BACKGROUND_COLOR = (30, 34, 30)
+
+
+def calibrated_radii() -> Dict[int, int]:
+    """
+    依分類器的絕對半徑分界校準的各面額像素半徑
+
+    main.py 以 CoinClassifierV2.ABSOLUTE_RADIUS_BOUNDS (像素) 區分 1 / 5 / 10元，
+    各面額取在分界區間內並留下半個區間寬的餘裕；50元 (銀色) 略大於 10元。
+
+    Returns:
+        {面額: 半徑}
+    """
+    low, high = CoinClassifierV2.ABSOLUTE_RADIUS_BOUNDS
+    margin = (high - low) // 2
+    return {1: low - margin, 5: (low + high) // 2, 10: high + margin, 50: high + 2 * margin}
+
+
+def detector_params(width: int = 4032) -> Dict[str, Dict]:
+    """
+    合成場景 (calibrated_radii) 使用的檢測器參數覆寫 (見 ImageProcessor.update_params)
+
+    Hough 半徑範圍涵蓋所有校準半徑 (留下與 calibrated_radii 相同的餘裕)，
+    minDist 不超過兩枚最小硬幣互不重疊時的圓心距離 (--overlap 的場景可能更近)。
+    金字塔模式會依影像寬度 (resolution_scale) 縮放 hough_params，而合成硬幣的
+    像素半徑與寬度無關，因此 hough_params 在縮放前後都必須涵蓋校準半徑；
+    minDist 則盡量接近上限，縮放後仍能抑制硬幣內部的小圓。HOUGH_GRADIENT_ALT
+    不經金字塔縮放，只放寬 minRadius。
+
+    Args:
+        width: 場景寬度 (像素)
+
+    Returns:
+        {參數組: {參數: 值}}
+    """
+    processor = ImageProcessor()
+    radii = calibrated_radii()
+    low, high = CoinClassifierV2.ABSOLUTE_RADIUS_BOUNDS
+    margin = (high - low) // 2
+    smallest, largest = min(radii.values()), max(radii.values())
+    alt = {'minRadius': smallest - margin, 'minDist': 2 * smallest}
+
+    scale = processor.resolution_scale(width)
+    shrink, grow = min(1.0, 1.0 / scale), max(1.0, 1.0 / scale)
+    hough = {
+        'minRadius': int((smallest - margin) * shrink),
+        'maxRadius': max(processor.hough_params['maxRadius'], int(math.ceil((largest + margin) * grow))),
+        'minDist': int((2 * smallest + COIN_GAP - 2) * shrink),  # 留 2 像素給檢測圓心的誤差
+    }
+    return {'hough_params': hough, 'hough_alt_params': alt}
+
+
+def coin_radii(radius: Optional[float] = None) -> Dict[int, int]:
+    """
+    各面額的像素半徑
+
+    Args:
+        radius: 最大硬幣 (50元) 的像素半徑，其他面額依實際直徑比例換算
+                (None 為 calibrated_radii()，分類器可還原面額)
+
+    Returns:
+        {面額: 半徑}
+    """
+    if radius is None:
+        return calibrated_radii()
+    largest = max(spec['diameter'] for spec in CoinClassifierV2.COIN_SPECS.values())
+    return {denom: max(3, int(round(radius * spec['diameter'] / largest)))
+            for denom, spec in CoinClassifierV2.COIN_SPECS.items()}
+
+
+def _draw_coin(image: np.ndarray, x: int, y: int, r: int, denomination: int, side: str,
+               rng: np.random.Generator):
+    """
+    繪製一枚硬幣 (外緣；正面加上浮雕紋理)
+
+    正面為 2 像素的明暗細紋，紋理分數高於 CoinClassifierV2.TEXTURE_THRESHOLD；
+    背面只有外緣，分數遠低於門檻。硬幣內不畫同心圓，Hough 類檢測器
+    (尤其半徑下限很低的小影像) 不會把內圈當成較小的硬幣。
+    """
+    color = COIN_COLORS[denomination]
+    dark = tuple(int(c * 0.7) for c in color)
+    cv2.circle(image, (x, y), r, color, -1, cv2.LINE_AA)
+    cv2.circle(image, (x, y), r, dark, max(2, r // 15), cv2.LINE_AA)
+
+    if side == 'heads':
+        # 人像浮雕: 隨機的明暗細紋 (2x2 像素)，暗部仍比背景亮，亮部為白色
+        inner = int(0.85 * r)
+        cells = rng.random((inner + 1, inner + 1)) < 0.5
+        cells = np.repeat(np.repeat(cells, 2, axis=0), 2, axis=1)[:2 * inner + 1, :2 * inner + 1]
+        yy, xx = np.ogrid[-inner:inner + 1, -inner:inner + 1]
+        disc = xx * xx + yy * yy <= inner * inner
+        patch = image[y - inner:y + inner + 1, x - inner:x + inner + 1]
+        patch[disc & cells] = tuple(int(c * 0.25) for c in color)
+        patch[disc & ~cells] = (255, 255, 255)
+
+
+def _place_coins(width: int, height: int, radii: List[int], overlap: float,
+                 rng: np.random.Generator, attempts: int = 200) -> List[Tuple[int, int, int]]:
+    """
+    以拒絕取樣放置硬幣 (網格索引查詢鄰近硬幣)
+
+    Args:
+        radii: 每枚硬幣的半徑 (依序嘗試放置)
+        overlap: 允許的重疊比例 (0 為互不接觸，0.3 為圓心距離可縮短到半徑和的 70%)
+        attempts: 每枚硬幣的最多嘗試次數 (放不下時略過)
+
+    Returns:
+        [(radii 中的索引, x, y), ...]
+    """
+    largest = max(radii, default=1)
+    index = CircleGridIndex(2 * largest)
+    gap = 0 if overlap > 0 else max(COIN_GAP, largest // 10)
+    placed = []
+    for n, r in enumerate(radii):
+        if 2 * r + 2 >= min(width, height):
+            continue
+        for _ in range(attempts):
+            x = int(rng.integers(r + 1, width - r - 1))
+            y = int(rng.integers(r + 1, height - r - 1))
+            clear = True
+            for i in index.query(x, y, 2 * largest + gap):
+                cx, cy, cr = index.circles[i]
+                limit = (r + cr) * (1.0 - overlap) + gap
+                if (x - cx) ** 2 + (y - cy) ** 2 < limit * limit:
+                    clear = False
+                    break
+            if clear:
+                index.insert(x, y, r)
+                placed.append((n, x, y))
+                break
+    return placed
+
+
+def _apply_lighting(image: np.ndarray, gradient: float, noise: float,
+                    rng: np.random.Generator, band: int = 256):
+    """
+    套用對角光照漸層與高斯雜訊 (就地修改)
+
+    分段處理，8K 影像的浮點暫存也只有數十 MB。
+    """
+    height, width = image.shape[:2]
+    gain_x = np.linspace(-0.5, 0.5, width, dtype=np.float32)
+    gain_y = np.linspace(-0.5, 0.5, height, dtype=np.float32)
+    for top in range(0, height, band):
+        rows = slice(top, min(top + band, height))
+        values = image[rows].astype(np.float32)
+        if gradient:
+            values *= (1.0 + gradient * (gain_x[None, :] + gain_y[rows, None]))[..., None]
+        if noise:
+            values += rng.standard_normal(values.shape, dtype=np.float32) * noise
+        np.clip(values, 0, 255, out=values)
+        image[rows] = values
+
+
+def render_scene(width: int = 4032, height: int = 3024, num_coins: int = 12,
+                 mix: Optional[Dict[int, float]] = None, radius: Optional[float] = None,
+                 overlap: float = 0.0, noise: float = 8.0, gradient: float = 0.0,
+                 heads_ratio: float = 0.5, seed: int = 0) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    產生合成托盤影像與真實標註 (相同參數與 seed 產生相同影像)
+
+    Args:
+        width, height: 影像尺寸 (最大可到 8K，7680x4320)
+        num_coins: 硬幣數量 (空間不足時實際數量會較少，以標註為準)
+        mix: 面額比例 {面額: 權重} (None 為 DEFAULT_MIX)
+        radius: 50元硬幣的像素半徑，其他面額依實際直徑比例換算
+                (None 為依分類器分界校準的半徑，見 calibrated_radii)
+        overlap: 允許的重疊比例 (0-0.5)
+        noise: 高斯雜訊標準差 (灰階值)
+        gradient: 光照漸層強度 (0 為均勻，0.4 約為亮暗兩端相差 40%)
+        heads_ratio: 正面比例
+        seed: 亂數種子
+
+    Returns:
+        (BGR 影像, [{x, y, radius, denomination, side}, ...])
+    """
+    rng = np.random.default_rng(seed)
+    mix = mix or DEFAULT_MIX
+    denominations = np.array(sorted(mix))
+    weights = np.array([mix[d] for d in denominations], dtype=np.float64)
+    chosen = rng.choice(denominations, size=num_coins, p=weights / weights.sum())
+    radii_by_denom = coin_radii(radius)
+
+    # 大硬幣先放，密集時較容易放滿
+    coins = sorted((int(d) for d in chosen), key=lambda d: -radii_by_denom[d])
+    placed = _place_coins(width, height, [radii_by_denom[d] for d in coins], overlap, rng)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND_COLOR
+    truth = []
+    for n, x, y in placed:
+        denomination = coins[n]
+        r = radii_by_denom[denomination]
+        side = 'heads' if rng.random() < heads_ratio else 'tails'
+        _draw_coin(image, x, y, r, denomination, side, rng)
+        truth.append({'x': x, 'y': y, 'radius': r, 'denomination': denomination, 'side': side})
+
+    if gradient or noise:
+        _apply_lighting(image, gradient, noise, rng)
+    return image, truth
+
+
+def scene_labels(truth: List[Dict], description: str = '',
+                 params: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    將標註整理成 test_config.TEST_IMAGES 的格式
+
+    Args:
+        truth: render_scene 的標註
+        description: 說明文字
+        params: 辨識這張場景時的檢測器參數覆寫 (None 為生產環境參數)
+
+    Returns:
+        {description, total_value, total_count, coins: {面額: {count, heads, tails}}, circles,
+         [detector_params]}
+    """
+    coins = {}
+    for coin in truth:
+        entry = coins.setdefault(coin['denomination'], {'count': 0, 'heads': 0, 'tails': 0})
+        entry['count'] += 1
+        entry[coin['side']] += 1
+    labels = {
+        'description': description,
+        'total_value': sum(c['denomination'] for c in truth),
+        'total_count': len(truth),
+        'coins': dict(sorted(coins.items(), reverse=True)),
+        'circles': truth,
+    }
+    if params:
+        labels['detector_params'] = params
+    return labels
+
+
+def write_scene(path: str, image: np.ndarray, truth: List[Dict], description: str = '',
+                params: Optional[Dict[str, Dict]] = None) -> str:
+    """
+    寫出影像與同名 .json 標註檔
+
+    Args:
+        params: 檢測器參數覆寫 (見 scene_labels)
+
+    Returns:
+        標註檔路徑
+    """
+    if not cv2.imwrite(path, image):
+        raise OSError(f"無法寫入圖片: {path}")
+    label_path = os.path.splitext(path)[0] + '.json'
+    with open(label_path, 'w', encoding='utf-8') as f:
+        json.dump(scene_labels(truth, description, params), f, ensure_ascii=False, indent=2)
+    return label_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成硬幣場景產生器")
+    parser.add_argument("output_dir", help="輸出資料夾")
+    parser.add_argument("--count", type=int, default=8, help="場景數量")
+    parser.add_argument("--coins", type=int, default=12, help="每張影像的硬幣數量")
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--radius", type=float, default=None,
+                        help="50元硬幣半徑 (像素，其他面額依實際直徑比例；預設依分類器校準)")
+    parser.add_argument("--overlap", type=float, default=0.0, help="允許的重疊比例")
+    parser.add_argument("--noise", type=float, default=8.0, help="雜訊標準差")
+    parser.add_argument("--gradient", type=float, default=0.0, help="光照漸層強度")
+    parser.add_argument("--seed", type=int, default=0, help="第一張場景的亂數種子")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    params = detector_params(args.width) if args.radius is None else None
+    for i in range(args.count):
+        seed = args.seed + i
+        image, truth = render_scene(args.width, args.height, args.coins, radius=args.radius,
+                                    overlap=args.overlap, noise=args.noise,
+                                    gradient=args.gradient, seed=seed)
+        name = f"synthetic_{args.width}x{args.height}_{args.coins}c_s{seed}.jpg"
+        write_scene(os.path.join(args.output_dir, name), image, truth,
+                    f"合成場景 seed={seed}, {len(truth)} 個硬幣", params)
+        print(f"  {name}: {len(truth)} 個硬幣")
+
+
+if __name__ == "__main__":
+    main()
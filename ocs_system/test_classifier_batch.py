@@ -0,0 +1,81 @@
+"""
+測試腳本 - 驗證批次分類與逐一分類的結果一致
+(classify_coins_batch 與 classify_coin 共用 RELATIVE_SIZE_BOUNDS / ABSOLUTE_RADIUS_BOUNDS / TEXTURE_THRESHOLD)
+
+用法:
+    python -m pytest test_classifier_batch.py
+    python test_classifier_batch.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from core.coin_classifier import CoinClassifier
+
+
+def _scalar(classifier, radii, is_silver, texture_scores, all_radii):
+    """逐一呼叫 classify_coin"""
+    results = [classifier.classify_coin(None, r, {'is_silver': bool(s), 'is_golden': not s},
+                                        all_radii, texture_score=t)
+               for r, s, t in zip(radii, is_silver, texture_scores)]
+    return ([r['denomination'] for r in results], [r['side'] for r in results])
+
+
+def _batch(classifier, radii, is_silver, texture_scores, all_radii):
+    """一次呼叫 classify_coins_batch"""
+    features = np.zeros(len(radii), dtype=[('is_silver', np.bool_)])
+    features['is_silver'] = is_silver
+    batch = classifier.classify_coins_batch(radii, features, texture_scores, all_radii)
+    return batch['denomination'].tolist(), batch['side'].tolist()
+
+
+def _assert_same(radii, is_silver, texture_scores, all_radii):
+    classifier = CoinClassifier()
+    scalar = _scalar(classifier, radii, is_silver, texture_scores, all_radii)
+    batch = _batch(classifier, radii, is_silver, texture_scores, all_radii)
+    assert scalar == batch, (radii, is_silver, all_radii, scalar, batch)
+
+
+def test_relative_size_boundaries():
+    """相對尺寸剛好落在分界上 (0.30 / 0.65) 時兩條路徑一致"""
+    low, high = CoinClassifier.RELATIVE_SIZE_BOUNDS
+    radii = [0, low * 100, high * 100, 100, low * 100 - 1, high * 100 - 1]
+    threshold = CoinClassifier.TEXTURE_THRESHOLD
+    textures = [threshold, threshold + 1e-9, 0.0, 1.0, threshold - 1e-9, 0.5]
+    _assert_same(radii, [False] * len(radii), textures, radii)
+
+
+def test_absolute_radius_boundaries():
+    """只有一枚硬幣 (或沒有參考半徑) 時以絕對半徑分界 (30 / 38)"""
+    low, high = CoinClassifier.ABSOLUTE_RADIUS_BOUNDS
+    for radius in (low - 1, low, high - 1, high, high + 20):
+        _assert_same([radius], [False], [0.3], [radius])
+        _assert_same([radius], [False], [0.6], None)
+
+
+def test_equal_radii_and_silver():
+    """半徑全部相同 (相對尺寸 0.5) 與銀色硬幣"""
+    _assert_same([40, 40, 40], [False, True, False], [0.2, 0.5, 0.8], [40, 40, 40])
+
+
+def test_random_scenes():
+    """隨機場景 (含銀色硬幣) 的面額與正反面完全一致"""
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 30))
+        radii = rng.integers(15, 120, n).tolist()
+        is_silver = (rng.random(n) < 0.25).tolist()
+        textures = rng.random(n).tolist()
+        _assert_same(radii, is_silver, textures, radii)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
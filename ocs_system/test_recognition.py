@@ -1,10 +1,13 @@
 """
 測試腳本 - 驗證硬幣辨識準確度
-使用 20251211_14_42_18_Pro.jpg 作為測試樣本
+使用 20251211_14_42_18_Pro.jpg 作為測試樣本 (預期結果來自 test_config)
+
+批次評估所有標註圖片並檢查退化請使用 regression_runner.py
 """
 
 import cv2
 import numpy as np
+import os
 import sys
 from pathlib import Path
 
@@ -17,8 +20,9 @@ if sys.platform == 'win32':
 # 加入專案路徑
 sys.path.append(str(Path(__file__).parent))
 
-from core.image_processor import ImageProcessor
+from core.image_processor import ImageProcessor, color_features_to_dict
 from core.coin_classifier import CoinClassifier, CoinCounter
+from test_config import get_test_config
 
 
 def analyze_test_image(image_path):
@@ -46,20 +50,31 @@ def analyze_test_image(image_path):
     print("📊 測試不同檢測方法")
     print("=" * 60)
     
+    # 三種方法共用同一份預處理結果
+    prepared = processor.prepare(image)
+    
     # 方法 1: Contour Detection
     print("\n[方法 1] Contour Detection")
-    coins_contour = processor.detect_coins_contours(image)
+    coins_contour = processor.detect_coins_contours(prepared)
     print(f"  檢測到: {len(coins_contour)} 個硬幣")
     
     # 方法 2: HoughCircles
     print("\n[方法 2] HoughCircles")
-    coins_hough = processor.detect_coins_hough(image)
+    coins_hough = processor.detect_coins_hough(prepared)
     print(f"  檢測到: {len(coins_hough)} 個硬幣")
     
     # 方法 3: Hybrid
     print("\n[方法 3] Hybrid (混合)")
-    coins_hybrid = processor.detect_coins_hybrid(image)
+    coins_hybrid = processor.detect_coins_hybrid(prepared)
     print(f"  檢測到: {len(coins_hybrid)} 個硬幣")
+    both = sum(1 for c in coins_hybrid if len(c['sources']) > 1)
+    print(f"  兩種方法皆支持: {both} 個 / 僅單一方法: {len(coins_hybrid) - both} 個")
+    
+    # 方法 4: Pyramid (由粗到細)
+    print("\n[方法 4] Pyramid (由粗到細)")
+    coins_pyramid = processor.detect_coins_pyramid(image)
+    print(f"  工作層縮放比例: {processor.choose_pyramid_scale(image.shape):.2f}")
+    print(f"  檢測到: {len(coins_pyramid)} 個硬幣")
     
     # === 分析最佳方法的結果 ===
     print("\n" + "=" * 60)
@@ -73,12 +88,12 @@ def analyze_test_image(image_path):
     print(f"{'ID':<4} {'半徑':<8} {'面積':<10} {'圓形度':<10} {'顏色':<10}")
     print("-" * 50)
     
+    # 一次提取所有硬幣的顏色特徵
+    all_color_features = processor.extract_color_features_batch(prepared, coins)
+    
     for i, coin in enumerate(coins, 1):
-        # 提取 ROI
-        roi = processor.extract_coin_roi(image, coin['x'], coin['y'], coin['radius'])
-        
         # 顏色特徵
-        color_features = processor.extract_color_features(roi)
+        color_features = color_features_to_dict(all_color_features[i - 1])
         color_type = "金色" if color_features['is_golden'] else "銀色"
         
         print(f"{i:<4} {coin['radius']:<8} {coin.get('area', 0):<10.0f} "
@@ -92,23 +107,27 @@ def analyze_test_image(image_path):
     counter.reset()
     results = []
     
+    # 一次分類所有硬幣 (面額 + 正反面)
+    bounds = processor.coin_roi_bounds(image.shape, coins)
+    texture_scores = classifier.calculate_texture_complexity_rois(prepared.gray, bounds)
+    batch = classifier.classify_coins_batch([coin['radius'] for coin in coins],
+                                            all_color_features, texture_scores)
+    counter.add_batch(batch['denomination'], batch['side'])
+    
     for i, coin in enumerate(coins, 1):
-        roi = processor.extract_coin_roi(image, coin['x'], coin['y'], coin['radius'])
-        color_features = processor.extract_color_features(roi)
-        classification = classifier.classify_coin(roi, coin['radius'], color_features)
-        
-        counter.add_coin(classification['denomination'], classification['side'])
+        denomination = int(batch['denomination'][i - 1])
+        side = str(batch['side'][i - 1])
         
         results.append({
             'id': i,
             'radius': coin['radius'],
-            'denomination': classification['denomination'],
-            'side': classification['side'],
-            'confidence': classification['confidence']
+            'denomination': denomination,
+            'side': side,
+            'confidence': float(batch['confidence'][i - 1])
         })
         
-        print(f"硬幣 #{i}: {classification['denomination']}元 "
-              f"({classification['side']}) - 半徑: {coin['radius']}")
+        print(f"硬幣 #{i}: {denomination}元 "
+              f"({side}) - 半徑: {coin['radius']}")
     
     # === 統計結果 ===
     print("\n" + "=" * 60)
@@ -127,25 +146,34 @@ def analyze_test_image(image_path):
                   f"(正{data['heads']}/反{data['tails']}) "
                   f"= {denom * data['total']} 元")
     
+    # === 儲存結果圖片 ===
+    result_image = processor.draw_coins(image.copy(), coins)
+    output_path = "test_result_analysis.jpg"
+    cv2.imwrite(output_path, result_image)
+    print(f"\n💾 結果圖片已儲存: {output_path}")
+    
     # === 驗證結果 ===
     print("\n" + "=" * 60)
     print("✅ 結果驗證")
     print("=" * 60)
     
+    config = get_test_config(os.path.basename(image_path))
+    if config is None:
+        print(f"\n⚠️ test_config 中沒有此圖片的預期結果，略過驗證")
+        return results, stats
+    
     expected = {
-        'total_value': 83,
-        'total_count': 10,
-        10: 5,
-        5: 2,
-        1: 3
+        'total_value': config['total_value'],
+        'total_count': config['total_count'],
+        **{denom: data['count'] for denom, data in config['coins'].items()}
     }
+    denominations = sorted(config['coins'], reverse=True)
     
     print(f"\n預期結果:")
     print(f"  總金額: {expected['total_value']} 元")
     print(f"  硬幣總數: {expected['total_count']} 個")
-    print(f"  10元: {expected[10]} 個")
-    print(f"  5元: {expected[5]} 個")
-    print(f"  1元: {expected[1]} 個")
+    for denom in denominations:
+        print(f"  {denom}元: {expected[denom]} 個")
     
     print(f"\n實際結果:")
     print(f"  總金額: {stats['total_value']} 元 ", end="")
@@ -160,7 +188,7 @@ def analyze_test_image(image_path):
     else:
         print(f"❌ (差距: {stats['total_count'] - expected['total_count']})")
     
-    for denom in [10, 5, 1]:
+    for denom in denominations:
         actual = stats['breakdown'][denom]['total']
         print(f"  {denom}元: {actual} 個 ", end="")
         if actual == expected[denom]:
@@ -192,19 +220,10 @@ def analyze_test_image(image_path):
         print("  2. 調整尺寸分類閾值")
         print("  3. 收集更多樣本進行校正")
     
-    # === 儲存結果圖片 ===
-    result_image = processor.draw_coins(image.copy(), coins)
-    output_path = "test_result_analysis.jpg"
-    cv2.imwrite(output_path, result_image)
-    print(f"\n💾 結果圖片已儲存: {output_path}")
-    
     return results, stats
 
 
 if __name__ == "__main__":
-    # 測試圖片路徑（修正為正確的相對路徑）
-    import os
-    
     # 獲取腳本所在目錄
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
@@ -0,0 +1,81 @@
+"""
+測試腳本 - 驗證合成場景的校準半徑可被檢測與分類
+(calibrated_radii 落在分類器的絕對半徑分界內，也落在 detector_params 覆寫後的檢測半徑範圍內，
+ 包含金字塔模式依影像寬度縮放後的範圍)
+
+用法:
+    python -m pytest test_synthetic_scenes.py
+    python test_synthetic_scenes.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 加入專案路徑
+sys.path.append(str(Path(__file__).parent))
+
+from core.coin_classifier import CoinClassifier
+from core.image_processor import ImageProcessor
+from synthetic_scenes import COIN_GAP, calibrated_radii, detector_params
+
+
+# benchmark 擴展性測試的場景寬度 (含 reference_width 4032)
+WIDTHS = (1280, 1920, 4032, 5760, 7680)
+
+
+def _synthetic_processor(width=4032):
+    processor = ImageProcessor()
+    processor.update_params(detector_params(width))
+    return processor
+
+
+def test_radii_classify_as_labelled():
+    """校準半徑以絕對半徑分界 (單張影像) 分類回原本的面額"""
+    radii = calibrated_radii()
+    denominations = sorted(radii)
+    features = np.zeros(len(denominations), dtype=[('is_silver', np.bool_)])
+    features['is_silver'] = [denom == 50 for denom in denominations]
+    batch = CoinClassifier().classify_coins_batch(
+        [radii[d] for d in denominations], features, np.zeros(len(denominations))
+    )
+    assert batch['denomination'].tolist() == denominations
+
+
+def test_radii_inside_detector_ranges():
+    """所有面額都在 Hough / HOUGH_GRADIENT_ALT / Contour 的半徑範圍內"""
+    for width in WIDTHS:
+        processor = _synthetic_processor(width)
+        for radius in calibrated_radii().values():
+            for params in (processor.hough_params, processor.hough_alt_params):
+                assert params['minRadius'] <= radius <= params['maxRadius'], (width, radius, params)
+            contour = processor.contour_params
+            assert contour['min_radius'] <= radius <= contour['max_radius'], (width, radius, contour)
+
+
+def test_radii_inside_pyramid_range():
+    """金字塔模式依 resolution_scale 縮放 Hough 半徑後仍涵蓋所有面額"""
+    for width in WIDTHS:
+        processor = _synthetic_processor(width)
+        scale = processor.resolution_scale(width)
+        low = processor.hough_params['minRadius'] * scale
+        high = processor.hough_params['maxRadius'] * scale
+        for radius in calibrated_radii().values():
+            assert low <= radius <= high, (width, radius, low, high)
+
+
+def test_min_dist_allows_touching_smallest_coins():
+    """minDist 不超過兩枚最小硬幣不重疊時的圓心距離 (不會抑制相鄰的硬幣)"""
+    smallest = min(calibrated_radii().values())
+    for width in WIDTHS:
+        processor = _synthetic_processor(width)
+        for params in (processor.hough_params, processor.hough_alt_params):
+            assert params['minDist'] <= 2 * smallest + COIN_GAP
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,62 @@
+"""
+Display Image Module
+顯示解析度的影像快取 - 每張影像只縮放一次，疊圖直接在顯示畫布上繪製
+"""
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+# 結果畫布的固定顯示尺寸
+DISPLAY_WIDTH = 1100
+DISPLAY_HEIGHT = 380
+
+
+class DisplayImage:
+    """
+    單張已載入影像的顯示畫布
+
+    載入時將影像縮放 (保持比例) 並置中到固定大小的 RGB 畫布一次；之後每次
+    更新只複製這張約 0.4 MP 的畫布，以換算後的座標繪製疊圖，不再處理
+    全解析度影像。
+    """
+
+    def __init__(self, image: np.ndarray, width: int = DISPLAY_WIDTH,
+                 height: int = DISPLAY_HEIGHT):
+        """
+        Args:
+            image: 原始 BGR 影像
+            width, height: 畫布尺寸
+        """
+        h, w = image.shape[:2]
+        self.size = (width, height)
+        self.scale = min(width / w, height / h)
+        new_w = max(1, int(w * self.scale))
+        new_h = max(1, int(h * self.scale))
+        self.x_offset = (width - new_w) // 2
+        self.y_offset = (height - new_h) // 2
+
+        # 縮小時以 INTER_AREA 取樣，避免細節 (硬幣紋路) 產生疊紋
+        interpolation = cv2.INTER_AREA if self.scale < 1 else cv2.INTER_LINEAR
+        resized = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+
+        self.base = np.zeros((height, width, 3), dtype=np.uint8)
+        self.base[self.y_offset:self.y_offset + new_h,
+                  self.x_offset:self.x_offset + new_w] = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        self._frame = np.empty_like(self.base)
+
+    def to_display(self, x: float, y: float) -> Tuple[int, int]:
+        """原始影像座標 → 畫布座標 (四捨五入後限制在畫布內，邊緣的點不會超出 size - 1)"""
+        width, height = self.size
+        return (min(max(int(round(x * self.scale)) + self.x_offset, 0), width - 1),
+                min(max(int(round(y * self.scale)) + self.y_offset, 0), height - 1))
+
+    def new_frame(self) -> np.ndarray:
+        """
+        取得繪製疊圖用的畫布 (基底影像的複本)
+
+        畫布緩衝區重複使用，下一次呼叫時會被覆寫。
+        """
+        np.copyto(self._frame, self.base)
+        return self._frame
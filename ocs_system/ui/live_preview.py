@@ -0,0 +1,176 @@
+"""
+Live Preview Module
+即時預覽的分階段辨識快取 - 參數改變時只重算下游階段
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from core.image_processor import COLOR_FEATURE_DTYPE
+from core.coin_classifier import CoinCounter
+
+# 各快取保留的設定數量 (預處理結果每份約為影像大小的數倍，只保留少量)
+PREPARED_CACHE_SIZE = 2
+CIRCLE_CACHE_SIZE = 32
+
+
+class PreviewPipeline:
+    """
+    單張已載入影像的分階段辨識快取
+
+    階段與其參數:
+        預處理  灰階 → 模糊 → CLAHE(contrast) → 9x9 模糊    (contrast)
+        檢測    HoughCircles                                 (contrast, param2, minRadius, maxRadius)
+        特徵    每枚硬幣的顏色特徵與紋理分數                 (只與硬幣位置有關)
+        分類    面額 (相對尺寸) 與正反面                     (所有硬幣)
+
+    每個階段以其參數為鍵快取，參數改變時只重算下游：移動 Hough 滑桿只需
+    一次 HoughCircles，已出現過的硬幣不再重新提取特徵；灰階、模糊與區域統計
+    在不同對比設定間共用。
+
+    非執行緒安全，只應在 RecognitionWorker 的背景執行緒中使用。
+    """
+
+    def __init__(self, processor, classifier, image: np.ndarray):
+        """
+        Args:
+            processor: ImageProcessor
+            classifier: CoinClassifier
+            image: 已載入的 BGR 影像 (建立時不做任何計算)
+        """
+        self.processor = processor
+        self.classifier = classifier
+        self.image = image
+        self._base = None
+        self._prepared = OrderedDict()   # {contrast: PreparedImage}
+        self._circles = OrderedDict()    # {(contrast, param2, minRadius, maxRadius): 硬幣列表}
+        self._features = {}              # {(use_stats, x, y, r): (顏色特徵, 紋理分數)}
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, size: int):
+        """寫入 LRU 快取"""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    def prepared(self, contrast: float):
+        """
+        取得指定對比度 (CLAHE clipLimit) 的預處理快取
+
+        Args:
+            contrast: CLAHE clipLimit
+        """
+        cached = self._prepared.get(contrast)
+        if cached is not None:
+            self._prepared.move_to_end(contrast)
+            return cached
+
+        if self._base is None:
+            self._base = self.processor.prepare(self.image)
+        default = self.processor.clahe
+        if contrast == round(default.getClipLimit(), 1):
+            prepared = self._base
+        else:
+            clahe = cv2.createCLAHE(clipLimit=contrast, tileGridSize=default.getTilesGridSize())
+            prepared = self._base.with_clahe(clahe)
+        self._remember(self._prepared, contrast, prepared, PREPARED_CACHE_SIZE)
+        return prepared
+
+    def _coin_features(self, prepared, coins):
+        """
+        取得所有硬幣的顏色特徵與紋理分數 (只計算尚未快取的硬幣)
+
+        紋理的計算方式 (積分表或逐一裁切) 依所有硬幣決定，與一次完整辨識相同。
+        """
+        bounds = self.processor.coin_roi_bounds(prepared.shape, coins)
+        use_stats = bool(self.processor.prefers_region_stats(prepared.shape, bounds))
+        keys = [(use_stats, c['x'], c['y'], c['radius']) for c in coins]
+        missing = [i for i, key in enumerate(keys) if key not in self._features]
+
+        if missing:
+            new_coins = [coins[i] for i in missing]
+            colors = self.processor.extract_color_features_batch(prepared, new_coins)
+            if use_stats:
+                textures = self.classifier.calculate_texture_complexity_batch(
+                    prepared.stats, bounds[missing]
+                )
+            else:
+                textures = self.classifier.calculate_texture_complexity_rois(
+                    prepared.gray, bounds[missing]
+                )
+            for i, color, texture in zip(missing, colors, textures):
+                self._features[keys[i]] = (color, float(texture))
+
+        color_features = np.zeros(len(coins), dtype=COLOR_FEATURE_DTYPE)
+        texture_scores = np.zeros(len(coins), dtype=np.float64)
+        for i, key in enumerate(keys):
+            color_features[i], texture_scores[i] = self._features[key]
+        return color_features, texture_scores, len(missing)
+
+    def run(self, params: Dict, check: Optional[Callable[[], None]] = None) -> Dict:
+        """
+        以指定參數辨識 (沿用快取的階段)
+
+        Args:
+            params: {contrast, param2, minRadius, maxRadius}
+            check: 在階段之間呼叫的取消檢查 (例如 RecognitionJob.check)
+
+        Returns:
+            {image, results, counter, timings: {重算的階段: 秒}, new_coins}
+        """
+        check = check or (lambda: None)
+        timings = {}
+        contrast = round(float(params['contrast']), 1)
+        hough = {'param2': int(params['param2']),
+                 'minRadius': int(params['minRadius']),
+                 'maxRadius': int(params['maxRadius'])}
+
+        key = (contrast, hough['param2'], hough['minRadius'], hough['maxRadius'])
+        coins = self._circles.get(key)
+        if coins is None:
+            prepared = self.prepared(contrast)
+            if 'hough_blurred' not in prepared.__dict__:
+                start = time.perf_counter()
+                prepared.hough_blurred
+                timings['preprocess'] = time.perf_counter() - start
+                check()
+            start = time.perf_counter()
+            coins = self.processor.detect_coins_hough(prepared, hough)
+            timings['detect'] = time.perf_counter() - start
+            self._remember(self._circles, key, coins, CIRCLE_CACHE_SIZE)
+            check()
+        else:
+            self._circles.move_to_end(key)
+
+        # 特徵只與影像和硬幣位置有關，一律使用預設對比的快取 (區域統計只建立一次)
+        start = time.perf_counter()
+        color_features, texture_scores, new_coins = self._coin_features(self._base, coins)
+        if new_coins:
+            timings['features'] = time.perf_counter() - start
+        check()
+
+        # 相對尺寸分類依賴所有硬幣，每次都重算 (向量化，成本很低)
+        all_radii = [coin['radius'] for coin in coins]
+        batch = self.classifier.classify_coins_batch(
+            all_radii, color_features, texture_scores, all_radii
+        )
+        counter = CoinCounter()
+        counter.add_batch(batch['denomination'], batch['side'])
+
+        results = []
+        for i, coin in enumerate(coins):
+            results.append({
+                'id': i + 1, 'x': coin['x'], 'y': coin['y'],
+                'radius': coin['radius'],
+                'denomination': int(batch['denomination'][i]),
+                'side': str(batch['side'][i]),
+                'confidence': float(batch['confidence'][i])
+            })
+
+        return {'image': self.image, 'results': results, 'counter': counter,
+                'timings': timings, 'new_coins': new_coins}
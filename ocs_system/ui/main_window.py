@@ -6,8 +6,7 @@ Improved Main Window for OCS System
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import cv2
-import numpy as np
-from PIL import Image, ImageTk
+from PIL import Image
 import sys
 import os
 from pathlib import Path
@@ -17,6 +16,12 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from core.image_processor import ImageProcessor
 from core.coin_classifier import CoinClassifier, CoinCounter
+from ui.recognition_worker import RecognitionWorker
+from ui.live_preview import PreviewPipeline
+from ui.display_image import DisplayImage
+
+# 即時預覽: 滑桿停止移動多久後才重新辨識 (毫秒)
+PREVIEW_DELAY_MS = 150
 
 
 class OCSMainWindowV2(ctk.CTk):
@@ -42,12 +47,21 @@ class OCSMainWindowV2(ctk.CTk):
         self.current_image = None
         self.current_image_path = None
         self.result_data = None
+        self.pipeline = None          # 目前影像的分階段辨識快取 (PreviewPipeline)
+        self._preview_after_id = None
+        self.display = None           # 目前影像的顯示解析度畫布 (DisplayImage)
+        self._canvas_images = {}      # {顯示元件: 重複使用的 CTkImage}
+        
+        # 背景辨識執行緒（辨識時視窗不凍結，新請求取代尚未完成的請求）
+        self.recognition_worker = RecognitionWorker(self)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         
         # 參數變數（優化後的預設值 - 與測試腳本一致）
         self.contrast_value = ctk.DoubleVar(value=3.0)  # 優化: 2.5 → 3.0
         self.param2_value = ctk.IntVar(value=35)        # 優化: 22 → 35 (關鍵參數)
         self.min_radius_value = ctk.IntVar(value=30)    # 保持
         self.max_radius_value = ctk.IntVar(value=95)    # 優化: 75 → 95
+        self.live_preview = ctk.BooleanVar(value=False)
         
         # 建立 UI
         self._create_ui()
@@ -135,6 +149,13 @@ class OCSMainWindowV2(ctk.CTk):
         )
         self.recognize_btn.pack(pady=10, padx=20, fill="x")
         
+        self.cancel_btn = ctk.CTkButton(
+            frame, text="⏹ 取消辨識", command=self._cancel_recognition,
+            font=ctk.CTkFont(size=13), height=30,
+            fg_color="gray40", hover_color="gray30", state="disabled"
+        )
+        self.cancel_btn.pack(pady=(0, 10), padx=20, fill="x")
+        
         # 檔案路徑
         self.file_label = ctk.CTkLabel(
             frame, text="尚未選擇檔案", font=ctk.CTkFont(size=11),
@@ -202,13 +223,13 @@ class OCSMainWindowV2(ctk.CTk):
         # 明暗對比
         self._create_slider(
             frame, "明暗對比 (Contrast)", 
-            self.contrast_value, 0.5, 5.0, 2.5, 0.1
+            self.contrast_value, 0.5, 5.0, 3.0, 0.1
         )
         
         # 圓形檢測閾值
         self._create_slider(
             frame, "圓形檢測閾值 (param2)",
-            self.param2_value, 10, 100, 22, 1
+            self.param2_value, 10, 100, 35, 1
         )
         
         # 最小半徑
@@ -220,9 +241,16 @@ class OCSMainWindowV2(ctk.CTk):
         # 最大半徑
         self._create_slider(
             frame, "最大半徑 (maxRadius)",
-            self.max_radius_value, 50, 200, 75, 5
+            self.max_radius_value, 50, 200, 95, 5
         )
         
+        # 即時預覽（滑桿移動後自動重新辨識，只重算受影響的階段）
+        preview_switch = ctk.CTkSwitch(
+            frame, text="即時預覽", variable=self.live_preview,
+            command=self._on_parameter_changed, font=ctk.CTkFont(size=13)
+        )
+        preview_switch.pack(pady=(5, 0), padx=20, anchor="w")
+        
         # 重置按鈕
         reset_btn = ctk.CTkButton(
             frame, text="🔄 重置為預設值",
@@ -263,8 +291,11 @@ class OCSMainWindowV2(ctk.CTk):
             container, from_=from_, to=to,
             number_of_steps=steps,
             variable=variable,
-            command=lambda v: value_label.configure(
-                text=f"[{v:.1f}]" if isinstance(variable, ctk.DoubleVar) else f"[{int(v)}]"
+            command=lambda v: (
+                value_label.configure(
+                    text=f"[{v:.1f}]" if isinstance(variable, ctk.DoubleVar) else f"[{int(v)}]"
+                ),
+                self._on_parameter_changed()
             )
         )
         slider.pack(fill="x", pady=(5, 0))
@@ -316,114 +347,122 @@ class OCSMainWindowV2(ctk.CTk):
         )
         
         if file_path:
+            # 舊圖片的辨識結果已無意義
+            self._cancel_recognition()
+            
             self.current_image_path = file_path
             self.file_label.configure(text=f"已選擇: {os.path.basename(file_path)}")
             
             # 載入圖片
             self.current_image = cv2.imread(file_path)
+            self.pipeline = None
+            self.display = None
             if self.current_image is None:
                 messagebox.showerror("錯誤", "無法讀取圖片")
                 return
             
-            # 顯示原始影像
-            self._display_image(self.current_image, self.original_canvas)
+            # 每張影像一份分階段快取（建立時不做計算）
+            self.pipeline = PreviewPipeline(self.processor, self.classifier, self.current_image)
+            
+            # 顯示原始影像（每張影像只縮放一次，之後的疊圖都在顯示畫布上繪製）
+            self.display = DisplayImage(self.current_image)
+            self._display_image(self.display.base, self.original_canvas)
             
             # 清空結果
-            self.result_canvas.configure(image=None, text="等待辨識結果...")
+            self._clear_canvas(self.result_canvas, "等待辨識結果...")
             
             # 啟用辨識按鈕
             self.recognize_btn.configure(state="normal")
             self.status_label.configure(
                 text=f"已載入 ({self.current_image.shape[1]}x{self.current_image.shape[0]})"
             )
+            self._on_parameter_changed()
     
-    def _start_recognition(self):
-        """開始辨識"""
-        if self.current_image is None:
+    def _start_recognition(self, preview=False):
+        """開始辨識（在背景執行緒執行，重複點擊只會保留最新的請求）"""
+        if self.pipeline is None:
             messagebox.showwarning("警告", "請先選擇圖片")
             return
         
-        self.status_label.configure(text="辨識中...", text_color="orange")
-        self.recognize_btn.configure(state="disabled")
-        self.update()
-        
-        try:
-            self._perform_recognition()
-            self.status_label.configure(text="辨識完成！", text_color="green")
-        except Exception as e:
-            messagebox.showerror("錯誤", f"辨識失敗: {str(e)}")
-            self.status_label.configure(text="辨識失敗", text_color="red")
-        finally:
-            self.recognize_btn.configure(state="normal")
+        # Tk 變數只能在主執行緒讀取，先取出參數再交給背景執行緒
+        pipeline = self.pipeline
+        params = self._current_params()
+        
+        self.status_label.configure(text="預覽中..." if preview else "辨識中...", text_color="orange")
+        self.cancel_btn.configure(state="normal")
+        self.recognition_worker.submit(
+            lambda job: self._perform_recognition(pipeline, params, job),
+            self._on_recognition_done, self._on_recognition_error
+        )
     
-    def _perform_recognition(self):
-        """執行辨識（使用優化的預處理流程）"""
-        # 重置計數器
-        self.counter.reset()
-        
-        # ✅ 使用 ImageProcessor 的完整預處理 (與測試腳本一致)
-        # 這會執行: 灰階 → 模糊(5,5) → CLAHE → 返回
-        gray = self.processor.preprocess_image(self.current_image)
-        
-        # 檢測硬幣（使用調整後的參數）
-        coins = self._detect_coins_with_params(gray)
-        
-        # 收集所有半徑（用於相對尺寸分類）
-        all_radii = [coin['radius'] for coin in coins]
-        
-        # 分類硬幣
-        results = []
-        for i, coin in enumerate(coins):
-            roi = self.processor.extract_coin_roi(
-                self.current_image, coin['x'], coin['y'], coin['radius']
-            )
-            color_features = self.processor.extract_color_features(roi)
-            
-            # 傳入所有半徑以進行相對尺寸分類
-            classification = self.classifier.classify_coin(
-                roi, coin['radius'], color_features, all_radii
-            )
-            
-            self.counter.add_coin(classification['denomination'], classification['side'])
-            
-            results.append({
-                'id': i + 1, 'x': coin['x'], 'y': coin['y'],
-                'radius': coin['radius'],
-                'denomination': classification['denomination'],
-                'side': classification['side'],
-                'confidence': classification['confidence']
-            })
-        
-        # 更新顯示
-        self._update_results(results)
+    def _on_parameter_changed(self):
+        """參數改變（即時預覽開啟時延遲重新辨識，連續移動滑桿只會執行最後一次）"""
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)
+            self._preview_after_id = None
+        if self.live_preview.get() and self.pipeline is not None:
+            self._preview_after_id = self.after(PREVIEW_DELAY_MS, self._run_preview)
     
-    def _apply_contrast(self, image, clip_limit):
-        """應用對比度增強"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
-        return clahe.apply(gray)
+    def _run_preview(self):
+        """執行即時預覽"""
+        self._preview_after_id = None
+        self._start_recognition(preview=True)
     
-    def _detect_coins_with_params(self, gray_image):
-        """使用當前參數檢測硬幣（優化版）"""
-        blurred = cv2.GaussianBlur(gray_image, (9, 9), 2)  # 優化: (5,5) → (9,9)
-        
-        circles = cv2.HoughCircles(
-            blurred, cv2.HOUGH_GRADIENT, dp=1, 
-            minDist=80,  # 優化: 30 → 80 (避免重複檢測)
-            param1=60,   # 優化: 50 → 60
-            param2=self.param2_value.get(),
-            minRadius=self.min_radius_value.get(),
-            maxRadius=self.max_radius_value.get()
+    def _cancel_recognition(self):
+        """取消尚未完成的辨識"""
+        self.recognition_worker.cancel()
+        self.cancel_btn.configure(state="disabled")
+        if self.status_label.cget("text") in ("辨識中...", "預覽中..."):
+            self.status_label.configure(text="已取消辨識", text_color="gray")
+    
+    def _on_recognition_done(self, output):
+        """辨識完成（主執行緒）"""
+        self.cancel_btn.configure(state="disabled")
+        if output['image'] is not self.current_image:
+            return
+        self.counter = output['counter']
+        self._update_results(output['results'])
+        
+        # 顯示實際重算的階段（沿用快取的階段不列出）
+        timings = ", ".join(f"{stage} {seconds * 1000:.0f}ms"
+                            for stage, seconds in output['timings'].items())
+        self.status_label.configure(
+            text=f"辨識完成！ ({timings or '全部沿用快取'})", text_color="green"
         )
+    
+    def _on_recognition_error(self, error):
+        """辨識失敗（主執行緒）"""
+        self.cancel_btn.configure(state="disabled")
+        messagebox.showerror("錯誤", f"辨識失敗: {str(error)}")
+        self.status_label.configure(text="辨識失敗", text_color="red")
+    
+    def _on_close(self):
+        """關閉視窗（先停止背景執行緒）"""
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)
+        self.recognition_worker.close()
+        self.destroy()
+    
+    def _perform_recognition(self, pipeline, params, job):
+        """
+        執行辨識（背景執行緒）
         
-        coins = []
-        if circles is not None:
-            circles = np.uint16(np.around(circles))
-            for circle in circles[0, :]:
-                x, y, radius = circle
-                coins.append({'x': int(x), 'y': int(y), 'radius': int(radius)})
+        由 PreviewPipeline 執行: 預處理 → Hough → 特徵 → 分類，
+        已快取的階段直接沿用；不可存取任何 Tk 元件，各階段之間以 job.check() 檢查是否已被取消。
         
-        return coins
+        Returns:
+            {image, results, counter, timings, new_coins}
+        """
+        return pipeline.run(params, job.check)
+    
+    def _current_params(self):
+        """讀取目前的參數（主執行緒）"""
+        return {
+            'contrast': self.contrast_value.get(),
+            'param2': self.param2_value.get(),
+            'minRadius': self.min_radius_value.get(),
+            'maxRadius': self.max_radius_value.get()
+        }
     
     def _update_results(self, results):
         """更新結果顯示"""
@@ -447,11 +486,11 @@ class OCSMainWindowV2(ctk.CTk):
         self.details_textbox.insert("1.0", details)
         
         # 繪製並顯示結果
-        result_image = self._draw_results(self.current_image.copy(), results)
+        result_image = self._draw_results(self.display.new_frame(), results)
         self._display_image(result_image, self.result_canvas)
     
-    def _draw_results(self, image, results):
-        """繪製辨識結果"""
+    def _draw_results(self, frame, results):
+        """在顯示畫布上繪製辨識結果（座標依顯示比例換算，線寬與字級以顯示像素為準）"""
         colors = {
             1: (100, 150, 255),   # 淺藍
             5: (255, 200, 100),   # 金黃
@@ -460,49 +499,44 @@ class OCSMainWindowV2(ctk.CTk):
         }
         
         for coin in results:
-            x, y, r = coin['x'], coin['y'], coin['radius']
+            x, y = self.display.to_display(coin['x'], coin['y'])
+            r = max(1, int(round(coin['radius'] * self.display.scale)))
             denom = coin['denomination']
             side = coin['side']
-            color = colors.get(denom, (255, 255, 255))
+            # 顏色以 BGR 定義，顯示畫布為 RGB
+            color = colors.get(denom, (255, 255, 255))[::-1]
             
-            cv2.circle(image, (x, y), r, color, 3)
+            cv2.circle(frame, (x, y), r, color, 2, cv2.LINE_AA)
             label = f"{denom}$ {side[0].upper()}"
-            cv2.putText(image, label, (x - 30, y - r - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            cv2.putText(image, f"#{coin['id']}", (x - 10, y + 5),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+            cv2.putText(frame, label, (x - 20, y - r - 4),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1, cv2.LINE_AA)
+            cv2.putText(frame, f"#{coin['id']}", (x - 8, y + 4),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.35, (255, 255, 255), 1, cv2.LINE_AA)
         
-        return image
+        return frame
     
-    def _display_image(self, cv_image, canvas_widget):
-        """統一影像顯示（保持尺寸比例一致）"""
-        # 固定顯示尺寸
-        target_width = 1100
-        target_height = 380
-        
-        # 轉換顏色
-        rgb = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-        
-        # 調整大小（保持比例）
-        h, w = rgb.shape[:2]
-        scale = min(target_width / w, target_height / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        resized = cv2.resize(rgb, (new_w, new_h))
-        
-        # 建立固定大小畫布（置中）
-        canvas = np.zeros((target_height, target_width, 3), dtype=np.uint8)
-        y_offset = (target_height - new_h) // 2
-        x_offset = (target_width - new_w) // 2
-        canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
-        
-        # 顯示
-        pil_image = Image.fromarray(canvas)
-        ctk_image = ctk.CTkImage(
-            light_image=pil_image, dark_image=pil_image,
-            size=(target_width, target_height)
-        )
-        canvas_widget.configure(image=ctk_image, text="")
-        canvas_widget.image = ctk_image
+    def _display_image(self, frame, canvas_widget):
+        """
+        顯示 RGB 畫布（DisplayImage 的尺寸）
+        
+        每個顯示元件重複使用同一個 CTkImage，只替換其中的影像。
+        """
+        pil_image = Image.fromarray(frame)
+        ctk_image = self._canvas_images.get(canvas_widget)
+        if ctk_image is None:
+            ctk_image = ctk.CTkImage(
+                light_image=pil_image, dark_image=pil_image,
+                size=(frame.shape[1], frame.shape[0])
+            )
+            self._canvas_images[canvas_widget] = ctk_image
+            canvas_widget.configure(image=ctk_image, text="")
+        else:
+            ctk_image.configure(light_image=pil_image, dark_image=pil_image)
+    
+    def _clear_canvas(self, canvas_widget, text):
+        """清空顯示元件（下次顯示時重新建立 CTkImage）"""
+        self._canvas_images.pop(canvas_widget, None)
+        canvas_widget.configure(image=None, text=text)
     
     def _reset_parameters(self):
         """重置參數為預設值（優化後 - 與測試腳本一致）"""
@@ -511,6 +545,7 @@ class OCSMainWindowV2(ctk.CTk):
         self.min_radius_value.set(30)  # 保持
         self.max_radius_value.set(95)  # 優化值
         messagebox.showinfo("提示", "參數已重置為優化後的預設值 (param2=35)")
+        self._on_parameter_changed()
 
 
 def main():
@@ -0,0 +1,176 @@
+"""
+Recognition Worker Module
+背景辨識執行緒 - 可取消的工作與請求合併，結果以 after() 交回 Tk 執行緒
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+
+class RecognitionCancelled(Exception):
+    """工作已被取消 (由 RecognitionJob.check() 拋出)"""
+
+
+class RecognitionJob:
+    """一次辨識請求"""
+
+    __slots__ = ('job_id', 'func', 'on_done', 'on_error', '_cancel')
+
+    def __init__(self, job_id: int, func: Callable[['RecognitionJob'], Any],
+                 on_done: Callable[[Any], None],
+                 on_error: Optional[Callable[[BaseException], None]] = None):
+        """
+        Args:
+            job_id: 遞增的工作編號
+            func: 在背景執行緒執行的函式，參數為此工作 (用於檢查取消)
+            on_done: 完成時在 Tk 執行緒呼叫，參數為 func 的回傳值
+            on_error: 失敗時在 Tk 執行緒呼叫，參數為例外
+        """
+        self.job_id = job_id
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已被取消"""
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """要求取消 (執行中的工作在下一次 check() 時停止)"""
+        self._cancel.set()
+
+    def check(self):
+        """在處理階段之間呼叫，已取消時拋出 RecognitionCancelled"""
+        if self._cancel.is_set():
+            raise RecognitionCancelled()
+
+
+class RecognitionWorker:
+    """
+    單一背景執行緒的辨識工作佇列
+
+    只保留最新的一個待處理請求：新請求會取代尚未開始的請求，並要求執行中的
+    工作取消，連續點擊不會累積多餘的工作。OpenCV 的計算無法中途打斷，
+    取消是在處理階段之間檢查；過期工作的結果一律在交回時丟棄。
+
+    背景執行緒不直接呼叫 Tk，結果放入佇列後由 Tk 執行緒以 after() 輪詢取出。
+    """
+
+    def __init__(self, widget, poll_ms: int = 30):
+        """
+        Args:
+            widget: 用來排程 after() 的 Tk 元件 (通常是主視窗)
+            poll_ms: 有工作進行時，檢查結果佇列的間隔 (毫秒)
+        """
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._lock = threading.Condition()
+        self._pending: Optional[RecognitionJob] = None
+        self._running: Optional[RecognitionJob] = None
+        self._latest_id = 0
+        self._closed = False
+        self._results = queue.SimpleQueue()
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._run, name="ocs-recognition", daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable[[RecognitionJob], Any], on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[BaseException], None]] = None) -> int:
+        """
+        送出辨識請求 (在 Tk 執行緒呼叫)
+
+        Args:
+            func: 在背景執行緒執行的函式，參數為 RecognitionJob (不可存取 Tk 元件)
+            on_done: 完成時在 Tk 執行緒呼叫
+            on_error: 失敗時在 Tk 執行緒呼叫 (取消不算失敗，不會呼叫)
+
+        Returns:
+            工作編號
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("RecognitionWorker 已關閉")
+            self._latest_id += 1
+            job = RecognitionJob(self._latest_id, func, on_done, on_error)
+            self._supersede()
+            self._pending = job
+            self._lock.notify()
+        self._schedule_poll()
+        return job.job_id
+
+    def cancel(self):
+        """取消待處理與執行中的工作 (在 Tk 執行緒呼叫)"""
+        with self._lock:
+            self._latest_id += 1
+            self._supersede()
+
+    def close(self):
+        """取消所有工作並停止背景執行緒 (關閉視窗時呼叫)"""
+        with self._lock:
+            self._closed = True
+            self._latest_id += 1
+            self._supersede()
+            self._lock.notify()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _supersede(self):
+        """丟棄待處理的工作並取消執行中的工作 (需持有鎖)"""
+        self._pending = None
+        if self._running is not None:
+            self._running.cancel()
+
+    def _run(self):
+        """背景執行緒: 逐一執行最新的待處理工作"""
+        while True:
+            with self._lock:
+                while self._pending is None and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    return
+                job, self._pending = self._pending, None
+                self._running = job
+
+            try:
+                job.check()
+                outcome = (job, job.func(job), None)
+            except RecognitionCancelled:
+                outcome = None
+            except Exception as e:
+                outcome = (job, None, e)
+
+            with self._lock:
+                self._running = None
+                if outcome is not None:
+                    self._results.put(outcome)
+
+    def _schedule_poll(self):
+        """開始以 after() 輪詢結果佇列"""
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Tk 執行緒: 交回最新工作的結果，過期或已取消的結果直接丟棄"""
+        self._poll_id = None
+        try:
+            while True:
+                try:
+                    job, result, error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if job.cancelled or job.job_id != self._latest_id:
+                    continue
+                if error is None:
+                    job.on_done(result)
+                elif job.on_error is not None:
+                    job.on_error(error)
+        finally:
+            with self._lock:
+                waiting = (self._pending is not None or self._running is not None
+                           or not self._results.empty())
+            if waiting and not self._closed:
+                self._schedule_poll()
@@ -0,0 +1,28 @@
+"""
+Evaluation Module
+檢測結果與真實標註的比對 (benchmark / regression_runner 共用)
+"""
+
+from typing import Dict, Sequence, Tuple
+
+
+def match_recall(coins: Sequence[Dict], truth: Sequence[Tuple[float, float, float]]) -> float:
+    """
+    召回率: 圓心落在真實硬幣半徑一半以內的檢測 (每個檢測只配對一次)
+    
+    Args:
+        coins: 檢測結果 [{x, y, radius}, ...]
+        truth: 真實位置 [(x, y, radius), ...]
+        
+    Returns:
+        找到的真實硬幣比例 (0-1，沒有真實硬幣時為 1.0)
+    """
+    unused = list(coins)
+    found = 0
+    for x, y, r in truth:
+        for coin in unused:
+            if (coin['x'] - x) ** 2 + (coin['y'] - y) ** 2 <= (0.5 * r) ** 2:
+                unused.remove(coin)
+                found += 1
+                break
+    return found / len(truth) if truth else 1.0
@@ -0,0 +1,237 @@
+"""
+Image Loader Module
+圖片讀取層 - mmap + imdecode、JPEG 縮小解碼與背景預讀
+"""
+
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# 縮小倍率 → imdecode 旗標 (JPEG 在 DCT 階段直接縮小，不需先解出全解析度)
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# JPEG 中帶有影像尺寸的 SOF 標記 (排除 DHT=C4、JPG=C8、DAC=CC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# 不帶長度欄位的獨立標記 (TEM、RST0-7)
+_JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+# EXIF Orientation 標籤，5-8 表示顯示時寬高互換 (旋轉 90 / 270 度)
+_EXIF_ORIENTATION_TAG = 0x0112
+_TRANSPOSED_ORIENTATIONS = frozenset(range(5, 9))
+
+
+def _exif_orientation(data, start: int, end: int) -> int:
+    """
+    讀取 APP1 區段內的 EXIF Orientation
+
+    Args:
+        data: 檔案內容
+        start, end: APP1 區段資料的範圍 (不含標記與長度欄位)
+
+    Returns:
+        Orientation (1-8)；沒有 EXIF 或格式不完整時為 1
+    """
+    if end - start < 14 or bytes(data[start:start + 6]) != b'Exif\x00\x00':
+        return 1
+    tiff = start + 6
+    order = bytes(data[tiff:tiff + 2])
+    if order not in (b'II', b'MM'):
+        return 1
+    byteorder = 'little' if order == b'II' else 'big'
+
+    def read(offset: int, size: int) -> Optional[int]:
+        if offset < tiff or offset + size > end:
+            return None
+        return int.from_bytes(data[offset:offset + size], byteorder)
+
+    ifd = read(tiff + 4, 4)
+    count = read(tiff + ifd, 2) if ifd is not None else None
+    if count is None:
+        return 1
+    for entry in range(tiff + ifd + 2, tiff + ifd + 2 + 12 * count, 12):
+        tag = read(entry, 2)
+        if tag is None:
+            return 1
+        if tag == _EXIF_ORIENTATION_TAG:
+            return read(entry + 8, 2) or 1
+    return 1
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """
+    從 JPEG 檔頭讀取影像尺寸 (不解碼)
+
+    SOF 記錄的是旋轉前的尺寸；EXIF Orientation 為 5-8 時 cv2.imdecode 會旋轉影像，
+    因此回傳寬高互換後的尺寸，與解碼結果一致。
+
+    Args:
+        data: 檔案內容 (bytes / mmap / memoryview)
+
+    Returns:
+        (寬, 高)；不是 JPEG 或檔頭不完整時為 None
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    pos = 2
+    end = len(data)
+    orientation = 1
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充位元組
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / SOS 之前都沒有 SOF
+            return None
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        if marker == 0xE1 and orientation == 1:  # APP1 (EXIF)
+            orientation = _exif_orientation(data, pos + 4, min(end, pos + 2 + length))
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > end:
+                return None
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            if orientation in _TRANSPOSED_ORIENTATIONS:
+                return height, width
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def choose_reduction(width: int, target_width: Optional[int]) -> int:
+    """
+    選擇縮小解碼倍率
+
+    Args:
+        width: 原始影像寬度
+        target_width: 處理時需要的最小寬度 (None 為不縮小)
+
+    Returns:
+        1 / 2 / 4 / 8 中，縮小後寬度仍 >= target_width 的最大倍率
+    """
+    if not target_width:
+        return 1
+    for factor in (8, 4, 2):
+        if width // factor >= target_width:
+            return factor
+    return 1
+
+
+class LoadedImage:
+    """讀取完成的圖片"""
+
+    __slots__ = ('source', 'image', 'reduction', 'error')
+
+    def __init__(self, source, image: Optional[np.ndarray], reduction: int = 1,
+                 error: Optional[str] = None):
+        """
+        Args:
+            source: 原始輸入 (路徑或影格)
+            image: BGR 影像 (讀取失敗時為 None)
+            reduction: 解碼時的縮小倍率 (原始座標 = 影像座標 * reduction)
+            error: 錯誤訊息
+        """
+        self.source = source
+        self.image = image
+        self.reduction = reduction
+        self.error = error
+
+    @property
+    def path(self) -> Optional[str]:
+        """來源路徑 (影格輸入為 None)"""
+        return self.source if isinstance(self.source, str) else None
+
+
+def load_image(path: str, target_width: Optional[int] = None) -> LoadedImage:
+    """
+    以 mmap + cv2.imdecode 讀取圖片
+
+    JPEG 依檔頭尺寸選擇 IMREAD_REDUCED_COLOR_2/4/8，大圖在解碼時就縮小；
+    其他格式以原解析度解碼。
+
+    Args:
+        path: 圖片路徑
+        target_width: 處理時需要的最小寬度 (None 為原解析度)
+
+    Returns:
+        LoadedImage (讀取失敗時 image 為 None 並附上 error)
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return LoadedImage(path, None, error="空白檔案")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = jpeg_size(mm)
+                reduction = choose_reduction(size[0], target_width) if size else 1
+                buffer = np.frombuffer(mm, dtype=np.uint8)
+                image = cv2.imdecode(buffer, REDUCED_FLAGS[reduction])
+                del buffer  # 關閉 mmap 前必須釋放所有檢視
+    except OSError as e:
+        return LoadedImage(path, None, error=f"{type(e).__name__}: {e}")
+
+    if image is None:
+        return LoadedImage(path, None, error="無法解碼圖片")
+    return LoadedImage(path, image, reduction)
+
+
+class ImageLoader:
+    """
+    背景預讀的圖片讀取器
+
+    以小型執行緒池在辨識前先解碼後續圖片 (cv2.imdecode 執行時會釋放 GIL)，
+    預讀視窗有上限，同時存在的影像數量固定。
+    """
+
+    def __init__(self, target_width: Optional[int] = None, workers: int = 2, prefetch: int = 4):
+        """
+        Args:
+            target_width: 處理時需要的最小寬度 (None 為原解析度解碼)
+            workers: 解碼執行緒數
+            prefetch: 預讀的圖片數 (0 為在呼叫端逐張讀取)
+        """
+        self.target_width = target_width
+        self.workers = workers
+        self.prefetch = prefetch
+
+    def load(self, source: Union[str, np.ndarray]) -> LoadedImage:
+        """讀取單一輸入 (影格直接沿用)"""
+        if isinstance(source, np.ndarray):
+            return LoadedImage(source, source)
+        return load_image(source, self.target_width)
+
+    def iter_load(self, sources: Iterable[Union[str, np.ndarray]]) -> Iterator[LoadedImage]:
+        """
+        依輸入順序逐張產生讀取結果
+
+        Args:
+            sources: 圖片路徑或 BGR 影格 (可為惰性的產生器)
+
+        Yields:
+            LoadedImage
+        """
+        if self.prefetch <= 0:
+            yield from map(self.load, sources)
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            pending = deque()
+            for source in sources:
+                pending.append(pool.submit(self.load, source))
+                if len(pending) > self.prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
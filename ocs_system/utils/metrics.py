@@ -0,0 +1,327 @@
+"""
+Metrics Module
+辨識流程的分段計時、延遲直方圖與 JSON / Prometheus 匯出
+"""
+
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Sequence, TextIO
+
+# 延遲直方圖的分界 (秒)，與 Prometheus 預設值同數量級
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """固定分界的累積延遲直方圖"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: 遞增的分界 (秒)，最後另有 +Inf 區間
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """記錄一次耗時"""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        由直方圖估計分位數 (區間內線性內插，與 Prometheus histogram_quantile 相同)
+
+        內插範圍限制在實際觀測到的最小 / 最大值之內，樣本很少時不會偏離
+        實際耗時太多 (只有一個樣本時即為該值)；仍只是估計值。
+
+        Args:
+            q: 分位數 (0-1)
+
+        Returns:
+            估計的耗時 (秒)，沒有資料時為 NaN
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):  # +Inf 區間以最大值代替
+                    return self.max
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """可序列化的快照"""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'min': self.min if self.count else None,
+            'max': self.max,
+            'p50': None if self.count == 0 else self.quantile(0.50),
+            'p95': None if self.count == 0 else self.quantile(0.95),
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.counts)),
+        }
+
+
+class _StageTimer:
+    """PipelineMetrics.stage() 的計時區塊"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'PipelineMetrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """停用計時時的空區塊"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PipelineMetrics:
+    """
+    分段計時與計數器
+
+    以 with metrics.stage('detect'): ... 計時，每個階段累積一個延遲直方圖；
+    停用時 stage() 回傳共用的空區塊，幾乎沒有額外成本。
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled: 是否啟用計時
+            buckets: 延遲直方圖的分界 (秒)
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.current: Dict[str, float] = {}  # 目前這張圖片的各階段耗時 (見 pop_current)
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """
+        計時區塊
+
+        Args:
+            name: 階段名稱 (例如 'read'、'detect')
+        """
+        return _StageTimer(self, name) if self.enabled else _NULL_TIMER
+
+    def observe(self, name: str, seconds: float):
+        """記錄一個階段的耗時"""
+        with self._lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = LatencyHistogram(self.buckets)
+            histogram.observe(seconds)
+            self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def observe_many(self, timings: Dict[str, float]):
+        """記錄多個階段的耗時 (例如 worker 行程回傳的 pop_current())"""
+        for name, seconds in timings.items():
+            self.observe(name, seconds)
+
+    def pop_current(self) -> Dict[str, float]:
+        """取出並清空自上次呼叫以來的各階段耗時 (每張圖片呼叫一次)"""
+        with self._lock:
+            current, self.current = self.current, {}
+        return current
+
+    def increment(self, name: str, value: float = 1):
+        """累加計數器 (停用時忽略)"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """清除所有統計"""
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.current.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        """
+        可序列化的統計快照
+
+        Returns:
+            {timestamp, uptime, stages: {階段: 直方圖}, counters: {名稱: 值}}
+        """
+        with self._lock:
+            stages = {name: h.to_dict() for name, h in self.stages.items()}
+            counters = dict(self.counters)
+        now = time.time()
+        return {'timestamp': now, 'uptime': now - self.started,
+                'stages': stages, 'counters': counters}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """JSON 格式的快照"""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, namespace: str = 'ocs') -> str:
+        """
+        Prometheus text exposition 格式的快照
+
+        Args:
+            namespace: 指標名稱前綴
+
+        Returns:
+            {namespace}_stage_seconds 直方圖與 {namespace}_{計數器}_total
+        """
+        snapshot = self.snapshot()
+        name = f"{namespace}_stage_seconds"
+        lines = [f"# HELP {name} OCS pipeline stage latency in seconds.",
+                 f"# TYPE {name} histogram"]
+        for stage, data in snapshot['stages'].items():
+            cumulative = 0
+            for le, n in data['buckets'].items():
+                cumulative += n
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {data["sum"]:.9g}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {data["count"]}')
+        for counter, value in snapshot['counters'].items():
+            metric = f"{namespace}_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, namespace: str = 'ocs'):
+        """
+        寫出快照 (.json 為 JSON，其餘為 Prometheus 文字格式)
+
+        先寫入暫存檔再取代，node_exporter textfile collector 不會讀到寫到一半的檔案。
+
+        Args:
+            path: 輸出檔案路徑
+            namespace: Prometheus 指標名稱前綴
+        """
+        text = self.to_json() if path.lower().endswith('.json') else self.to_prometheus(namespace)
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp, path)
+
+    def format_summary(self) -> str:
+        """各階段耗時的文字摘要 (p50 / p95 為直方圖估計值，標示為 ~)"""
+        lines = [f"{'階段':<12}{'次數':>8}{'平均 ms':>10}{'~p50 ms':>10}{'~p95 ms':>10}{'最大 ms':>10}"]
+        for stage, data in self.snapshot()['stages'].items():
+            lines.append(f"{stage:<12}{data['count']:>8}{data['mean'] * 1000:>10.2f}"
+                         f"{data['p50'] * 1000:>10.2f}{data['p95'] * 1000:>10.2f}"
+                         f"{data['max'] * 1000:>10.2f}")
+        return "\n".join(lines)
+
+
+def serve_metrics(metrics: PipelineMetrics, port: int = 9108, host: str = '127.0.0.1',
+                  namespace: str = 'ocs') -> ThreadingHTTPServer:
+    """
+    在背景執行緒提供 HTTP 指標端點
+
+    GET /metrics 回傳 Prometheus 文字格式，GET /metrics.json 回傳 JSON。
+
+    Args:
+        metrics: PipelineMetrics
+        port: 連接埠 (0 為自動選擇，見 server.server_address)
+        host: 綁定位址 (預設只接受本機連線)
+        namespace: Prometheus 指標名稱前綴
+
+    Returns:
+        已啟動的伺服器 (呼叫 shutdown() 停止)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = metrics.to_prometheus(namespace).encode('utf-8')
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path == '/metrics.json':
+                body = metrics.to_json().encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def profile_call(func: Callable, *args, output: Optional[str] = None, sort: str = 'cumulative',
+                 limit: int = 30, stream: Optional[TextIO] = None, **kwargs):
+    """
+    以 cProfile 執行一次函式 (例如單張很慢的圖片)
+
+    Args:
+        func: 要分析的函式
+        *args, **kwargs: 傳給 func 的參數
+        output: 儲存原始 profile 的路徑 (可用 snakeviz / pstats 開啟，None 不儲存)
+        sort: 排序欄位 ('cumulative'、'tottime' ...)
+        limit: 印出前幾個函式
+        stream: 報告輸出位置 (預設 stdout)
+
+    Returns:
+        func 的回傳值
+    """
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func, *args, **kwargs)
+    finally:
+        if output:
+            profiler.dump_stats(output)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+        (stream or sys.stdout).write(report.getvalue())
+    return result
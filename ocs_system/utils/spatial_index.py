@@ -0,0 +1,145 @@
+"""
+Spatial Index Module
+圓形的均勻網格空間索引與多檢測器結果融合
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+
+class CircleGridIndex:
+    """
+    均勻網格空間索引
+    
+    每個圓依圓心放入 cell_size 大小的格子，查詢只檢查鄰近格子，
+    插入與查詢皆為 O(1) 攤銷 (圓分布不極端密集時)。
+    """
+    
+    def __init__(self, cell_size: float):
+        """
+        Args:
+            cell_size: 格子邊長 (像素)，建議與查詢半徑同數量級
+        """
+        self.cell_size = max(1.0, float(cell_size))
+        self._cells = defaultdict(list)
+        self.circles = []
+    
+    def __len__(self) -> int:
+        return len(self.circles)
+    
+    def _cell(self, x: float, y: float):
+        return int(x // self.cell_size), int(y // self.cell_size)
+    
+    def insert(self, x: float, y: float, radius: float) -> int:
+        """
+        插入一個圓
+        
+        Returns:
+            圓的索引
+        """
+        index = len(self.circles)
+        self.circles.append((x, y, radius))
+        self._cells[self._cell(x, y)].append(index)
+        return index
+    
+    def update(self, index: int, x: float, y: float, radius: float):
+        """
+        替換一個已插入的圓 (圓心移動時一併移到新的格子)
+        
+        Args:
+            index: insert 返回的索引
+        """
+        ox, oy, _ = self.circles[index]
+        old_cell, new_cell = self._cell(ox, oy), self._cell(x, y)
+        if old_cell != new_cell:
+            self._cells[old_cell].remove(index)
+            self._cells[new_cell].append(index)
+        self.circles[index] = (x, y, radius)
+    
+    def query(self, x: float, y: float, distance: float) -> List[int]:
+        """
+        查詢圓心距離 (x, y) 不超過 distance 的圓
+        
+        Returns:
+            圓的索引列表
+        """
+        cx, cy = self._cell(x, y)
+        reach = int(math.ceil(distance / self.cell_size))
+        limit = distance * distance
+        found = []
+        for gx in range(cx - reach, cx + reach + 1):
+            for gy in range(cy - reach, cy + reach + 1):
+                for index in self._cells.get((gx, gy), ()):
+                    ox, oy, _ = self.circles[index]
+                    if (ox - x) ** 2 + (oy - y) ** 2 <= limit:
+                        found.append(index)
+        return found
+
+
+def merge_circles(detections: Dict[str, Sequence[Dict]], center_tolerance: float = 0.5,
+                  radius_ratio: float = 0.75,
+                  priority: Optional[Sequence[str]] = None,
+                  record_sources: bool = True) -> List[Dict]:
+    """
+    融合多個檢測器的圓 (近似線性時間)
+    
+    依 priority 順序把圓插入網格索引；若新圓與已存在的圓
+    圓心距離 <= center_tolerance * 較大半徑，且半徑比 (小/大) >= radius_ratio
+    或小圓完全落在大圓內 (硬幣內圈的同心圓)，則視為同一枚硬幣，
+    只記錄支持的檢測器；否則新增一枚硬幣。
+    同一枚硬幣保留優先順序最高的檢測器的幾何資訊；同心圓則保留外圈。
+    
+    Args:
+        detections: {檢測器名稱: 硬幣列表 [{x, y, radius, ...}, ...]}
+        center_tolerance: 圓心距離容許值 (相對於半徑)
+        radius_ratio: 半徑相似度門檻 (0-1)
+        priority: 檢測器優先順序 (預設為 detections 的順序)
+        record_sources: 是否寫入 'sources' 欄位 (False 時只做去重，保留原本的欄位)
+        
+    Returns:
+        融合後的硬幣列表，每個硬幣多一個 'sources' 欄位 (支持的檢測器名稱列表)
+    """
+    order = list(priority) if priority is not None else list(detections)
+    max_radius = max((c['radius'] for name in order for c in detections.get(name, ())), default=0)
+    if max_radius == 0:
+        return []
+    
+    index = CircleGridIndex(center_tolerance * max_radius)
+    merged = []
+    
+    for name in order:
+        for coin in detections.get(name, ()):
+            x, y, r = coin['x'], coin['y'], coin['radius']
+            match = None
+            best = None
+            for i in index.query(x, y, center_tolerance * max_radius):
+                ox, oy, orad = index.circles[i]
+                big, small = max(r, orad), min(r, orad)
+                dist_sq = (ox - x) ** 2 + (oy - y) ** 2
+                if big <= 0 or dist_sq > (center_tolerance * big) ** 2:
+                    continue
+                nested = math.sqrt(dist_sq) + small <= big
+                if small / big < radius_ratio and not nested:
+                    continue
+                if best is None or dist_sq < best:
+                    match, best = i, dist_sq
+            
+            if match is None:
+                index.insert(x, y, r)
+                merged.append(dict(coin, sources=[name]) if record_sources else dict(coin))
+                continue
+            
+            target = merged[match]
+            if r > target['radius'] and target['radius'] / r < radius_ratio:
+                # 先前的是內圈同心圓，改用外圈的幾何資訊
+                sources = target.get('sources')
+                target.clear()
+                target.update(coin)
+                if record_sources:
+                    target['sources'] = sources
+                index.update(match, x, y, r)
+            if record_sources and name not in target['sources']:
+                target['sources'].append(name)
+    
+    return merged